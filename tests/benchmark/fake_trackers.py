@@ -0,0 +1,427 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Lightweight stand-ins for the Mantis BT REST API, the OpenProject v3 API and
+the Trac JSON-RPC plugin. They implement only the endpoints which are called
+by the integration code and answer with fixed, predictable data so that
+benchmark results are comparable between runs.
+
+Every response is delayed by ``latency`` seconds to simulate the network and
+the tracker itself. Issue descriptions are ``payload_size`` bytes long. When
+``rate_limit`` is set requests above that many per second are answered with
+"429 Too Many Requests", like a throttling tracker would do.
+"""
+
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RE_MANTIS_ISSUE = re.compile(r"/api/rest/issues/(\d+)$")
+RE_MANTIS_NOTES = re.compile(r"/api/rest/issues/(\d+)/notes$")
+RE_OP_WORKPACKAGE = re.compile(r"/api/v3/work_packages/(\d+)$")
+RE_OP_ACTIVITIES = re.compile(r"/api/v3/work_packages/(\d+)/activities$")
+RE_OP_TYPES = re.compile(r"/api/v3/projects/(\d+)/types$")
+RE_OP_CREATE = re.compile(r"/api/v3/projects/(\d+)/work_packages$")
+RE_TRAC_LOGIN = re.compile(r"/([^/]+)/login$")
+RE_TRAC_RPC = re.compile(r"/([^/]+)/ticketrpc$")
+RE_TRAC_QUERY = re.compile(r"/([^/]+)/query$")
+
+TRAC_COOKIE = "trac_auth=benchmark"
+
+
+class FakeTrackerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # responses are written in two chunks, headers & body
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _reply(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reply_unless_cached(self, payload, etag):
+        """
+        Issues never change so a conditional request for the same ETag
+        is always answered with "304 Not Modified"!
+        """
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._reply(payload, headers={"ETag": etag})
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _dispatch(self, method):
+        time.sleep(self.config.latency)
+        self.server.count_request()
+
+        url = urlsplit(self.path)
+        body = self._read_json() if method in ("POST", "PATCH") else None
+
+        retry_after = self.server.throttle()
+        if retry_after:
+            self._reply(
+                {"message": "Too Many Requests"},
+                429,
+                headers={"Retry-After": str(retry_after)},
+            )
+            return
+
+        for handler in (self._mantis, self._openproject, self._trac):
+            if handler(method, url, body):
+                return
+
+        self._reply({"message": f"{method} {url.path} not found"}, 404)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self._dispatch("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self._dispatch("POST")
+
+    def do_PATCH(self):  # pylint: disable=invalid-name
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self._dispatch("DELETE")
+
+    # Mantis BT
+    def _mantis(self, method, url, body):
+        path = url.path
+        if not path.startswith("/mantis/api/rest/"):
+            return False
+        path = path.replace("/mantis", "", 1)
+
+        if path == "/api/rest/projects" and method == "GET":
+            self._reply({"projects": self.config.mantis_projects()})
+        elif path == "/api/rest/projects" and method == "POST":
+            self._reply({"project": dict(body, id=self.server.next_id())}, 201)
+        elif path == "/api/rest/issues" and method == "GET":
+            # issues are never modified after they've been created
+            self._reply({"issues": []})
+        elif path == "/api/rest/issues/" and method == "POST":
+            self._reply({"issue": self.config.mantis_issue(self.server.next_id())}, 201)
+        elif RE_MANTIS_NOTES.match(path) and method == "POST":
+            self._reply(
+                {"note": {"id": self.server.next_id(), "text": body["text"]}}, 201
+            )
+        elif RE_MANTIS_ISSUE.match(path):
+            issue_id = int(RE_MANTIS_ISSUE.match(path).group(1))
+            issue = self.config.mantis_issue(issue_id)
+            select = parse_qs(url.query).get("select")
+            if select:
+                fields = select[0].split(",")
+                issue = {name: issue[name] for name in fields if name in issue}
+            self._reply_unless_cached({"issues": [issue]}, f'"{issue_id}"')
+        else:
+            return False
+
+        return True
+
+    # OpenProject
+    def _openproject(self, method, url, body):
+        path = url.path
+        if not path.startswith("/openproject/api/v3/"):
+            return False
+        path = path.replace("/openproject", "", 1)
+        query = parse_qs(url.query)
+
+        if path == "/api/v3/projects":
+            self._reply(
+                self.config.collection(
+                    self.config.openproject_projects(), url.path, query
+                )
+            )
+        elif RE_OP_TYPES.match(path):
+            self._reply(self.config.collection(self.config.openproject_types()))
+        elif RE_OP_CREATE.match(path) and method == "POST":
+            workpackage = self.config.workpackage(self.server.next_id())
+            workpackage["subject"] = body["subject"]
+            self._reply(workpackage, 201)
+        elif path == "/api/v3/work_packages":
+            ids = []
+            for _filter in json.loads(query.get("filters", ["[]"])[0]):
+                ids.extend(_filter.get("id", {}).get("values", []))
+            self._reply(
+                self.config.collection(
+                    [self.config.workpackage(int(_id)) for _id in ids]
+                )
+            )
+        elif RE_OP_ACTIVITIES.match(path) and method == "POST":
+            self._reply(
+                {"_type": "Activity::Comment", "id": self.server.next_id()}, 201
+            )
+        elif RE_OP_ACTIVITIES.match(path):
+            self._reply(self.config.collection([]))
+        elif RE_OP_WORKPACKAGE.match(path):
+            issue_id = int(RE_OP_WORKPACKAGE.match(path).group(1))
+            self._reply_unless_cached(
+                self.config.workpackage(issue_id), f'"{issue_id}"'
+            )
+        else:
+            return False
+
+        return True
+
+    # Trac
+    def _trac(self, method, url, body):
+        path = url.path
+        if not path.startswith("/trac/"):
+            return False
+        path = path.replace("/trac", "", 1)
+
+        if RE_TRAC_LOGIN.match(path) and method == "GET":
+            self.send_response(200)
+            self.send_header("Set-Cookie", f"{TRAC_COOKIE}; Path=/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif RE_TRAC_QUERY.match(path) and method == "GET":
+            # only the header row b/c tickets are never modified
+            body = "\ufeffid\n".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif RE_TRAC_RPC.match(path) and method == "POST":
+            if TRAC_COOKIE not in (self.headers.get("Cookie") or ""):
+                self._reply({"error": "not logged in"}, 403)
+            elif isinstance(body, list) and not self.config.trac_batch:
+                # trac-ticketrpc treats batches as notifications, which
+                # may still be executed
+                for call in body:
+                    self._trac_call(call)
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            elif isinstance(body, list):
+                self._reply([self._trac_call(call) for call in body])
+            else:
+                self._reply(self._trac_call(body))
+        else:
+            return False
+
+        return True
+
+    def _trac_call(self, call):
+        params = call.get("params", {})
+        if call["method"] == "ticket.create":
+            result = self.config.trac_ticket(self.server.next_id())
+        elif call["method"] == "ticket.details":
+            result = self.config.trac_ticket(int(params["id"]))
+        elif call["method"] in ("ticket.add_comment", "ticket.close"):
+            result = {"id": params.get("id")}
+        else:
+            return {
+                "jsonrpc": "2.0",
+                "id": call.get("id"),
+                "error": {
+                    "code": -32601,
+                    "message": f"RPC method {call['method']} not supported",
+                },
+            }
+
+        return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+
+
+class FakeTrackerConfig:
+    """
+    Shapes the responses of :class:`FakeTrackerServer`.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        latency=0.0,
+        payload_size=1024,
+        projects=10,
+        trac_batch=False,
+        rate_limit=0,
+    ):
+        self.latency = latency
+        self.trac_batch = trac_batch
+        self.rate_limit = rate_limit
+        self.description = ("Lorem ipsum dolor sit amet. " * (payload_size // 28 + 1))[
+            :payload_size
+        ]
+        # names of the projects listed before the generated ones
+        self.project_names = []
+        self.projects = projects
+
+    def _project_names(self):
+        return self.project_names + [
+            f"Project {index}" for index in range(1, self.projects + 1)
+        ]
+
+    @staticmethod
+    def collection(elements, path=None, query=None):
+        """
+        :param path: paginate via ``pageSize`` & ``offset`` from ``query``
+                     and link to the next page like OpenProject does
+        """
+        total = len(elements)
+        links = {}
+        if path is not None:
+            page_size = int(query.get("pageSize", [total or 1])[0])
+            offset = int(query.get("offset", [1])[0])
+            start, end = (offset - 1) * page_size, offset * page_size
+            elements = elements[start:end]
+            if end < total:
+                links["nextByOffset"] = {
+                    "href": f"{path}?offset={offset + 1}&pageSize={page_size}"
+                }
+
+        return {
+            "_type": "Collection",
+            "total": total,
+            "count": len(elements),
+            "_embedded": {"elements": elements},
+            "_links": links,
+        }
+
+    def mantis_projects(self):
+        return [
+            {"id": index, "name": name, "enabled": True}
+            for index, name in enumerate(self._project_names(), start=1)
+        ]
+
+    def mantis_issue(self, issue_id):
+        return {
+            "id": issue_id,
+            "summary": f"Issue {issue_id}",
+            "description": self.description,
+            "status": {"id": 10, "name": "new"},
+            "project": {"id": 1, "name": self._project_names()[0]},
+            "updated_at": "2026-01-01T00:00:00+00:00",
+            "notes": [],
+        }
+
+    def openproject_projects(self):
+        return [
+            {
+                "_type": "Project",
+                "id": index,
+                "identifier": f"project-{index}",
+                "name": name,
+            }
+            for index, name in enumerate(self._project_names(), start=1)
+        ]
+
+    @staticmethod
+    def openproject_types():
+        return [
+            {
+                "_type": "Type",
+                "id": index,
+                "name": name,
+                "_links": {"self": {"href": f"/api/v3/types/{index}", "title": name}},
+            }
+            for index, name in enumerate(["Task", "Bug", "Feature"], start=1)
+        ]
+
+    def workpackage(self, issue_id):
+        return {
+            "_type": "WorkPackage",
+            "id": issue_id,
+            "subject": f"Issue {issue_id}",
+            "description": {"format": "markdown", "raw": self.description},
+            "updatedAt": "2026-01-01T00:00:00Z",
+            "_links": {
+                "type": {"href": "/api/v3/types/2", "title": "Bug"},
+                "status": {"href": "/api/v3/statuses/1", "title": "New"},
+            },
+        }
+
+    def trac_ticket(self, ticket_id):
+        return {
+            "id": str(ticket_id),
+            "summary": f"Ticket {ticket_id}",
+            "description": self.description,
+            "status": "new",
+            "changetime": "2026-01-01 00:00:00+00:00",
+        }
+
+
+class FakeTrackerServer(ThreadingHTTPServer):
+    """
+    Serves all three fake trackers from a background thread, under the
+    ``/mantis``, ``/openproject`` and ``/trac/<project>`` prefixes.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config):
+        super().__init__(("127.0.0.1", 0), FakeTrackerHandler)
+        self.config = config
+        self.requests = 0
+        self.throttled = 0
+        self._window = (0, 0)
+        self._ids = itertools.count(1000)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def next_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def throttle(self):
+        """
+        :return: seconds until the next request is allowed, ``0`` when this
+                 request is within ``config.rate_limit`` for the current second
+        """
+        if not self.config.rate_limit:
+            return 0
+
+        with self._lock:
+            second = int(time.time())
+            start, count = self._window
+            if start != second:
+                start, count = second, 0
+
+            count += 1
+            self._window = (start, count)
+            if count <= self.config.rate_limit:
+                return 0
+
+            self.throttled += 1
+            return 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
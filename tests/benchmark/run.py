@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Measure latency & throughput of the hot paths in the integration code
+against local fake trackers, see ``fake_trackers.py``.
+
+Usage::
+
+    make benchmark BENCHMARK_ARGS="--latency 20 --payload-size 4096"
+    # or
+    PYTHONPATH=.:../Kiwi/ DJANGO_SETTINGS_MODULE=test_project.settings \\
+        python tests/benchmark/run.py --latency 20 --payload-size 4096
+
+A throw-away test database is created, like when running the test suite,
+because reporting issues reads from and writes to the Kiwi TCMS database.
+Each scenario is warmed up first and then timed for a fixed number of
+iterations so that results are reproducible between runs on the same machine.
+"""
+
+# pylint: disable=wrong-import-position, import-outside-toplevel
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "test_project.settings")
+
+import django  # noqa: E402
+
+from fake_trackers import FakeTrackerConfig, FakeTrackerServer  # noqa: E402
+
+TRACKERS = ("mantis", "openproject", "trac")
+SCENARIOS = ("report", "comment", "details", "hover", "bulk")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--tracker", choices=TRACKERS, action="append", help="default: all"
+    )
+    parser.add_argument(
+        "--scenario", choices=SCENARIOS, action="append", help="default: all"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=200, help="timed operations per scenario"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=20, help="untimed operations per scenario"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="server latency in milliseconds"
+    )
+    parser.add_argument(
+        "--payload-size", type=int, default=1024, help="issue description in bytes"
+    )
+    parser.add_argument(
+        "--bulk-size", type=int, default=50, help="tooltips fetched by a bulk operation"
+    )
+    parser.add_argument(
+        "--trac-batch",
+        action="store_true",
+        help="Trac answers JSON-RPC batch requests, trac-ticketrpc doesn't",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=int,
+        default=0,
+        help="requests per second above which trackers answer with 429",
+    )
+    parser.add_argument(
+        "--json", metavar="FILE", help="also write the results to a JSON file"
+    )
+    parser.add_argument(
+        "--keepdb", action="store_true", help="preserve the test database between runs"
+    )
+    return parser.parse_args()
+
+
+def percentile(samples, percent):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+def measure(operation, iterations, warmup):
+    for index in range(warmup):
+        operation(index)
+
+    samples = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        before = time.perf_counter()
+        operation(warmup + index)
+        samples.append(time.perf_counter() - before)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def create_trackers(base_url):
+    from tcms.testcases.models import BugSystem
+
+    from trackers_integration.issuetracker import Mantis, OpenProject, Trac
+
+    bug_systems = {
+        "mantis": BugSystem.objects.create(  # nosec:B106:hardcoded_password_funcarg
+            name="Benchmark Mantis",
+            tracker_type="trackers_integration.issuetracker.Mantis",
+            base_url=f"{base_url}/mantis",
+            api_password="benchmark-token",
+        ),
+        "openproject": BugSystem.objects.create(  # nosec:B106
+            name="Benchmark OpenProject",
+            tracker_type="trackers_integration.issuetracker.OpenProject",
+            base_url=f"{base_url}/openproject",
+            api_password="benchmark-token",
+        ),
+        "trac": BugSystem.objects.create(  # nosec:B106:hardcoded_password_funcarg
+            name="Benchmark Trac",
+            tracker_type="trackers_integration.issuetracker.Trac",
+            base_url=f"{base_url}/trac",
+            api_username="benchmark",
+            api_password="benchmark-password",
+        ),
+    }
+
+    return {
+        "mantis": Mantis(bug_systems["mantis"], None),
+        "openproject": OpenProject(bug_systems["openproject"], None),
+        "trac": Trac(bug_systems["trac"], None),
+    }
+
+
+def issue_url(name, tracker, execution, issue_id):
+    base_url = tracker.bug_system.base_url
+    if name == "mantis":
+        return f"{base_url}/view.php?id={issue_id}"
+    if name == "openproject":
+        return f"{base_url}/projects/project-1/work_packages/{issue_id}"
+    return f"{base_url}/{execution.build.version.product.name}/ticket/{issue_id}"
+
+
+def scenarios(name, tracker, execution, user, bulk_size):
+    def report(_index):
+        url = tracker.report_issue_from_testexecution(execution, user)
+        if "?id=" not in url and "work_packages/" not in url and "/ticket/" not in url:
+            raise RuntimeError(f"Reporting to {name} failed: {url}")
+
+    def comment(index):
+        tracker.post_comment(execution, 1 + index)
+
+    def details(index):
+        tracker.details(issue_url(name, tracker, execution, 1 + index))
+
+    def hover(index):
+        # the same few tooltips over and over, served from cache
+        tracker.details(issue_url(name, tracker, execution, 1 + index % 10))
+
+    def bulk(index):
+        urls = [
+            issue_url(name, tracker, execution, 1 + index * bulk_size + offset)
+            for offset in range(bulk_size)
+        ]
+        if len(tracker.bulk_details(urls)) != bulk_size:
+            raise RuntimeError(f"Some tooltips from {name} are missing")
+
+    return {
+        "report": report,
+        "comment": comment,
+        "details": details,
+        "hover": hover,
+        "bulk": bulk,
+    }
+
+
+def run(args, server):
+    from tcms.tests.factories import TestExecutionFactory, UserFactory
+
+    execution = TestExecutionFactory()
+    user = UserFactory()
+    trackers = create_trackers(server.base_url)
+    # so that reporting finds the project by name
+    server.config.project_names.append(execution.build.version.product.name)
+
+    results = []
+    for name in args.tracker or TRACKERS:
+        operations = scenarios(name, trackers[name], execution, user, args.bulk_size)
+        for scenario in args.scenario or SCENARIOS:
+            requests_before = server.requests
+            throttled_before = server.throttled
+            result = measure(operations[scenario], args.iterations, args.warmup)
+            result.update(
+                tracker=name,
+                scenario=scenario,
+                requests_per_op=(server.requests - requests_before)
+                / (args.iterations + args.warmup),
+                throttled=server.throttled - throttled_before,
+            )
+            results.append(result)
+            print(
+                f"{name:<12} {scenario:<8} {result['ops_per_sec']:>10.1f} ops/s"
+                f" {result['p50_ms']:>9.2f} ms p50 {result['p99_ms']:>9.2f} ms p99"
+                f" {result['requests_per_op']:>6.2f} req/op"
+                f" {result['throttled']:>6} throttled"
+            )
+
+    return results
+
+
+def main():
+    args = parse_args()
+
+    django.setup()
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=args.keepdb)
+
+    config = FakeTrackerConfig(
+        latency=args.latency / 1000,
+        payload_size=args.payload_size,
+        trac_batch=args.trac_batch,
+        rate_limit=args.rate_limit,
+    )
+    server = FakeTrackerServer(config).start()
+    try:
+        results = run(args, server)
+    finally:
+        server.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=args.keepdb)
+        teardown_test_environment()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({"settings": vars(args), "results": results}, output, indent=4)
+
+
+if __name__ == "__main__":
+    main()
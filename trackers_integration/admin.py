@@ -5,22 +5,11 @@
 
 # pylint: disable=no-self-use
 
-from contextlib import ContextDecorator
 from django import forms
 from django.contrib import admin
 
-try:
-    from django_tenants.utils import tenant_context
-except ModuleNotFoundError:
-
-    class tenant_context(
-        ContextDecorator
-    ):  # pylint: disable=invalid-name,remove-empty-class,nested-class-found,too-few-public-methods
-        pass
-
-
-from tcms.testcases.models import BugSystem
-from trackers_integration.models import ApiToken
+from trackers_integration import url_index
+from trackers_integration.models import ApiToken, base_url_hash
 
 
 class ApiTokenAdminForm(forms.ModelForm):
@@ -32,10 +21,25 @@ class ApiTokenAdminForm(forms.ModelForm):
         widget=forms.PasswordInput(render_value=True), required=True
     )
 
+    # set by ApiTokenAdmin.get_form() b/c the owner isn't part of the form
+    owner = None
+
     class Meta:
         model = ApiToken
         fields = ("base_url", "api_username", "api_password")
 
+    def clean_base_url(self):
+        base_url = self.cleaned_data["base_url"]
+        if (
+            ApiToken.objects.filter(owner=self.owner, url_hash=base_url_hash(base_url))
+            .exclude(pk=self.instance.pk)
+            .exists()
+        ):
+            raise forms.ValidationError(
+                "You already have an API token for this Issue Tracker!"
+            )
+        return base_url
+
 
 class ApiTokenAdmin(admin.ModelAdmin):
     _for_more_info = """WARNING: read
@@ -68,22 +72,19 @@ the documentation</a> before editting the values below!"""
         defined external Issue Tracker records accessible to the current user
         across all tenants they are authorized for!
         """
-        choices = []
-
-        for tenant in request.user.tenant_set.all():
-            with tenant_context(tenant):
-                for base_url in BugSystem.objects.all().values_list(
-                    "base_url", flat=True
-                ):
-                    # note: (<actual value>, <display value>)
-                    choices.append((base_url, base_url))
-
-        return list(set(choices))
+        # note: (<actual value>, <display value>)
+        return [
+            (base_url, base_url)
+            for base_url in url_index.base_urls(
+                request.user.tenant_set.values("schema_name")
+            )
+        ]
 
     def get_form(self, request, obj=None, change=False, **kwargs):
         form = super().get_form(request, obj, change, **kwargs)
 
         form.base_fields["base_url"].choices = self.get_issuetracker_urls(request)
+        form.owner = request.user
         return form
 
 
@@ -0,0 +1,35 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=import-outside-toplevel
+
+from django.apps import AppConfig as DjangoAppConfig
+
+
+class AppConfig(DjangoAppConfig):
+    name = "trackers_integration"
+
+    def ready(self):
+        from django.db.models.signals import (
+            post_delete,
+            post_migrate,
+            post_save,
+            pre_save,
+        )
+
+        from tcms.testcases.models import BugSystem
+
+        from trackers_integration import signals
+
+        from .models import ApiToken
+
+        pre_save.connect(signals.handle_api_token_pre_save, sender=ApiToken)
+        post_save.connect(signals.handle_api_token_post_save, sender=ApiToken)
+        post_delete.connect(signals.handle_api_token_post_delete, sender=ApiToken)
+
+        post_save.connect(signals.handle_bug_system_post_save, sender=BugSystem)
+        post_delete.connect(signals.handle_bug_system_post_delete, sender=BugSystem)
+
+        post_migrate.connect(signals.handle_post_migrate, sender=self)
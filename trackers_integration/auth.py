@@ -1,11 +1,76 @@
-# Copyright (c) 2023 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2023-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+from django.conf import settings
 from django.core.cache import cache
 
-from trackers_integration.models import ApiToken
+from trackers_integration import metrics
+from trackers_integration.cache import TTLCache
+from trackers_integration.models import ApiToken, base_url_hash
+
+# cached for users who don't have a personal API token
+_NO_TOKEN = ()
+
+# in front of Django's cache, which may be shared between processes
+_LOCAL_CACHE = TTLCache(maxsize=1024)
+
+_CACHE_METRIC = "trackers_integration_token_cache_total"
+
+
+def _cache_key(owner_id, base_url):
+    return f"api-token-of-{owner_id}-for-{base_url_hash(base_url)}"
+
+
+def invalidate_api_token(owner_id, base_url):
+    key = _cache_key(owner_id, base_url)
+    _LOCAL_CACHE.delete(key)
+    cache.delete(key)
+
+
+def get_api_token(owner_id, base_url):
+    """
+    Return ``(api_username, api_password)`` for the given user and Issue Tracker
+    or ``None`` if they don't have a personal API token. ``base_url`` is
+    normalized, see :func:`trackers_integration.models.base_url_hash`.
+
+    Results, including missing tokens, are cached for
+    ``TRACKERS_INTEGRATION_TOKEN_CACHE_TTL`` seconds, default 300, in Django's
+    cache and for ``TRACKERS_INTEGRATION_TOKEN_LOCAL_CACHE_TTL`` seconds,
+    default 30, in memory! Changes to ``ApiToken`` records invalidate the cache.
+    Hits & misses are recorded by :mod:`trackers_integration.metrics`.
+    """
+    key = _cache_key(owner_id, base_url)
+
+    credentials = _LOCAL_CACHE.get(key)
+    if credentials is not None:
+        metrics.increment(_CACHE_METRIC, result="local_hit")
+    else:
+        credentials = cache.get(key)
+        if credentials is not None:
+            metrics.increment(_CACHE_METRIC, result="shared_hit")
+        else:
+            metrics.increment(_CACHE_METRIC, result="miss")
+            token = ApiToken.objects.filter(
+                owner_id=owner_id, url_hash=base_url_hash(base_url)
+            ).first()
+            credentials = (
+                (token.api_username, token.api_password) if token else _NO_TOKEN
+            )
+            cache.set(
+                key,
+                credentials,
+                getattr(settings, "TRACKERS_INTEGRATION_TOKEN_CACHE_TTL", 300),
+            )
+
+        _LOCAL_CACHE.set(
+            key,
+            credentials,
+            getattr(settings, "TRACKERS_INTEGRATION_TOKEN_LOCAL_CACHE_TTL", 30),
+        )
+
+    return credentials or None
 
 
 def personal_api_token(issue_tracker):
@@ -13,13 +78,6 @@ def personal_api_token(issue_tracker):
     if not issue_tracker.request:
         return None
 
-    token = cache.get(
-        f"api-token-of-{issue_tracker.request.user.pk}-for-{issue_tracker.bug_system.pk}",
-        ApiToken.objects.filter(
-            owner=issue_tracker.request.user, base_url=issue_tracker.bug_system.base_url
-        ).first(),
+    return get_api_token(
+        issue_tracker.request.user.pk, issue_tracker.bug_system.base_url
     )
-    if token:
-        return (token.api_username, token.api_password)
-
-    return None
@@ -0,0 +1,182 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Circuit breaker for calls to Issue Trackers, per ``base_url``, so that
+a tracker which is down doesn't block every page for the full timeout.
+
+After ``TRACKERS_INTEGRATION_BREAKER_THRESHOLD`` consecutive failures, i.e.
+connection errors, timeouts or "502", "503" and "504" responses, the circuit
+opens and further requests fail immediately with :class:`TrackerUnavailable`.
+After ``TRACKERS_INTEGRATION_BREAKER_RESET_TIMEOUT`` seconds a single probe
+request is let through. If it succeeds the circuit closes again, otherwise
+it stays open for another period. Any exception raised while calling the
+tracker counts as a failure and a probe which hasn't finished within
+``TRACKERS_INTEGRATION_BREAKER_PROBE_TIMEOUT`` seconds opens the circuit again.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_BREAKER_THRESHOLD`` - number of consecutive failures
+  which open the circuit, default 5
+- ``TRACKERS_INTEGRATION_BREAKER_RESET_TIMEOUT`` - seconds before probing
+  again, default 30
+- ``TRACKERS_INTEGRATION_BREAKER_PROBE_TIMEOUT`` - seconds after which
+  a probe is considered failed, default 60
+"""
+
+import contextlib
+import threading
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.utils.translation import gettext as _
+
+_BREAKERS = {}
+_LOCK = threading.Lock()
+
+FAILED_STATUSES = (
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+class TrackerUnavailable(RuntimeError):
+    """
+    Raised when an Issue Tracker can't be reached or when its circuit is open!
+    """
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, base_url, threshold=5, reset_timeout=30, probe_timeout=60):
+        self.base_url = base_url
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing_since = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """
+        :raises TrackerUnavailable: if the circuit is open or if another
+                                    request is already probing the tracker
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            now = time.monotonic()
+            if self.state == self.OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing_since = now
+                return
+
+            if (
+                self.state == self.HALF_OPEN
+                and now - self._probing_since >= self.probe_timeout
+            ):
+                # the probe never finished, e.g. its thread is stuck
+                self.state = self.OPEN
+                self._opened_at = now
+
+        raise TrackerUnavailable(f"{self.base_url} is unavailable")
+
+    @contextlib.contextmanager
+    def guard(self):
+        """
+        Let a call through if the circuit allows it. Any exception raised by
+        the call, except :class:`TrackerUnavailable`, counts as a failure,
+        otherwise the caller must :meth:`record` the response!
+
+        :raises TrackerUnavailable: see :meth:`before_call`
+        """
+        self.before_call()
+        try:
+            yield
+        except TrackerUnavailable:
+            # nothing has been sent, e.g. rejected by the rate limiter
+            self.abandoned()
+            raise
+        except BaseException:
+            self.failed()
+            raise
+
+    def abandoned(self):
+        """
+        A call which has been let through was never made, let the next one probe
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic() - self.reset_timeout
+
+    def succeeded(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record(self, response):
+        if response.status_code in FAILED_STATUSES:
+            self.failed()
+        else:
+            self.succeeded()
+
+
+def get_breaker(base_url):
+    """
+    Return the :class:`CircuitBreaker` for an Issue Tracker, creating it on first use!
+    """
+    with _LOCK:
+        if base_url not in _BREAKERS:
+            _BREAKERS[base_url] = CircuitBreaker(
+                base_url,
+                threshold=getattr(
+                    settings, "TRACKERS_INTEGRATION_BREAKER_THRESHOLD", 5
+                ),
+                reset_timeout=getattr(
+                    settings, "TRACKERS_INTEGRATION_BREAKER_RESET_TIMEOUT", 30
+                ),
+                probe_timeout=getattr(
+                    settings, "TRACKERS_INTEGRATION_BREAKER_PROBE_TIMEOUT", 60
+                ),
+            )
+        return _BREAKERS[base_url]
+
+
+def reset():
+    """
+    Close all circuits, e.g. during testing.
+    """
+    with _LOCK:
+        _BREAKERS.clear()
+
+
+def degraded_details(issue_id, url):
+    """
+    Issue details shown in tooltips while the Issue Tracker is unavailable
+    """
+    return {
+        "id": issue_id,
+        "description": "",
+        "status": "",
+        "title": _("Issue Tracker is temporarily unavailable"),
+        "url": url,
+    }
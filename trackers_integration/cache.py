@@ -0,0 +1,73 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+In-process caching helpers used by the integration code.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    A thread-safe dictionary where every entry expires after ``ttl`` seconds.
+    The expiration time may be overriden for individual entries!
+
+    When ``maxsize`` is specified the least recently used entries are
+    discarded once the cache grows beyond that size.
+    """
+
+    def __init__(self, ttl=300, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+
+            value, expires_at = self._data[key]
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """
+        Delete all entries for which ``predicate(key)`` is true!
+        """
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
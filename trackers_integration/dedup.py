@@ -0,0 +1,234 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Optional deduplication of reported issues.
+
+Every failure is identified by a fingerprint of its test case, product,
+version, normalized test case text and of what went wrong, i.e. the status
+and the normalized comments of the TestExecution, where automation plugins
+post error messages. The first time a failure is reported
+a new issue is created as usual and its URL is remembered, see
+:class:`trackers_integration.models.IssueFingerprint`. Repeated failures with
+the same fingerprint are linked to the existing issue instead and, depending
+on configuration, a comment is posted to it.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_DEDUPLICATE`` - enable deduplication, default False
+- ``TRACKERS_INTEGRATION_DEDUPLICATE_COMMENT`` - comment on the existing
+  issue for every repeated failure, otherwise only link to it, default True
+- ``TRACKERS_INTEGRATION_DEDUPLICATE_MAX_AGE`` - seconds after which a new
+  issue is reported again for the same failure, default 7 days
+"""
+
+import functools
+import hashlib
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from trackers_integration import executor, jobs
+from trackers_integration.models import IssueFingerprint
+
+RE_NUMBERS = re.compile(r"\d+")
+RE_WHITESPACE = re.compile(r"\s+")
+
+
+def is_enabled():
+    return getattr(settings, "TRACKERS_INTEGRATION_DEDUPLICATE", False)
+
+
+def _tenant():
+    return getattr(connection, "schema_name", "")
+
+
+def normalize_text(text):
+    """
+    Ignore differences in case, whitespace and numbers, e.g. IDs & timestamps
+    """
+    text = RE_NUMBERS.sub("#", (text or "").lower())
+    return RE_WHITESPACE.sub(" ", text).strip()
+
+
+def failure_text(execution):
+    """
+    :return: status & comments of ``execution`` which tell different
+             failures of the same test case apart
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.core.helpers.comments import get_comments
+
+    comments = [comment.comment for comment in get_comments(execution)]
+    return "\n".join([execution.status.name] + comments)
+
+
+def fingerprint(execution):
+    parts = [
+        str(execution.case.pk),
+        execution.build.version.product.name,
+        execution.build.version.value,
+        normalize_text(f"{execution.case.summary}\n{execution.case.text}"),
+        normalize_text(failure_text(execution)),
+    ]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def lookup(tracker, fingerprints):
+    """
+    :return: dict of fingerprint -> URL of the issue reported for it
+    """
+    max_age = getattr(settings, "TRACKERS_INTEGRATION_DEDUPLICATE_MAX_AGE", 604800)
+    return dict(
+        IssueFingerprint.objects.filter(
+            tenant=_tenant(),
+            bug_system_id=tracker.bug_system.pk,
+            fingerprint__in=list(fingerprints),
+            reported_at__gte=timezone.now() - timedelta(seconds=max_age),
+        ).values_list("fingerprint", "url")
+    )
+
+
+def remember(tracker, urls):
+    """
+    :param urls: dict of fingerprint -> URL of a newly reported issue
+    """
+    IssueFingerprint.objects.bulk_create(
+        [
+            IssueFingerprint(
+                tenant=_tenant(),
+                bug_system_id=tracker.bug_system.pk,
+                fingerprint=key,
+                url=url,
+                reported_at=timezone.now(),
+            )
+            for key, url in urls.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["tenant", "bug_system_id", "fingerprint"],
+        update_fields=["url", "reported_at"],
+    )
+
+
+def _link(tracker, executions, url):
+    """
+    Link repeated failures to an existing issue and comment on it
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.core.contrib.linkreference.models import LinkReference
+
+    if len(executions) == 1:
+        LinkReference.objects.get_or_create(
+            execution=executions[0], url=url, is_defect=True
+        )
+    else:
+        executor.link_issues((execution, url) for execution in executions)
+
+    if getattr(settings, "TRACKERS_INTEGRATION_DEDUPLICATE_COMMENT", True):
+        bug_id = tracker.bug_id_from_url(url)
+        if jobs.is_deferred() or len(executions) == 1:
+            for execution in executions:
+                tracker.post_comment(execution, bug_id)
+        else:
+            executor.post_comments(tracker, executions, bug_id)
+
+
+def _reported(tracker, executions_per_key, known, results):
+    """
+    Remember newly reported issues. Executions for which reporting has
+    failed share the result of the first one with the same fingerprint!
+
+    :return: dict of fingerprint -> executions to be linked to an existing issue
+    """
+    repeated_per_key = {}
+    reported = {}
+    for key, same_executions in executions_per_key.items():
+        if key in known:
+            repeated_per_key[key] = same_executions
+            continue
+
+        result = results[same_executions[0].pk]
+        if isinstance(result, tuple) and result[0] is not None:
+            reported[key] = result[1]
+            if len(same_executions) > 1:
+                repeated_per_key[key] = same_executions[1:]
+        else:
+            results.update({execution.pk: result for execution in same_executions})
+
+    remember(tracker, reported)
+    return repeated_per_key
+
+
+def deduplicated(method):
+    """
+    Decorate ``_report_issue(execution, user)`` so that repeated failures
+    are linked to the existing issue when deduplication is enabled! Must be
+    applied on top of :func:`trackers_integration.jobs.deferrable`.
+    """
+
+    @functools.wraps(method)
+    def wrapper(tracker, execution, user):
+        if not is_enabled():
+            return method(tracker, execution, user)
+
+        key = fingerprint(execution)
+        url = lookup(tracker, [key]).get(key)
+        if url:
+            _link(tracker, [execution], url)
+            return (None, url)
+
+        issue, url = method(tracker, execution, user)
+        # nothing has been reported when deferred or when it failed
+        if issue is not None:
+            remember(tracker, {key: url})
+        return (issue, url)
+
+    return wrapper
+
+
+def deduplicated_bulk(method):
+    """
+    Decorate ``report_issues(executions, user)`` so that a single issue is
+    reported for all executions which fail in the same way and repeated
+    failures are linked to existing issues!
+    """
+
+    @functools.wraps(method)
+    def wrapper(tracker, executions, user):
+        if not is_enabled():
+            return method(tracker, executions, user)
+
+        executions_per_key = {}
+        for execution in executions:
+            executions_per_key.setdefault(fingerprint(execution), []).append(execution)
+        known = lookup(tracker, executions_per_key)
+
+        to_report = []
+        for key, same_executions in executions_per_key.items():
+            if key in known:
+                continue
+            # when deferred each job is deduplicated while being processed
+            if jobs.is_deferred():
+                to_report.extend(same_executions)
+            else:
+                to_report.append(same_executions[0])
+
+        results = method(tracker, to_report, user)
+        if jobs.is_deferred():
+            repeated_per_key = {key: executions_per_key[key] for key in known}
+        else:
+            repeated_per_key = _reported(tracker, executions_per_key, known, results)
+
+        for key, repeated in repeated_per_key.items():
+            url = known.get(key) or results[executions_per_key[key][0].pk][1]
+            _link(tracker, repeated, url)
+            results.update({execution.pk: (None, url) for execution in repeated})
+
+        return results
+
+    return wrapper
@@ -0,0 +1,149 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Cache for issue details which are displayed as tooltips in the Kiwi TCMS UI.
+
+Details are stored in Django's cache, under the normalized URL of the issue,
+and are returned as-is for ``TRACKERS_INTEGRATION_DETAILS_CACHE_TTL`` seconds,
+default 60. After that they are revalidated with the Issue Tracker, e.g. via
+a conditional GET request, and fetched again only if the issue has changed.
+Entries which haven't been used for ``TRACKERS_INTEGRATION_DETAILS_CACHE_MAX_AGE``
+seconds, default 1 day, are discarded.
+
+While the Issue Tracker is unavailable, see :mod:`trackers_integration.breaker`,
+stale details are returned instead of failing.
+
+Issues may be visible only to some users which is why entries are kept
+separately for every set of credentials used to access the Issue Tracker.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from trackers_integration import metrics
+from trackers_integration.breaker import TrackerUnavailable
+from trackers_integration.urls_util import url_hash
+
+_CACHE_METRIC = "trackers_integration_details_cache_total"
+
+
+def _cache_key(url):
+    return f"trackers-integration-details-{url_hash(url)}"
+
+
+def _credentials_hash(credentials):
+    return hashlib.sha256(repr(tuple(credentials)).encode()).hexdigest()
+
+
+def conditional_headers(validator):
+    """
+    :return: ``If-None-Match`` and/or ``If-Modified-Since`` request headers
+    """
+    headers = {}
+    if validator and validator.get("etag"):
+        headers["If-None-Match"] = validator["etag"]
+    if validator and validator.get("last_modified"):
+        headers["If-Modified-Since"] = validator["last_modified"]
+    return headers
+
+
+def http_validator(response):
+    """
+    :return: ``ETag`` and ``Last-Modified`` response headers or ``None``
+             if the server didn't send any of them
+    """
+    validator = {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    if not any(validator.values()):
+        return None
+    return validator
+
+
+def get_details(url, credentials, fetch):
+    """
+    Return cached issue details for ``url``, revalidating them when stale.
+
+    :param url: canonical URL of the issue, used as the cache key
+    :param credentials: credentials used to access the Issue Tracker
+    :param fetch: callable which accepts the validator of the cached entry,
+                  or ``None``, and returns ``(details, validator)``. It may
+                  return ``None`` instead if the issue hasn't changed!
+    :return: issue details
+    """
+    key = _cache_key(url)
+    cred_hash = _credentials_hash(credentials)
+    entries = cache.get(key) or {}
+    entry = entries.get(cred_hash)
+    now = time.time()
+
+    if entry and entry["fresh_until"] > now:
+        metrics.increment(_CACHE_METRIC, result="hit")
+        return entry["details"]
+
+    try:
+        result = fetch(entry["validator"] if entry else None)
+    except TrackerUnavailable:
+        if entry:
+            metrics.increment(_CACHE_METRIC, result="stale")
+            return entry["details"]
+        raise
+
+    if result is None and entry:
+        metrics.increment(_CACHE_METRIC, result="revalidated")
+        details, validator = entry["details"], entry["validator"]
+    else:
+        metrics.increment(_CACHE_METRIC, result="miss")
+        details, validator = result
+
+    entries[cred_hash] = {
+        "details": details,
+        "validator": validator,
+        "fresh_until": now
+        + getattr(settings, "TRACKERS_INTEGRATION_DETAILS_CACHE_TTL", 60),
+    }
+    cache.set(
+        key,
+        entries,
+        getattr(settings, "TRACKERS_INTEGRATION_DETAILS_CACHE_MAX_AGE", 86400),
+    )
+    return details
+
+
+def update(url, details):
+    """
+    Replace cached details for ``url``, e.g. when the Issue Tracker has
+    notified us about changes. Only existing entries are updated because
+    we don't know which credentials are allowed to see this issue!
+    """
+    key = _cache_key(url)
+    entries = cache.get(key)
+    if not entries:
+        return
+
+    fresh_until = time.time() + getattr(
+        settings, "TRACKERS_INTEGRATION_DETAILS_CACHE_TTL", 60
+    )
+    for entry in entries.values():
+        entry["details"] = dict(entry["details"], **details)
+        entry["fresh_until"] = fresh_until
+
+    cache.set(
+        key,
+        entries,
+        getattr(settings, "TRACKERS_INTEGRATION_DETAILS_CACHE_MAX_AGE", 86400),
+    )
+
+
+def invalidate(url):
+    """
+    Forget cached details for ``url`` regardless of credentials!
+    """
+    cache.delete(_cache_key(url))
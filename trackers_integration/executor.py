@@ -0,0 +1,152 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Run many calls against an Issue Tracker in parallel, e.g. when commenting
+on all failed executions from a large TestRun.
+
+The number of simultaneous requests to the same Issue Tracker, across all
+operations, and their rate are controlled by
+:mod:`trackers_integration.ratelimit` so that the workers go as fast as the
+Issue Tracker allows.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_MAX_WORKERS`` - max number of threads used for
+  a single operation, default 10
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+from trackers_integration import jobs
+
+
+def _call(tenant, worker, function, args):
+    # worker threads have their own DB connection which must be
+    # switched to the same tenant as the caller
+    if tenant is not None:
+        connection.set_tenant(tenant)
+    # calls made while processing a job must not be deferred again
+    jobs.set_worker(worker)
+
+    try:
+        return function(*args)
+    finally:
+        jobs.set_worker(False)
+        connection.close()
+
+
+def run_concurrently(tracker, method, arguments):
+    """
+    Call ``tracker.<method>(*args)`` for every tuple in ``arguments``
+    in parallel.
+
+    :return: list of results in the same order as ``arguments``. If a call
+             raised an exception then the exception object is returned in
+             place of its result!
+    """
+    arguments = list(arguments)
+    if not arguments:
+        return []
+
+    function = getattr(tracker, method)
+    tenant = getattr(connection, "tenant", None)
+    worker = jobs.is_worker()
+    max_workers = min(
+        getattr(settings, "TRACKERS_INTEGRATION_MAX_WORKERS", 10), len(arguments)
+    )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_call, tenant, worker, function, args) for args in arguments
+        ]
+
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as err:  # pylint: disable=broad-except
+            results.append(err)
+
+    return results
+
+
+def post_comments(tracker, executions, bug_id):
+    """
+    Comment on an existing issue for every execution. Trackers which can
+    post many comments at once, e.g. via JSON-RPC batch requests, do so by
+    implementing ``post_comments(executions, bug_id)``.
+
+    :return: dict of ``execution.pk`` -> result or exception
+    """
+    if hasattr(tracker, "post_comments"):
+        return tracker.post_comments(executions, bug_id)
+
+    executions = list(executions)
+    results = run_concurrently(
+        tracker, "post_comment", [(execution, bug_id) for execution in executions]
+    )
+    return {execution.pk: result for execution, result in zip(executions, results)}
+
+
+def report_issues(tracker, executions, user):
+    """
+    Report a new issue for every execution.
+
+    :return: dict of ``execution.pk`` -> ``(issue, url)`` or exception
+    """
+    executions = list(executions)
+    results = run_concurrently(
+        tracker, "_report_issue", [(execution, user) for execution in executions]
+    )
+    return {execution.pk: result for execution, result in zip(executions, results)}
+
+
+def link_issues(reported):
+    """
+    Add a link reference, shown in the UI, for every newly reported issue
+    using a single query. Like ``LinkReference.objects.get_or_create()``
+    links which already exist are skipped!
+
+    :param reported: iterable of ``(execution, url)`` tuples
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.core.contrib.linkreference.models import LinkReference
+
+    # LinkReference doesn't have a unique constraint to ignore conflicts on
+    links = {(execution.pk, url): execution for execution, url in reported}
+    if not links:
+        return
+
+    existing = set(
+        LinkReference.objects.filter(
+            execution_id__in={pk for pk, _url in links},
+            url__in={url for _pk, url in links},
+            is_defect=True,
+        ).values_list("execution_id", "url")
+    )
+
+    LinkReference.objects.bulk_create(
+        [
+            LinkReference(execution=execution, url=url, is_defect=True)
+            for (pk, url), execution in links.items()
+            if (pk, url) not in existing
+        ]
+    )
+
+
+def details(tracker, urls):
+    """
+    Fetch issue details for every URL.
+
+    :return: dict of URL -> details or exception
+    """
+    urls = list(urls)
+    return dict(
+        zip(urls, run_concurrently(tracker, "details", [(url,) for url in urls]))
+    )
@@ -4,17 +4,61 @@
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
-import requests
+import http
+
+from asgiref.sync import sync_to_async
 
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
 
 from tcms.core.contrib.linkreference.models import LinkReference
-from tcms.core.templatetags.extra_filters import markdown2html
 from tcms.issuetracker.base import IssueTrackerType
 
+from trackers_integration import (
+    breaker,
+    dedup,
+    details_cache,
+    executor,
+    jobs,
+    rendering,
+    sessions,
+    streaming,
+)
+from trackers_integration.breaker import TrackerUnavailable
+from trackers_integration.cache import TTLCache
+from trackers_integration.models import TrackerJob
+
 # this only needs to be changed during testing
 _VERIFY_SSL = True
 
+# list of projects and a lower-case name index per (base_url, api token)
+_PROJECTS = TTLCache()
+
+# number of issues per page when looking for recently updated ones
+MIRROR_PAGE_SIZE = 50
+
+# fields fetched via the ``select`` parameter instead of the entire issue,
+# which includes all notes, history & attachments
+DETAILS_FIELDS = ("id", "summary", "description", "status")
+MIRROR_FIELDS = ("id", "summary", "status", "updated_at")
+NOTES_FIELDS = ("id", "notes")
+PROJECT_FIELDS = ("id", "name", "enabled")
+
+# values which are specific to a single execution in the body of reported
+# issues and in comments, see :mod:`trackers_integration.rendering`
+REPORT_COMMENT_SLOTS = (
+    "execution.get_full_url()",
+    "user.username",
+    "user.get_full_name()",
+)
+COMMENT_SLOTS = (
+    "execution.pk",
+    "execution.run.pk",
+    "execution.run.summary",
+    "execution.run.get_full_url()",
+    "execution.case.summary",
+)
+
 
 class MantisAPI:
     """
@@ -30,16 +74,30 @@ class MantisAPI:
             "Authorization": api_token,
         }
         self.base_url = f"{base_url}/api/rest"
+        self._session_key = (base_url, api_token)
 
     def get_projects(self):
         url = f"{self.base_url}/projects"
         return self._request("GET", url, headers=self.headers)
 
+    def iter_projects(self, fields=PROJECT_FIELDS):
+        """
+        :return: iterator over all projects, decoded one at a time and with
+                 only ``fields`` kept b/c the complete list can be huge
+        """
+        url = f"{self.base_url}/projects"
+        response = self._response("GET", url, headers=self.headers)
+        return streaming.iter_items(response, "projects.item", fields)
+
     def create_project(
         self, name, description="", status="development", is_public=True
     ):
         url = f"{self.base_url}/projects"
+        payload = self._project_payload(name, description, status, is_public)
+        return self._request("POST", url, headers=self.headers, json=payload)["project"]
 
+    @staticmethod
+    def _project_payload(name, description, status, is_public):
         # these seem to be hard-coded and API docs don't show any methods
         # related to Project Status
         statuses = {
@@ -56,28 +114,65 @@ class MantisAPI:
             False: {"id": 50, "name": "private", "label": "private"},
         }
 
-        payload = {
+        return {
             "name": name,
             "status": statuses[status],
             "description": description,
             "enabled": True,
             "view_state": view_states[is_public],
         }
-        return self._request("POST", url, headers=self.headers, json=payload)["project"]
 
-    def get_issue(self, issue_id):
+    def _issue_url(self, issue_id, fields=None):
         url = f"{self.base_url}/issues/{issue_id}"
+        if fields:
+            url += f"?select={','.join(fields)}"
+        return url
+
+    def get_issue(self, issue_id, fields=None):
+        """
+        :param fields: names of the fields to fetch, default all
+        """
+        url = self._issue_url(issue_id, fields)
         return self._request("GET", url, headers=self.headers)["issues"][0]
 
+    def get_issue_if_modified(self, issue_id, validator=None, fields=None):
+        """
+        :return: ``(issue, validator)`` or ``None`` if the issue hasn't been
+                 modified since ``validator`` was returned
+        """
+        url = self._issue_url(issue_id, fields)
+        headers = dict(self.headers, **details_cache.conditional_headers(validator))
+        response = self._response("GET", url, headers=headers)
+        if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+            response.close()
+            return None
+
+        validator = details_cache.http_validator(response)
+        return streaming.read_json(response)["issues"][0], validator
+
+    def get_issues(self, page=1, page_size=MIRROR_PAGE_SIZE, fields=None):
+        """
+        :return: a page of issues from all projects, most recently updated
+                 first b/c this is the default sort order in Mantis BT
+        """
+        url = f"{self.base_url}/issues?page_size={page_size}&page={page}"
+        if fields:
+            url += f"&select={','.join(fields)}"
+        return self._request("GET", url, headers=self.headers)["issues"]
+
     def create_issue(self, summary, description, category_name, project_name):
         url = f"{self.base_url}/issues/"
-        body = {
+        body = self._issue_body(summary, description, category_name, project_name)
+        return self._request("POST", url, headers=self.headers, json=body)["issue"]
+
+    @staticmethod
+    def _issue_body(summary, description, category_name, project_name):
+        return {
             "summary": summary,
             "description": description,
             "category": {"name": category_name},
             "project": {"name": project_name},
         }
-        return self._request("POST", url, headers=self.headers, json=body)["issue"]
 
     def update_issue(self, issue_id, body):
         url = f"{self.base_url}/issues/{issue_id}"
@@ -87,7 +182,7 @@ class MantisAPI:
         self.update_issue(issue_id, {"status": {"name": "closed"}})
 
     def get_comments(self, issue_id):
-        issue = self.get_issue(issue_id)
+        issue = self.get_issue(issue_id, NOTES_FIELDS)
         if "notes" in issue:
             return issue["notes"]
 
@@ -104,10 +199,90 @@ class MantisAPI:
         url = f"{self.base_url}/issues/{issue_id}/notes/{note_id}"
         return self._request("DELETE", url, headers=self.headers)
 
-    @staticmethod
-    def _request(method, url, **kwargs):
+    def _request(self, method, url, **kwargs):
+        return streaming.read_json(self._response(method, url, **kwargs))
+
+    def _response(self, method, url, **kwargs):
+        """
+        The body is streamed, read it via :mod:`trackers_integration.streaming`!
+        """
         kwargs["verify"] = _VERIFY_SSL
-        return requests.request(method, url, timeout=30, **kwargs).json()
+        kwargs["stream"] = True
+        session = sessions.get_session(*self._session_key)
+        return session.request(method, url, **kwargs)
+
+
+class AsyncMantisAPI(MantisAPI):
+    """
+    Asynchronous version of :class:`MantisAPI`. All public methods
+    return awaitables, the ones which don't post-process the response
+    are inherited as-is, :meth:`iter_projects` is an asynchronous
+    generator. Requires ``httpx``!
+
+    :meta private:
+    """
+
+    # pylint: disable=invalid-overridden-method
+
+    async def create_project(
+        self, name, description="", status="development", is_public=True
+    ):
+        url = f"{self.base_url}/projects"
+        payload = self._project_payload(name, description, status, is_public)
+        response = await self._request("POST", url, headers=self.headers, json=payload)
+        return response["project"]
+
+    async def iter_projects(self, fields=PROJECT_FIELDS):
+        url = f"{self.base_url}/projects"
+        async with self._stream("GET", url, headers=self.headers) as response:
+            async for project in streaming.aiter_items(
+                response, "projects.item", fields
+            ):
+                yield project
+
+    async def get_issue(self, issue_id, fields=None):
+        url = self._issue_url(issue_id, fields)
+        return (await self._request("GET", url, headers=self.headers))["issues"][0]
+
+    async def get_issue_if_modified(self, issue_id, validator=None, fields=None):
+        url = self._issue_url(issue_id, fields)
+        headers = dict(self.headers, **details_cache.conditional_headers(validator))
+        async with self._stream("GET", url, headers=headers) as response:
+            if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+                return None
+
+            validator = details_cache.http_validator(response)
+            return (await streaming.aread_json(response))["issues"][0], validator
+
+    async def get_issues(self, page=1, page_size=MIRROR_PAGE_SIZE, fields=None):
+        url = f"{self.base_url}/issues?page_size={page_size}&page={page}"
+        if fields:
+            url += f"&select={','.join(fields)}"
+        return (await self._request("GET", url, headers=self.headers))["issues"]
+
+    async def create_issue(self, summary, description, category_name, project_name):
+        url = f"{self.base_url}/issues/"
+        body = self._issue_body(summary, description, category_name, project_name)
+        response = await self._request("POST", url, headers=self.headers, json=body)
+        return response["issue"]
+
+    async def close_issue(self, issue_id):
+        await self.update_issue(issue_id, {"status": {"name": "closed"}})
+
+    async def get_comments(self, issue_id):
+        issue = await self.get_issue(issue_id, NOTES_FIELDS)
+        if "notes" in issue:
+            return issue["notes"]
+
+        return []
+
+    async def _request(self, method, url, **kwargs):
+        async with self._stream(method, url, **kwargs) as response:
+            return await streaming.aread_json(response)
+
+    def _stream(self, method, url, **kwargs):
+        client = sessions.get_async_client(*self._session_key, verify=_VERIFY_SSL)
+        return client.stream(method, url, **kwargs)
 
 
 class Mantis(IssueTrackerType):
@@ -134,6 +309,11 @@ class Mantis(IssueTrackerType):
 
         return MantisAPI(self.bug_system.base_url, api_password)
 
+    def _async_rpc_connection(self):
+        _, api_password = self.rpc_credentials
+
+        return AsyncMantisAPI(self.bug_system.base_url, api_password)
+
     def is_adding_testcase_to_issue_disabled(self):
         _, api_password = self.rpc_credentials
 
@@ -146,15 +326,43 @@ class Mantis(IssueTrackerType):
         ``MANTIS_PROJECT_NAME`` configuration setting! Otherwise will
         return the first project found!
 
+        The list of projects is cached for ``MANTIS_PROJECTS_CACHE_TTL`` seconds,
+        default 300, and refreshed earlier only if there is no match by name!
+
         You may override this method if you want more control and customization,
         see https://kiwitcms.org/blog/tags/customization/
         """
-        projects = self.rpc.get_projects()["projects"]
+        projects, index, is_fresh = self._get_projects()
+        if product_name.lower() not in index and not is_fresh:
+            # project may have been created after the list was cached
+            projects, index, is_fresh = self._get_projects(refresh=True)
+
+        return index.get(product_name.lower(), projects[0])
+
+    def _get_projects(self, refresh=False):
+        """
+        :return: (list of projects, dict of lower-case name -> project,
+                  whether the list was fetched just now)
+        """
+        _, api_password = self.rpc_credentials
+        key = (self.bug_system.base_url, api_password)
+
+        cached = None if refresh else _PROJECTS.get(key)
+        if cached is not None:
+            return cached + (False,)
+
+        projects = list(self.rpc.iter_projects())
+        index = {}
         for project in projects:
-            if project["name"].lower() == product_name.lower():
-                return project
+            # the first project wins in case of duplicate names
+            index.setdefault(project["name"].lower(), project)
 
-        return projects[0]
+        _PROJECTS.set(
+            key,
+            (projects, index),
+            getattr(settings, "MANTIS_PROJECTS_CACHE_TTL", 300),
+        )
+        return projects, index, True
 
     def get_category_from_mantis(
         self, category_name, project
@@ -172,31 +380,18 @@ class Mantis(IssueTrackerType):
         """
         return {"name": category_name}
 
+    @dedup.deduplicated
+    @jobs.deferrable(TrackerJob.REPORT)
     def _report_issue(self, execution, user):
         """
         Mantis creates the Issue with Title
         """
         try:
-            project = self.get_project_from_mantis(
-                getattr(
-                    settings,
-                    "MANTIS_PROJECT_NAME",
-                    execution.build.version.product.name,
-                )
-            )
-            category = self.get_category_from_mantis(
-                getattr(settings, "MANTIS_CATEGORY_NAME", "General"),
-                project,
-            )
-
-            issue = self.rpc.create_issue(
-                f"Failed test: {execution.case.summary}",
-                markdown2html(self._report_comment(execution, user)),
-                category["name"],
-                project["name"],
+            project, category = self._resolve_project_and_category(
+                execution.build.version.product.name
             )
+            issue, issue_url = self._create_issue(project, category, execution, user)
 
-            issue_url = f"{self.bug_system.base_url}/view.php?id={issue['id']}"
             # add a link reference that will be shown in the UI
             LinkReference.objects.get_or_create(
                 execution=execution,
@@ -208,20 +403,152 @@ class Mantis(IssueTrackerType):
         except Exception:  # pylint: disable=broad-except
             # something above didn't work so return a link for manually
             # entering issue details with info pre-filled
-            url = self.bug_system.base_url
-            if not url.endswith("/"):
-                url += "/"
+            return (None, self._bug_report_page_url())
+
+    def _resolve_project_and_category(self, product_name):
+        project = self.get_project_from_mantis(
+            getattr(settings, "MANTIS_PROJECT_NAME", product_name)
+        )
+        category = self.get_category_from_mantis(
+            getattr(settings, "MANTIS_CATEGORY_NAME", "General"),
+            project,
+        )
+        return project, category
+
+    def _create_issue(self, project, category, execution, user):
+        """
+        :return: ``(new issue, its URL)``
+        """
+        issue = self.rpc.create_issue(
+            f"Failed test: {execution.case.summary}",
+            rendering.render(
+                self._report_comment,
+                {"execution": execution, "user": user},
+                REPORT_COMMENT_SLOTS,
+            ),
+            category["name"],
+            project["name"],
+        )
+        return issue, self.issue_url(issue["id"])
+
+    def _comment_html(self, execution):
+        return rendering.render(self.text, {"execution": execution}, COMMENT_SLOTS)
+
+    def _bug_report_page_url(self):
+        url = self.bug_system.base_url
+        if not url.endswith("/"):
+            url += "/"
+
+        return f"{url}bug_report_page.php"
+
+    @dedup.deduplicated_bulk
+    def report_issues(self, executions, user):
+        """
+        Report a new issue for every execution, e.g. all failures from
+        a nightly TestRun. The project and category are resolved once per
+        product, issues are created in parallel and links are added to all
+        executions with a single query.
+
+        :return: dict of ``execution.pk`` -> ``(issue, url)``. If an issue
+                 couldn't be created its URL points to the page for
+                 reporting it manually and ``issue`` is ``None``!
+        """
+        executions = list(executions)
+        if jobs.is_deferred():
+            return {
+                execution.pk: self._report_issue(execution, user)
+                for execution in executions
+            }
+
+        executions_per_product = {}
+        for execution in executions:
+            executions_per_product.setdefault(
+                execution.build.version.product.name, []
+            ).append(execution)
+
+        results = {}
+        reported = []
+        for product_name, product_executions in executions_per_product.items():
+            try:
+                project, category = self._resolve_project_and_category(product_name)
+                created = executor.run_concurrently(
+                    self,
+                    "_create_issue",
+                    [
+                        (project, category, execution, user)
+                        for execution in product_executions
+                    ],
+                )
+            except Exception:  # pylint: disable=broad-except
+                created = [None] * len(product_executions)
+
+            for execution, result in zip(product_executions, created):
+                if isinstance(result, tuple):
+                    results[execution.pk] = result
+                    reported.append((execution, result[1]))
+                else:
+                    results[execution.pk] = (None, self._bug_report_page_url())
 
-            return (None, f"{url}bug_report_page.php")
+        executor.link_issues(reported)
+        return results
 
+    @jobs.deferrable(TrackerJob.COMMENT)
     def post_comment(self, execution, bug_id):
-        self.rpc.add_comment(bug_id, markdown2html(self.text(execution)))
+        self.rpc.add_comment(bug_id, self._comment_html(execution))
+
+    async def apost_comment(self, execution, bug_id):
+        """
+        Asynchronous version of ``post_comment()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        html = await sync_to_async(self._comment_html)(execution)
+        await rpc.add_comment(bug_id, html)
 
     def details(self, url):
         """
-        Return issue details from Mantis
+        Return issue details from Mantis. They are cached and revalidated
+        via conditional requests, see :mod:`trackers_integration.details_cache`!
         """
-        issue = self.rpc.get_issue(self.bug_id_from_url(url))
+        issue_id = self.bug_id_from_url(url)
+
+        def fetch(validator):
+            result = self.rpc.get_issue_if_modified(issue_id, validator, DETAILS_FIELDS)
+            if result is None:
+                return None
+
+            issue, validator = result
+            return self._issue_details(issue, url), validator
+
+        try:
+            details = details_cache.get_details(
+                self.issue_url(issue_id), self.rpc_credentials, fetch
+            )
+        except TrackerUnavailable:
+            return breaker.degraded_details(issue_id, url)
+        return dict(details, url=url)
+
+    def issue_url(self, issue_id):
+        """
+        Return the canonical URL of an issue in Mantis
+        """
+        return f"{self.bug_system.base_url}/view.php?id={issue_id}"
+
+    def canonical_url(self, url):
+        """
+        Return the canonical URL of the issue at ``url``
+        """
+        return self.issue_url(self.bug_id_from_url(url))
+
+    async def adetails(self, url):
+        """
+        Asynchronous version of ``details()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        issue = await rpc.get_issue(self.bug_id_from_url(url), DETAILS_FIELDS)
+        return self._issue_details(issue, url)
+
+    @staticmethod
+    def _issue_details(issue, url):
         return {
             "id": issue["id"],
             "description": issue["description"],
@@ -229,3 +556,59 @@ class Mantis(IssueTrackerType):
             "title": issue["summary"],
             "url": url,
         }
+
+    def changed_since(self, since, urls):
+        """
+        Return issues updated after ``since`` or the issues at ``urls``
+        if ``since`` is ``None``, see :mod:`trackers_integration.mirror`!
+        """
+        if since is None:
+            ids = sorted({self.bug_id_from_url(url) for url in urls})
+            for record in executor.run_concurrently(
+                self, "_fetch_mirror_record", [(issue_id,) for issue_id in ids]
+            ):
+                # issue has been deleted or isn't visible anymore
+                if not isinstance(record, Exception):
+                    yield record
+            return
+
+        page = 1
+        while True:
+            issues = self.rpc.get_issues(page, MIRROR_PAGE_SIZE, MIRROR_FIELDS)
+            for issue in issues:
+                record = self._mirror_record(issue)
+                if record["updated_at"] < since:
+                    return
+                yield record
+
+            if len(issues) < MIRROR_PAGE_SIZE:
+                return
+            page += 1
+
+    def _fetch_mirror_record(self, issue_id):
+        return self._mirror_record(self.rpc.get_issue(issue_id, MIRROR_FIELDS))
+
+    def _mirror_record(self, issue):
+        return {
+            "url": self.issue_url(issue["id"]),
+            "issue_id": issue["id"],
+            "title": issue["summary"],
+            "status": issue["status"]["name"],
+            "updated_at": parse_datetime(issue["updated_at"]),
+        }
+
+    def bulk_details(self, urls):
+        """
+        Return details for many issues from Mantis as a dictionary keyed by URL.
+        Issues which could not be fetched are omitted!
+
+        .. note::
+
+            The Mantis REST API can't filter issues by a list of IDs so they are
+            fetched in parallel instead!
+        """
+        return {
+            url: details
+            for url, details in executor.details(self, urls).items()
+            if not isinstance(details, Exception)
+        }
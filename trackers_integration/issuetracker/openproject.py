@@ -3,20 +3,49 @@
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+import contextlib
+import http
 import json
 import re
-from urllib.parse import urlencode
+from datetime import timezone
+from urllib.parse import urlencode, urljoin
 
-import requests
+from asgiref.sync import sync_to_async
 from requests.auth import HTTPBasicAuth
 
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
 
 from tcms.core.contrib.linkreference.models import LinkReference
 from tcms.issuetracker import base
 
+from trackers_integration import (
+    breaker,
+    dedup,
+    details_cache,
+    executor,
+    jobs,
+    sessions,
+    streaming,
+)
+from trackers_integration.breaker import TrackerUnavailable
+from trackers_integration.cache import TTLCache
+from trackers_integration.models import TrackerJob
+
 RE_MATCH_INT = re.compile(r"work_packages/([\d]+)(/activity)*$")
 
+# max number of WorkPackages fetched with a single request
+BULK_PAGE_SIZE = 100
+
+# default number of elements per page when iterating over collections
+PAGE_SIZE = 100
+
+# project id & identifier per (base_url, api token, product name)
+_PROJECTS = TTLCache()
+
+# WorkPackage type link per (base_url, api token, project id, type name)
+_WORKPACKAGE_TYPES = TTLCache()
+
 
 class API:
     """
@@ -26,11 +55,57 @@ class API:
     def __init__(self, base_url=None, password=None):
         self.auth = HTTPBasicAuth("apikey", password)
         self.base_url = f"{base_url}/api/v3"
+        self._session_key = (base_url, password)
 
     def get_workpackage(self, issue_id):
         url = f"{self.base_url}/work_packages/{issue_id}"
         return self._request("GET", url, auth=self.auth)
 
+    def get_workpackage_if_modified(self, issue_id, validator=None):
+        """
+        :return: ``(workpackage, validator)`` or ``None`` if the WorkPackage
+                 hasn't been modified since ``validator`` was returned
+        """
+        url = f"{self.base_url}/work_packages/{issue_id}"
+        headers = details_cache.conditional_headers(validator)
+        response = self._response("GET", url, headers=headers, auth=self.auth)
+        if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+            response.close()
+            return None
+
+        validator = details_cache.http_validator(response)
+        return self._json(response), validator
+
+    def get_workpackages(self, ids):
+        params = urlencode(
+            {
+                "filters": json.dumps(
+                    [{"id": {"operator": "=", "values": [str(_id) for _id in ids]}}]
+                ),
+                "pageSize": len(ids),
+            },
+            True,
+        )
+        url = f"{self.base_url}/work_packages?{params}"
+        return self._request("GET", url, auth=self.auth)
+
+    def iter_workpackages_updated_since(self, since):
+        """
+        :param since: ISO 8601 timestamp
+        :return: iterator over WorkPackages updated after ``since``,
+                 least recently updated first
+        """
+        params = urlencode(
+            {
+                "filters": json.dumps(
+                    [{"updatedAt": {"operator": "<>d", "values": [since, ""]}}]
+                ),
+                "sortBy": json.dumps([["updatedAt", "asc"]]),
+            },
+            True,
+        )
+        return self.iterate(f"{self.base_url}/work_packages?{params}")
+
     def create_workpackage(self, project_id, body):
         headers = {"Content-type": "application/json"}
         url = f"{self.base_url}/projects/{project_id}/work_packages"
@@ -40,20 +115,88 @@ class API:
         url = f"{self.base_url}/work_packages/{issue_id}/activities"
         return self._request("GET", url, auth=self.auth)
 
+    def iter_comments(self, issue_id):
+        """
+        :return: iterator over the activities of a WorkPackage
+        """
+        return self.iterate(f"{self.base_url}/work_packages/{issue_id}/activities")
+
     def add_comment(self, issue_id, body):
         headers = {"Content-type": "application/json"}
         url = f"{self.base_url}/work_packages/{issue_id}/activities"
         return self._request("POST", url, headers=headers, auth=self.auth, json=body)
 
+    def _request(self, method, url, **kwargs):
+        return self._json(self._response(method, url, **kwargs))
+
     @staticmethod
-    def _request(method, url, **kwargs):
-        result = requests.request(method, url, timeout=30, **kwargs).json()
+    def _first_page(url, page_size):
+        separator = "&" if "?" in url else "?"
+        return f"{url}{separator}{urlencode({'pageSize': page_size})}"
+
+    def _next_page(self, collection):
+        """
+        :return: URL of the next page or ``None`` if this is the last one
+        """
+        if not collection["_embedded"]["elements"]:
+            return None
+
+        next_page = collection.get("_links", {}).get("nextByOffset")
+        if not next_page:
+            return None
+        return urljoin(self.base_url, next_page["href"])
+
+    def iterate(self, url, page_size=None):
+        """
+        Yield the elements of the HAL collection at ``url``, one page at a
+        time, following ``_links.nextByOffset``. Elements are decoded while
+        the page is being downloaded, see :mod:`trackers_integration.streaming`,
+        so only the current element is kept in memory!
+
+        :param page_size: number of elements per page, defaults to the
+                          ``OPENPROJECT_PAGE_SIZE`` configuration setting
+        """
+        page_size = page_size or getattr(settings, "OPENPROJECT_PAGE_SIZE", PAGE_SIZE)
+        url = self._first_page(url, page_size)
+
+        while url:
+            response = self._response("GET", url, auth=self.auth)
+            if response.status_code != http.HTTPStatus.OK:
+                # raises RuntimeError for error documents
+                self._json(response)
+                return
+
+            links = {"_links.nextByOffset.href": None}
+            elements = 0
+            # closes the response when the caller stops iterating early
+            with contextlib.closing(
+                streaming.iter_items(response, "_embedded.elements.item", found=links)
+            ) as items:
+                for element in items:
+                    elements += 1
+                    yield element
+
+            next_page = links["_links.nextByOffset.href"]
+            url = urljoin(self.base_url, next_page) if elements and next_page else None
+
+    def _response(self, method, url, **kwargs):
+        """
+        The body is streamed, read it via :mod:`trackers_integration.streaming`!
+        """
+        session = sessions.get_session(*self._session_key)
+        return session.request(method, url, stream=True, **kwargs)
+
+    def _json(self, response):
+        return self._check_error(streaming.read_json(response))
+
+    @staticmethod
+    def _check_error(result):
         if result.get("_type", "not-an-error").lower() == "error":
             raise RuntimeError(result.get("message", "API error"))
 
         return result
 
-    def get_projects(self, name=None):
+    def _projects_url(self, name=None):
         url = f"{self.base_url}/projects"
         if name:
             params = urlencode(
@@ -72,12 +215,82 @@ class API:
                 True,
             )
             url += f"?{params}"
-        return self._request("GET", url, auth=self.auth)
+        return url
+
+    def get_projects(self, name=None):
+        """
+        :return: the first page of projects, see :meth:`iter_projects`
+        """
+        return self._request("GET", self._projects_url(name), auth=self.auth)
+
+    def iter_projects(self, name=None):
+        """
+        :return: iterator over all projects matching ``name``
+        """
+        return self.iterate(self._projects_url(name))
 
     def get_workpackage_types(self, project_id):
+        """
+        :return: the first page of WorkPackage types, see
+                 :meth:`iter_workpackage_types`
+        """
         url = f"{self.base_url}/projects/{project_id}/types"
         return self._request("GET", url, auth=self.auth)
 
+    def iter_workpackage_types(self, project_id):
+        """
+        :return: iterator over all WorkPackage types in a project
+        """
+        return self.iterate(f"{self.base_url}/projects/{project_id}/types")
+
+
+class AsyncAPI(API):
+    """
+    Asynchronous version of :class:`API`. All public methods
+    return awaitables. Requires ``httpx``!
+
+    :meta private:
+    """
+
+    # pylint: disable=invalid-overridden-method
+
+    def __init__(self, base_url=None, password=None):
+        super().__init__(base_url, password)
+        self.auth = ("apikey", password)
+
+    async def get_workpackage_if_modified(self, issue_id, validator=None):
+        url = f"{self.base_url}/work_packages/{issue_id}"
+        headers = details_cache.conditional_headers(validator)
+        async with self._stream(
+            "GET", url, headers=headers, auth=self.auth
+        ) as response:
+            if response.status_code == http.HTTPStatus.NOT_MODIFIED:
+                return None
+
+            validator = details_cache.http_validator(response)
+            return self._check_error(await streaming.aread_json(response)), validator
+
+    async def _request(self, method, url, **kwargs):
+        async with self._stream(method, url, **kwargs) as response:
+            return self._check_error(await streaming.aread_json(response))
+
+    def _stream(self, method, url, **kwargs):
+        client = sessions.get_async_client(*self._session_key)
+        return client.stream(method, url, **kwargs)
+
+    async def iterate(self, url, page_size=None):
+        """
+        Asynchronous version of :meth:`API.iterate`, use with ``async for``!
+        """
+        page_size = page_size or getattr(settings, "OPENPROJECT_PAGE_SIZE", PAGE_SIZE)
+        url = self._first_page(url, page_size)
+
+        while url:
+            collection = await self._request("GET", url, auth=self.auth)
+            for element in collection["_embedded"]["elements"]:
+                yield element
+            url = self._next_page(collection)
+
 
 class OpenProject(base.IssueTrackerType):
     """
@@ -104,6 +317,11 @@ class OpenProject(base.IssueTrackerType):
 
         return API(self.bug_system.base_url, api_password)
 
+    def _async_rpc_connection(self):
+        _, api_password = self.rpc_credentials
+
+        return AsyncAPI(self.bug_system.base_url, api_password)
+
     def is_adding_testcase_to_issue_disabled(self):
         """
         :meta private:
@@ -135,13 +353,13 @@ class OpenProject(base.IssueTrackerType):
             OpenProject database!
         """
         try:
-            projects = self.rpc.get_projects(name)
+            with contextlib.closing(self.rpc.iter_projects(name)) as projects:
+                for project in projects:
+                    return project
 
             # nothing would be found, default to 1st project
-            if not projects["_embedded"]["elements"]:
-                projects = self.rpc.get_projects()
-
-            return projects["_embedded"]["elements"][0]
+            with contextlib.closing(self.rpc.iter_projects()) as projects:
+                return next(projects)
         except Exception as err:
             raise RuntimeError("Project not found") from err
 
@@ -154,59 +372,308 @@ class OpenProject(base.IssueTrackerType):
         configuration setting!
         """
         try:
-            types = self.rpc.get_workpackage_types(project_id)
-            for _type in types["_embedded"]["elements"]:
-                if _type["name"].lower() == name.lower():
-                    return _type
-
-            return types["_embedded"]["elements"][0]
+            first = None
+            with contextlib.closing(
+                self.rpc.iter_workpackage_types(project_id)
+            ) as types:
+                for _type in types:
+                    if _type["name"].lower() == name.lower():
+                        return _type
+                    first = first or _type
+
+            if first is None:
+                raise RuntimeError("No WorkPackage types")
+            return first
         except Exception as err:
             raise RuntimeError("WorkPackage Type not found") from err
 
+    def invalidate_cache(self):
+        """
+        Forget cached projects and WorkPackage types for this OpenProject instance!
+        """
+
+        def for_this_instance(key):
+            return key[0] == self.bug_system.base_url
+
+        _PROJECTS.delete_matching(for_this_instance)
+        _WORKPACKAGE_TYPES.delete_matching(for_this_instance)
+
+    def _resolve_project(self, name):
+        """
+        Cached version of ``get_project_by_name()`` which returns only the
+        project id & identifier. Controlled via the ``OPENPROJECT_CACHE_TTL``
+        configuration setting, default 300 seconds!
+        """
+        _, api_password = self.rpc_credentials
+        key = (self.bug_system.base_url, api_password, name)
+
+        project = _PROJECTS.get(key)
+        if project is None:
+            project = self.get_project_by_name(name)
+            project = {"id": project["id"], "identifier": project["identifier"]}
+            _PROJECTS.set(key, project, getattr(settings, "OPENPROJECT_CACHE_TTL", 300))
+
+        return project
+
+    def _resolve_workpackage_type(self, project_id, name):
+        """
+        Cached version of ``get_workpackage_type()`` which returns only the
+        link to the WorkPackage type!
+        """
+        _, api_password = self.rpc_credentials
+        key = (self.bug_system.base_url, api_password, project_id, name)
+
+        type_link = _WORKPACKAGE_TYPES.get(key)
+        if type_link is None:
+            type_link = self.get_workpackage_type(project_id, name)["_links"]["self"]
+            _WORKPACKAGE_TYPES.set(
+                key, type_link, getattr(settings, "OPENPROJECT_CACHE_TTL", 300)
+            )
+
+        return type_link
+
+    @dedup.deduplicated
+    @jobs.deferrable(TrackerJob.REPORT)
     def _report_issue(self, execution, user):
-        project = self.get_project_by_name(execution.build.version.product.name)
-        project_id = project["id"]
-        project_identifier = project["identifier"]
+        product_name = execution.build.version.product.name
+        type_name = getattr(settings, "OPENPROJECT_WORKPACKAGE_TYPE_NAME", "Bug")
 
-        _type = self.get_workpackage_type(
-            project_id, getattr(settings, "OPENPROJECT_WORKPACKAGE_TYPE_NAME", "Bug")
+        project = self._resolve_project(product_name)
+        type_link = self._resolve_workpackage_type(project["id"], type_name)
+        try:
+            new_issue, new_url = self._create_workpackage(
+                project, type_link, execution, user
+            )
+        except RuntimeError as err:
+            if not self._may_retry(err):
+                raise
+            # cached values may be stale, resolve them again and retry once
+            self.invalidate_cache()
+            project = self._resolve_project(product_name)
+            type_link = self._resolve_workpackage_type(project["id"], type_name)
+            new_issue, new_url = self._create_workpackage(
+                project, type_link, execution, user
+            )
+
+        # and also add a link reference that will be shown in the UI
+        LinkReference.objects.get_or_create(
+            execution=execution,
+            url=new_url,
+            is_defect=True,
         )
 
+        return (new_issue, new_url)
+
+    @staticmethod
+    def _may_retry(err):
+        """
+        Creating a WorkPackage is retried after error documents from
+        OpenProject, e.g. because of a stale project or type. Never after
+        :class:`TrackerUnavailable` because the WorkPackage may have been
+        created already and retrying risks a duplicate!
+        """
+        return isinstance(err, RuntimeError) and not isinstance(err, TrackerUnavailable)
+
+    def _create_workpackage(self, project, type_link, execution, user):
+        """
+        :return: ``(new WorkPackage, its URL)``
+        """
         arguments = {
             "subject": f"Failed test: {execution.case.summary}",
             "description": {"raw": self._report_comment(execution, user)},
-            "_links": {
-                "type": _type["_links"]["self"],
-            },
+            "_links": {"type": type_link},
         }
+        new_issue = self.rpc.create_workpackage(project["id"], arguments)
 
-        new_issue = self.rpc.create_workpackage(project_id, arguments)
+        project_identifier = project["identifier"]
         _id = new_issue["id"]
         new_url = f"{self.bug_system.base_url}/projects/{project_identifier}/work_packages/{_id}"
+        return new_issue, new_url
 
-        # and also add a link reference that will be shown in the UI
-        LinkReference.objects.get_or_create(
-            execution=execution,
-            url=new_url,
-            is_defect=True,
+    @dedup.deduplicated_bulk
+    def report_issues(self, executions, user):
+        """
+        Report a new WorkPackage for every execution, e.g. all failures from
+        a nightly TestRun. The project and WorkPackage type are resolved once
+        per product, WorkPackages are created in parallel and links are added
+        to all executions with a single query.
+
+        :return: dict of ``execution.pk`` -> ``(issue, url)`` or exception
+        """
+        executions = list(executions)
+        if jobs.is_deferred():
+            return {
+                execution.pk: self._report_issue(execution, user)
+                for execution in executions
+            }
+
+        executions_per_product = {}
+        for execution in executions:
+            executions_per_product.setdefault(
+                execution.build.version.product.name, []
+            ).append(execution)
+
+        results = {}
+        for product_name, product_executions in executions_per_product.items():
+            results.update(
+                self._report_workpackages(product_name, product_executions, user)
+            )
+
+        executor.link_issues(
+            (execution, results[execution.pk][1])
+            for execution in executions
+            if not isinstance(results[execution.pk], Exception)
         )
+        return results
+
+    def _report_workpackages(self, product_name, executions, user):
+        type_name = getattr(settings, "OPENPROJECT_WORKPACKAGE_TYPE_NAME", "Bug")
+        results = {}
+
+        for attempt in range(2):
+            try:
+                project = self._resolve_project(product_name)
+                type_link = self._resolve_workpackage_type(project["id"], type_name)
+            except RuntimeError as err:
+                results.update({execution.pk: err for execution in executions})
+                return results
+
+            created = executor.run_concurrently(
+                self,
+                "_create_workpackage",
+                [(project, type_link, execution, user) for execution in executions],
+            )
+            results.update(
+                {execution.pk: result for execution, result in zip(executions, created)}
+            )
 
-        return (new_issue, new_url)
+            # cached values may be stale, resolve them again and retry once
+            executions = [
+                execution
+                for execution in executions
+                if self._may_retry(results[execution.pk])
+            ]
+            if not executions or attempt:
+                return results
+            self.invalidate_cache()
+
+        return results
 
+    @jobs.deferrable(TrackerJob.COMMENT)
     def post_comment(self, execution, bug_id):
         comment_body = {"comment": {"raw": self.text(execution)}}
         self.rpc.add_comment(bug_id, comment_body)
 
+    async def apost_comment(self, execution, bug_id):
+        """
+        Asynchronous version of ``post_comment()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        text = await sync_to_async(self.text)(execution)
+        await rpc.add_comment(bug_id, {"comment": {"raw": text}})
+
     def details(self, url):
         """
         Fetches WorkPackage details from OpenProject to be displayed in tooltips.
+        They are cached and revalidated via conditional requests, see
+        :mod:`trackers_integration.details_cache`!
         """
         issue_id = self.bug_id_from_url(url)
-        issue = self.rpc.get_workpackage(issue_id)
-        issue_type = issue["_embedded"]["type"]["name"].upper()
-        status = issue["_embedded"]["status"]["name"].upper()
+
+        def fetch(validator):
+            result = self.rpc.get_workpackage_if_modified(issue_id, validator)
+            if result is None:
+                return None
+
+            issue, validator = result
+            return self._workpackage_details(issue, url), validator
+
+        try:
+            details = details_cache.get_details(
+                self.issue_url(issue_id), self.rpc_credentials, fetch
+            )
+        except TrackerUnavailable:
+            return breaker.degraded_details(issue_id, url)
+        return dict(details, url=url)
+
+    def issue_url(self, issue_id):
+        """
+        Return the canonical URL of a WorkPackage in OpenProject
+        """
+        return f"{self.bug_system.base_url}/work_packages/{issue_id}"
+
+    def canonical_url(self, url):
+        """
+        Return the canonical URL of the WorkPackage at ``url``
+        """
+        return self.issue_url(self.bug_id_from_url(url))
+
+    async def adetails(self, url):
+        """
+        Asynchronous version of ``details()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        issue = await rpc.get_workpackage(self.bug_id_from_url(url))
+        return self._workpackage_details(issue, url)
+
+    def bulk_details(self, urls):
+        """
+        Fetches details for many WorkPackages at once, using a filtered
+        collection query instead of one request per WorkPackage.
+
+        Returns a dictionary keyed by URL. WorkPackages which weren't found
+        are omitted!
+        """
+        urls_per_id = {}
+        for url in urls:
+            urls_per_id.setdefault(self.bug_id_from_url(url), []).append(url)
+
+        result = {}
+        ids = list(urls_per_id)
+        for start in range(0, len(ids), BULK_PAGE_SIZE):
+            end = start + BULK_PAGE_SIZE
+            collection = self.rpc.get_workpackages(ids[start:end])
+            for issue in collection["_embedded"]["elements"]:
+                for url in urls_per_id.get(issue["id"], []):
+                    result[url] = self._workpackage_details(issue, url)
+
+        return result
+
+    def changed_since(self, since, urls):
+        """
+        Return WorkPackages updated after ``since`` or the WorkPackages
+        at ``urls`` if ``since`` is ``None``, see
+        :mod:`trackers_integration.mirror`!
+        """
+        if since is None:
+            ids = sorted({self.bug_id_from_url(url) for url in urls})
+            for start in range(0, len(ids), BULK_PAGE_SIZE):
+                end = start + BULK_PAGE_SIZE
+                collection = self.rpc.get_workpackages(ids[start:end])
+                for issue in collection["_embedded"]["elements"]:
+                    yield self._mirror_record(issue)
+            return
+
+        for issue in self.rpc.iter_workpackages_updated_since(
+            since.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        ):
+            yield self._mirror_record(issue)
+
+    def _mirror_record(self, issue):
+        return {
+            "url": self.issue_url(issue["id"]),
+            "issue_id": issue["id"],
+            "title": issue["subject"],
+            "status": issue["_links"]["status"]["title"],
+            "updated_at": parse_datetime(issue["updatedAt"]),
+        }
+
+    @staticmethod
+    def _workpackage_details(issue, url):
+        issue_type = issue["_links"]["type"]["title"].upper()
+        status = issue["_links"]["status"]["title"].upper()
         return {
-            "id": issue_id,
+            "id": issue["id"],
             "description": issue["description"]["raw"],
             "status": status,
             "title": f"{issue_type}: " + issue["subject"],
@@ -4,15 +4,42 @@
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+import hashlib
 import http
 import time
+from datetime import timedelta, timezone
 from urllib.parse import urlsplit
-from requests import Session
+from asgiref.sync import sync_to_async
 from requests.auth import HTTPBasicAuth
 
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
 from tcms.core.contrib.linkreference.models import LinkReference
 from tcms.issuetracker.base import IssueTrackerType
 
+from trackers_integration import (
+    breaker,
+    dedup,
+    details_cache,
+    executor,
+    jobs,
+    sessions,
+    streaming,
+)
+from trackers_integration.breaker import TrackerUnavailable
+from trackers_integration.cache import TTLCache
+from trackers_integration.models import TrackerJob
+
+# authenticated session cookies per (base_url, project, username, password hash)
+_LOGIN_COOKIES = TTLCache()
+
+# whether JSON-RPC batch requests are supported, per (base_url, project)
+_BATCH_SUPPORT = TTLCache()
+
+# calls which are safe to send again when it isn't known if they were executed
+READ_ONLY_METHODS = ("system.getAPIVersion", "ticket.details", "ticket.comments")
+
 
 # pylint: disable=too-few-public-methods
 class TracAPI:
@@ -29,17 +56,18 @@ class TracAPI:
         :param api_username: username for Trac login
         :param api_password: password for Trac login
         """
-        self.__base_url = base_url
+        self._base_url = base_url
         _target = urlsplit(base_url).netloc
-        self.__headers = {
+        self._headers = {
             "Accept": "application/json",
             "Content-type": "application/json",
             "Host": _target,
         }
-        self.__login_headers = {
+        self._login_headers = {
             "Host": _target,
         }
-        self.__auth = HTTPBasicAuth(api_username, api_password)
+        self._auth = HTTPBasicAuth(api_username, api_password)
+        self._session_key = (base_url, api_username, api_password)
 
     def invoke_method(self, method: str, args: dict) -> dict:
         """
@@ -50,41 +78,384 @@ class TracAPI:
         :return: response from Trac server
         :raises: RuntimeError if method call fails
         """
+        project, req = self._single_call(method, args)
+        return self._single_result(self._send(project, req))
+
+    def supports_batch(self, project: str) -> bool:
+        """
+        Whether the Trac server answers JSON-RPC batch requests. trac-ticketrpc
+        <= 0.9.3 treats them as notifications, i.e. answers "204 No Content"
+        but may still execute the calls, that's why support is probed with
+        a read-only call before batching anything else! The result is cached
+        for ``TRAC_BATCH_PROBE_TTL`` seconds, default 3600.
+        :param project: Trac project
+        """
+        key = (self._base_url, project)
+        supported = _BATCH_SUPPORT.get(key)
+        if supported is None:
+            probe = next(self._batches(project, [("system.getAPIVersion", {})]))
+            try:
+                supported = isinstance(self._send(project, probe), list)
+            except RuntimeError:
+                supported = False
+            self._batch_supported(project, supported)
+        return supported
+
+    def _batch_supported(self, project, supported):
+        _BATCH_SUPPORT.set(
+            (self._base_url, project),
+            supported,
+            getattr(settings, "TRAC_BATCH_PROBE_TTL", 3600),
+        )
+
+    def invoke_batch(self, project: str, calls: list) -> list:
+        """
+        Send multiple JSON-RPC calls for the same project in a single request,
+        or in one request per ``TRAC_BATCH_SIZE`` calls, default 100.
+        Falls back to one request per call if the server doesn't support batches.
+        :param project: Trac project
+        :param calls: list of (method, args) tuples
+        :return: list of results in the same order as ``calls``. Calls which
+                 failed are represented by a ``RuntimeError`` instance!
+        :raises: RuntimeError if the request itself fails
+        """
+        supported = self.supports_batch(project)
+        results = []
+        for batch in self._batches(project, calls):
+            sent = False
+            if supported:
+                responses = self._send(project, batch)
+                if responses is not None:
+                    results.extend(self._batch_results(batch, responses))
+                    continue
+
+                # the server has changed since probing it
+                self._batch_supported(project, False)
+                supported, sent = False, True
+
+            for call in batch:
+                if sent and call["method"] not in READ_ONLY_METHODS:
+                    results.append(self._unknown_result(call))
+                    continue
+
+                try:
+                    results.append(self.invoke_method(call["method"], call["params"]))
+                except RuntimeError as err:
+                    results.append(err)
+        return results
+
+    @staticmethod
+    def _unknown_result(call):
+        """
+        The call may have been executed already, don't risk doing it twice!
+        """
+        return RuntimeError(f"Unknown result of {call['method']}, batch not answered")
+
+    @staticmethod
+    def _single_call(method, args):
         project = args.get("project")
         # make sure ticket ID has type str, if present
         if "id" in args:
             args["id"] = str(args["id"])
-        session = Session()
-        # visit Trac project's login URL first to get session cookie, otherwise JSON-RPC plugin
-        # in Trac cannot determine permissions
-        url = f"{self.__base_url}/{project}/login"
-        resp = session.get(
-            url, timeout=30, headers=self.__login_headers, auth=self.__auth
-        )
-        if resp.status_code != http.HTTPStatus.OK:
-            raise RuntimeError(f"{resp.status_code}: {resp.reason}")
-        # now invoke RPC method on Trac server
-        url = f"{self.__base_url}/{project}/ticketrpc"
         req = {
             "jsonrpc": "2.0",
             "method": method,
             "params": args,
             "id": str(time.time_ns()),
         }
-        resp = session.post(
-            url, timeout=30, headers=self.__headers, auth=self.__auth, json=req
-        )
+        return project, req
+
+    @staticmethod
+    def _single_result(response):
+        if "error" in response:
+            raise RuntimeError(response["error"].get("message", "JSON-RPC error"))
+
+        result = response.get("result")
+        if "id" in result:
+            result["id"] = int(result["id"])
+        return result
+
+    @staticmethod
+    def _batches(project, calls):
+        """
+        :return: JSON-RPC calls split into batches of ``TRAC_BATCH_SIZE``
+        """
+        batch_size = getattr(settings, "TRAC_BATCH_SIZE", 100)
+        prefix = time.time_ns()
+
+        batch = []
+        for index, (method, args) in enumerate(calls):
+            args = dict(args, project=project)
+            if "id" in args:
+                args["id"] = str(args["id"])
+            batch.append(
+                {
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "params": args,
+                    "id": f"{prefix}-{index}",
+                }
+            )
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _batch_results(batch, responses):
+        if isinstance(responses, dict):
+            # the batch as a whole has been rejected
+            error = responses.get("error") or {}
+            raise RuntimeError(error.get("message", "JSON-RPC error"))
+
+        results = {}
+        for response in responses:
+            if "error" in response:
+                error = response["error"] or {}
+                result = RuntimeError(error.get("message", "JSON-RPC error"))
+            else:
+                result = response.get("result")
+                if isinstance(result, dict) and "id" in result:
+                    result["id"] = int(result["id"])
+            results[response.get("id")] = result
+
+        return [
+            results.get(call["id"], RuntimeError("No response to JSON-RPC call"))
+            for call in batch
+        ]
+
+    def _send(self, project, req):
+        session = sessions.get_session(*self._session_key)
+        url = f"{self._base_url}/{project}/ticketrpc"
+
+        resp = self._post(session, project, url, req)
         rc = resp.status_code
+        if rc in (http.HTTPStatus.UNAUTHORIZED, http.HTTPStatus.FORBIDDEN):
+            # cached session cookie has expired, login again and retry once
+            resp.close()
+            resp = self._post(session, project, url, req, refresh=True)
+            rc = resp.status_code
+
         if rc == http.HTTPStatus.OK:
-            result = resp.json().get("result")
-            if "id" in result:
-                result["id"] = int(result["id"])
-            return result
+            return streaming.read_json(resp)
+
+        resp.close()
+        # batch requests are treated as notifications by trac-ticketrpc
+        if rc == http.HTTPStatus.NO_CONTENT:
+            return None
         raise RuntimeError(f"{rc}: {resp.reason}")
 
+    def _post(self, session, project, url, req, refresh=False):
+        cookies = self._login(session, project, refresh)
+        return session.post(
+            url,
+            headers=self._headers,
+            auth=self._auth,
+            cookies=cookies,
+            json=req,
+            stream=True,
+        )
+
+    def _login_key(self, project):
+        """
+        Cookies are cached per credentials so that they aren't used anymore
+        after the password has been changed in the BugSystem record!
+        """
+        password_hash = hashlib.sha256((self._auth.password or "").encode()).hexdigest()
+        return (self._base_url, project, self._auth.username, password_hash)
+
+    def _login(self, session, project, refresh=False):
+        """
+        Return the session cookies for a Trac project, visiting its login URL
+        only when they aren't cached already. Controlled via the
+        ``TRAC_LOGIN_COOKIE_TTL`` configuration setting, default 3600 seconds!
+        """
+        key = self._login_key(project)
+        cookies = None if refresh else _LOGIN_COOKIES.get(key)
+        if cookies is not None:
+            return cookies
+
+        # visit Trac project's login URL first to get session cookie, otherwise JSON-RPC plugin
+        # in Trac cannot determine permissions
+        url = f"{self._base_url}/{project}/login"
+        resp = session.get(url, headers=self._login_headers, auth=self._auth)
+        if resp.status_code != http.HTTPStatus.OK:
+            _LOGIN_COOKIES.delete(key)
+            raise RuntimeError(f"{resp.status_code}: {resp.reason}")
+
+        # the auth cookie may be set by a redirect before the final response
+        cookies = {}
+        for response in resp.history + [resp]:
+            cookies.update(response.cookies.get_dict())
+
+        _LOGIN_COOKIES.set(
+            key, cookies, getattr(settings, "TRAC_LOGIN_COOKIE_TTL", 3600)
+        )
+        return cookies
+
     def create_ticket(self, ticket_data):
         return self.invoke_method("ticket.create", ticket_data)
 
+    def changed_ticket_ids(self, project: str, changetime, ticket_id=None) -> list:
+        """
+        Return the IDs of tickets modified after ``changetime`` via Trac's
+        query module, b/c trac-ticketrpc doesn't provide a query method.
+        :param project: Trac project
+        :param changetime: timezone aware datetime
+        :param ticket_id: optional, look only at this ticket
+        :raises: RuntimeError if the request fails
+        """
+        since = (changetime + timedelta(microseconds=1)).astimezone(timezone.utc)
+        params = {
+            "format": "csv",
+            "col": "id",
+            "max": "0",
+            "changetime": since.strftime("%Y-%m-%dT%H:%M:%S.%fZ") + "..",
+        }
+        if ticket_id is not None:
+            params["id"] = str(ticket_id)
+        session = sessions.get_session(*self._session_key)
+        url = f"{self._base_url}/{project}/query"
+
+        resp = self._get(session, project, url, params)
+        if resp.status_code in (
+            http.HTTPStatus.UNAUTHORIZED,
+            http.HTTPStatus.FORBIDDEN,
+        ):
+            resp.close()
+            resp = self._get(session, project, url, params, refresh=True)
+        if resp.status_code != http.HTTPStatus.OK:
+            resp.close()
+            raise RuntimeError(f"{resp.status_code}: {resp.reason}")
+
+        # a header row, followed by one row per modified ticket
+        body = streaming.read_body(resp).decode("utf-8-sig")
+        rows = [row for row in body.splitlines() if row]
+        return [int(row.split(",")[0]) for row in rows[1:]]
+
+    def _get(self, session, project, url, params, refresh=False):
+        cookies = self._login(session, project, refresh)
+        return session.get(
+            url,
+            params=params,
+            headers=self._login_headers,
+            auth=self._auth,
+            cookies=cookies,
+            stream=True,
+        )
+
+
+class AsyncTracAPI(TracAPI):
+    """
+    :meta private:
+    Asynchronous version of :class:`TracAPI`. All public methods
+    return awaitables. Requires ``httpx``!
+    """
+
+    # pylint: disable=invalid-overridden-method
+
+    async def invoke_method(self, method: str, args: dict) -> dict:
+        project, req = self._single_call(method, args)
+        return self._single_result(await self._send(project, req))
+
+    async def supports_batch(self, project: str) -> bool:
+        supported = _BATCH_SUPPORT.get((self._base_url, project))
+        if supported is None:
+            probe = next(self._batches(project, [("system.getAPIVersion", {})]))
+            try:
+                supported = isinstance(await self._send(project, probe), list)
+            except RuntimeError:
+                supported = False
+            self._batch_supported(project, supported)
+        return supported
+
+    async def invoke_batch(self, project: str, calls: list) -> list:
+        supported = await self.supports_batch(project)
+        results = []
+        for batch in self._batches(project, calls):
+            sent = False
+            if supported:
+                responses = await self._send(project, batch)
+                if responses is not None:
+                    results.extend(self._batch_results(batch, responses))
+                    continue
+
+                self._batch_supported(project, False)
+                supported, sent = False, True
+
+            for call in batch:
+                if sent and call["method"] not in READ_ONLY_METHODS:
+                    results.append(self._unknown_result(call))
+                    continue
+
+                try:
+                    results.append(
+                        await self.invoke_method(call["method"], call["params"])
+                    )
+                except RuntimeError as err:
+                    results.append(err)
+        return results
+
+    async def _send(self, project, req):
+        client = sessions.get_async_client(*self._session_key)
+        url = f"{self._base_url}/{project}/ticketrpc"
+
+        resp = await self._post(client, project, url, req)
+        rc = resp.status_code
+        if rc in (http.HTTPStatus.UNAUTHORIZED, http.HTTPStatus.FORBIDDEN):
+            # cached session cookie has expired, login again and retry once
+            await resp.aclose()
+            resp = await self._post(client, project, url, req, refresh=True)
+            rc = resp.status_code
+
+        if rc == http.HTTPStatus.OK:
+            return await streaming.aread_json(resp)
+
+        await resp.aclose()
+        if rc == http.HTTPStatus.NO_CONTENT:
+            return None
+        raise RuntimeError(f"{rc}: {resp.reason_phrase}")
+
+    async def _post(self, session, project, url, req, refresh=False):
+        cookies = await self._login(session, project, refresh)
+        headers = dict(self._headers)
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+
+        request = session.build_request("POST", url, headers=headers, json=req)
+        return await session.send(
+            request, auth=(self._auth.username, self._auth.password), stream=True
+        )
+
+    async def _login(self, session, project, refresh=False):
+        key = self._login_key(project)
+        cookies = None if refresh else _LOGIN_COOKIES.get(key)
+        if cookies is not None:
+            return cookies
+
+        url = f"{self._base_url}/{project}/login"
+        resp = await session.get(
+            url,
+            headers=self._login_headers,
+            auth=(self._auth.username, self._auth.password),
+            follow_redirects=True,
+        )
+        if resp.status_code != http.HTTPStatus.OK:
+            _LOGIN_COOKIES.delete(key)
+            raise RuntimeError(f"{resp.status_code}: {resp.reason_phrase}")
+
+        # the auth cookie may be set by a redirect before the final response
+        cookies = {}
+        for response in resp.history + [resp]:
+            cookies.update(response.cookies)
+
+        _LOGIN_COOKIES.set(
+            key, cookies, getattr(settings, "TRAC_LOGIN_COOKIE_TTL", 3600)
+        )
+        return cookies
+
 
 class Trac(IssueTrackerType):
     """
@@ -116,10 +487,16 @@ class Trac(IssueTrackerType):
         user, password = self.rpc_credentials
         return TracAPI(self.bug_system.base_url, user, password)
 
+    def _async_rpc_connection(self):
+        user, password = self.rpc_credentials
+        return AsyncTracAPI(self.bug_system.base_url, user, password)
+
     def is_adding_testcase_to_issue_disabled(self):
         user, password = self.rpc_credentials
         return not (self.bug_system.base_url and user and password)
 
+    @dedup.deduplicated
+    @jobs.deferrable(TrackerJob.REPORT)
     def _report_issue(self, execution, user):
         """
         Create Trac ticket.
@@ -129,52 +506,291 @@ class Trac(IssueTrackerType):
         """
         product = execution.build.version.product.name
         try:
-            version = execution.build.version.value
-            summary = f"Failed test: {execution.case.summary}"
-            description = self._report_comment(execution, user)
-            ticket_data = {
-                "type": "defect",
-                "priority": "major",
-                "summary": summary,
-                "description": description,
-                "project": product,
-                "version": version,
-                "component": product,
-            }
-            issue = self.rpc.create_ticket(ticket_data)
-            issue_id = issue.get("id")
-            issue_url = f"{self.bug_system.base_url}/{product}/ticket/{issue_id}"
+            issue, issue_url = self._create_ticket(execution, user)
             # add a link reference that will be shown in the UI
             LinkReference.objects.get_or_create(
                 execution=execution,
                 url=issue_url,
                 is_defect=True,
             )
-            return Trac._filtered_trac_ticket_data(issue, issue_url), issue_url
+            return issue, issue_url
         except Exception:  # pylint: disable=broad-except
             # something above didn't work so return a link for manually
             # entering issue details with info pre-filled
             return None, f"{self.bug_system.base_url}/{product}/newticket"
 
+    def _ticket_data(self, execution, user):
+        product = execution.build.version.product.name
+        return {
+            "type": "defect",
+            "priority": "major",
+            "summary": f"Failed test: {execution.case.summary}",
+            "description": self._report_comment(execution, user),
+            "project": product,
+            "version": execution.build.version.value,
+            "component": product,
+        }
+
+    def _create_ticket(self, execution, user):
+        """
+        :return: essential data of the new ticket, its URL
+        """
+        issue = self.rpc.create_ticket(self._ticket_data(execution, user))
+        return self._new_ticket_result(execution, issue)
+
+    def _new_ticket_result(self, execution, issue):
+        issue_url = self.ticket_url(
+            execution.build.version.product.name, issue.get("id")
+        )
+        return Trac._filtered_trac_ticket_data(issue, issue_url), issue_url
+
+    @dedup.deduplicated_bulk
+    def report_issues(self, executions, user):
+        """
+        Create a Trac ticket for every execution, e.g. all failures from
+        a nightly TestRun, using a single JSON-RPC batch request per project,
+        or parallel requests if the server doesn't support batches. Links are
+        added to all executions with a single query.
+        :param executions: test executions
+        :param user: current TCMS user
+        :return: dict of ``execution.pk`` -> (essential ticket data, ticket URL).
+                 If a ticket couldn't be created its URL points to the page for
+                 creating it manually and ticket data is ``None``!
+        """
+        executions = list(executions)
+        if jobs.is_deferred():
+            return {
+                execution.pk: self._report_issue(execution, user)
+                for execution in executions
+            }
+
+        executions_per_project = {}
+        for execution in executions:
+            executions_per_project.setdefault(
+                execution.build.version.product.name, []
+            ).append(execution)
+
+        results = {}
+        reported = []
+        for project, project_executions in executions_per_project.items():
+            try:
+                created = self._create_tickets(project, project_executions, user)
+            except Exception:  # pylint: disable=broad-except
+                created = [None] * len(project_executions)
+
+            for execution, result in zip(project_executions, created):
+                if isinstance(result, tuple):
+                    results[execution.pk] = result
+                    reported.append((execution, result[1]))
+                else:
+                    results[execution.pk] = (
+                        None,
+                        f"{self.bug_system.base_url}/{project}/newticket",
+                    )
+
+        executor.link_issues(reported)
+        return results
+
+    def _create_tickets(self, project, executions, user):
+        if not self.rpc.supports_batch(project):
+            return executor.run_concurrently(
+                self, "_create_ticket", [(execution, user) for execution in executions]
+            )
+
+        calls = [
+            ("ticket.create", self._ticket_data(execution, user))
+            for execution in executions
+        ]
+        return [
+            (
+                issue
+                if isinstance(issue, Exception)
+                else self._new_ticket_result(execution, issue)
+            )
+            for execution, issue in zip(
+                executions, self.rpc.invoke_batch(project, calls)
+            )
+        ]
+
+    @jobs.deferrable(TrackerJob.COMMENT)
     def post_comment(self, execution, bug_id):
-        params = {
+        params = self._comment_params(execution, bug_id)
+        return self.rpc.invoke_method("ticket.add_comment", params)
+
+    async def apost_comment(self, execution, bug_id):
+        """
+        Asynchronous version of ``post_comment()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        params = await sync_to_async(self._comment_params)(execution, bug_id)
+        return await rpc.invoke_method("ticket.add_comment", params)
+
+    def post_comments(self, executions, bug_id):
+        """
+        Comment on an existing ticket for every execution using a single
+        JSON-RPC batch request per project, or parallel requests if the
+        server doesn't support batches.
+        :param executions: test executions
+        :param bug_id: Trac ticket ID
+        :return: dict of ``execution.pk`` -> result or exception
+        """
+        executions = list(executions)
+        if jobs.is_deferred():
+            return {
+                execution.pk: self.post_comment(execution, bug_id)
+                for execution in executions
+            }
+
+        executions_per_project = {}
+        for execution in executions:
+            executions_per_project.setdefault(
+                execution.build.version.product.name, []
+            ).append(execution)
+
+        results = {}
+        for project, project_executions in executions_per_project.items():
+            try:
+                responses = self._post_comments(project, project_executions, bug_id)
+            except RuntimeError as err:
+                responses = [err] * len(project_executions)
+
+            for execution, result in zip(project_executions, responses):
+                results[execution.pk] = result
+        return results
+
+    def _post_comments(self, project, executions, bug_id):
+        if not self.rpc.supports_batch(project):
+            return executor.run_concurrently(
+                self, "post_comment", [(execution, bug_id) for execution in executions]
+            )
+
+        calls = [
+            ("ticket.add_comment", self._comment_params(execution, bug_id))
+            for execution in executions
+        ]
+        return self.rpc.invoke_batch(project, calls)
+
+    def _comment_params(self, execution, bug_id):
+        return {
             "text": self.text(execution),
             "id": bug_id,
             "project": execution.build.version.product.name,
         }
-        return self.rpc.invoke_method("ticket.add_comment", params)
 
     def details(self, url: str) -> dict:
         """
-        Return issue details from Trac.
+        Return issue details from Trac. They are cached, see
+        :mod:`trackers_integration.details_cache`, and fetched again once
+        stale. Trac doesn't support conditional requests and asking whether
+        the ticket has changed takes a request anyway, so they aren't revalidated!
         :param url: Trac ticket URL, e.g. https://trac.myserver.local/myproject/ticket/123
         :return: issue details
         """
         ticket_id, project = Trac._bug_info_from_url(url)
+
+        def fetch(_validator):
+            params = {"id": ticket_id, "project": project}
+            details = self.rpc.invoke_method("ticket.details", params)
+            return Trac._filtered_trac_ticket_data(details, url), None
+
+        try:
+            details = details_cache.get_details(
+                self.ticket_url(project, ticket_id), self.rpc_credentials, fetch
+            )
+        except TrackerUnavailable:
+            return breaker.degraded_details(ticket_id, url)
+        return dict(details, url=url)
+
+    def ticket_url(self, project, ticket_id):
+        """
+        Return the canonical URL of a ticket in Trac
+        """
+        return f"{self.bug_system.base_url}/{project}/ticket/{ticket_id}"
+
+    def canonical_url(self, url):
+        """
+        Return the canonical URL of the ticket at ``url``
+        """
+        ticket_id, project = Trac._bug_info_from_url(url)
+        return self.ticket_url(project, ticket_id)
+
+    def changed_since(self, since, urls):
+        """
+        Return tickets among ``urls`` which have been modified after ``since``
+        or all of them if ``since`` is ``None``, see
+        :mod:`trackers_integration.mirror`. Trac projects are separate
+        databases so only projects which appear in ``urls`` are queried!
+        """
+        tickets_per_project = {}
+        for url in urls:
+            ticket_id, project = Trac._bug_info_from_url(url)
+            tickets_per_project.setdefault(project, set()).add(ticket_id)
+
+        for project, ticket_ids in tickets_per_project.items():
+            if since is not None:
+                ticket_ids = ticket_ids.intersection(
+                    self.rpc.changed_ticket_ids(project, since)
+                )
+
+            calls = [("ticket.details", {"id": _id}) for _id in sorted(ticket_ids)]
+            if not calls:
+                continue
+
+            for details in self.rpc.invoke_batch(project, calls):
+                if not isinstance(details, Exception):
+                    yield {
+                        "url": self.ticket_url(project, details["id"]),
+                        "issue_id": details["id"],
+                        "title": details.get("summary"),
+                        "status": details.get("status"),
+                        "updated_at": parse_datetime(details.get("changetime") or ""),
+                    }
+
+    async def adetails(self, url: str) -> dict:
+        """
+        Asynchronous version of ``details()``, requires ``httpx``!
+        """
+        rpc = await sync_to_async(self._async_rpc_connection)()
+        ticket_id, project = Trac._bug_info_from_url(url)
         params = {"id": ticket_id, "project": project}
-        details = self.rpc.invoke_method("ticket.details", params)
+        details = await rpc.invoke_method("ticket.details", params)
         return Trac._filtered_trac_ticket_data(details, url)
 
+    def bulk_details(self, urls: list) -> dict:
+        """
+        Return details for many Trac tickets using a single JSON-RPC
+        batch request per project, or parallel requests if the server
+        doesn't support batches.
+        :param urls: list of Trac ticket URLs
+        :return: dict of issue details keyed by URL. Tickets which could
+                 not be fetched are omitted!
+        """
+        tickets_per_project = {}
+        for url in urls:
+            ticket_id, project = Trac._bug_info_from_url(url)
+            tickets_per_project.setdefault(project, []).append((ticket_id, url))
+
+        result = {}
+        for project, tickets in tickets_per_project.items():
+            if not self.rpc.supports_batch(project):
+                result.update(
+                    (url, details)
+                    for url, details in executor.details(
+                        self, [url for _, url in tickets]
+                    ).items()
+                    if not isinstance(details, Exception)
+                )
+                continue
+
+            calls = [("ticket.details", {"id": ticket_id}) for ticket_id, _ in tickets]
+            for (_, url), details in zip(
+                tickets, self.rpc.invoke_batch(project, calls)
+            ):
+                if not isinstance(details, Exception):
+                    result[url] = Trac._filtered_trac_ticket_data(details, url)
+
+        return result
+
     @classmethod
     def _filtered_trac_ticket_data(cls, ticket_data: dict, url: str) -> dict:
         """
@@ -0,0 +1,288 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Optional deferred mode for calls which talk to an Issue Tracker while the
+user is waiting for Kiwi TCMS to respond, i.e. ``_report_issue()`` and
+``post_comment()``.
+
+When enabled these methods only record a :class:`TrackerJob` and return
+immediately. Reporting a new issue returns the URL of the TestRun containing
+the execution; the link to the actual issue is added to the execution once
+the job has been processed. Jobs are processed by the
+``./manage.py process_tracker_jobs`` command, which retries failed jobs with
+exponential backoff.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_DEFERRED`` - enable deferred mode, default False
+- ``TRACKERS_INTEGRATION_JOB_MAX_ATTEMPTS`` - number of attempts after which
+  a job is marked as failed, default 5
+- ``TRACKERS_INTEGRATION_JOB_BACKOFF`` - seconds to wait before the first
+  retry, doubled after every failed attempt, default 30
+- ``TRACKERS_INTEGRATION_JOB_LEASE`` - seconds for which a job is reserved
+  by the worker processing it, after that it is considered abandoned and
+  other workers pick it up again. Must be longer than all calls made by the
+  job together, including rate limit waits up to
+  ``TRACKERS_INTEGRATION_MAX_WAIT``, default 900
+
+The state of the queue, see :func:`queue_stats`, is exported as gauges via
+:mod:`trackers_integration.metrics` by the worker and, when deferred mode is
+enabled, whenever metrics are scraped from
+:class:`trackers_integration.views.MetricsView`.
+"""
+
+import functools
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from trackers_integration import metrics
+from trackers_integration.models import TrackerJob
+
+try:
+    from django_tenants.utils import schema_context
+except ModuleNotFoundError:
+    schema_context = None  # pylint: disable=invalid-name
+
+# marks calls made while processing a job so they are not deferred again
+_WORKER = threading.local()
+
+
+class _JobRequest:  # pylint: disable=too-few-public-methods
+    """
+    Stands in place of the original HTTP request when a job is processed,
+    e.g. to find out the personal API token of the user!
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+
+def is_worker():
+    """
+    :return: whether the current thread is processing a job
+    """
+    return getattr(_WORKER, "active", False)
+
+
+def set_worker(active):
+    """
+    Mark threads started while processing a job, see
+    :mod:`trackers_integration.executor`
+    """
+    _WORKER.active = active
+
+
+def is_deferred():
+    return getattr(settings, "TRACKERS_INTEGRATION_DEFERRED", False) and not is_worker()
+
+
+def deferrable(action):
+    """
+    Decorate ``_report_issue(execution, user)`` or
+    ``post_comment(execution, bug_id)`` so that they are recorded as
+    a :class:`TrackerJob` when deferred mode is enabled!
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(tracker, execution, argument):
+            if not is_deferred():
+                return method(tracker, execution, argument)
+
+            if action == TrackerJob.REPORT:
+                enqueue(tracker, action, execution, user=argument)
+                return (None, execution.get_full_url())
+
+            enqueue(tracker, action, execution, bug_id=argument)
+            return None
+
+        return wrapper
+
+    return decorator
+
+
+def enqueue(tracker, action, execution, user=None, bug_id=""):
+    if user is None and tracker.request:
+        user = tracker.request.user
+
+    return TrackerJob.objects.create(
+        action=action,
+        tenant=getattr(connection, "schema_name", ""),
+        bug_system_id=tracker.bug_system.pk,
+        execution_id=execution.pk,
+        bug_id=bug_id,
+        user=user if user and user.pk else None,
+    )
+
+
+def _execute(job):
+    # pylint: disable=import-outside-toplevel
+    from tcms.core.contrib.linkreference.models import LinkReference
+    from tcms.testcases.models import BugSystem
+    from tcms.testruns.models import TestExecution
+
+    bug_system = BugSystem.objects.get(pk=job.bug_system_id)
+    execution = TestExecution.objects.get(pk=job.execution_id)
+    tracker = import_string(bug_system.tracker_type)(
+        bug_system, _JobRequest(job.user) if job.user else None
+    )
+
+    if job.action == TrackerJob.COMMENT:
+        tracker.post_comment(execution, job.bug_id)
+        return ""
+
+    issue, url = tracker._report_issue(  # pylint: disable=protected-access
+        execution, job.user
+    )
+    if not issue:
+        # repeated failures are linked to an existing issue instead,
+        # see trackers_integration.dedup
+        if LinkReference.objects.filter(
+            execution=execution, url=url, is_defect=True
+        ).exists():
+            return url
+        raise RuntimeError(f"Reporting failed, manual URL is {url}")
+
+    tracker.post_process_new_issue(issue, execution, job.user)
+    return url
+
+
+def run_job(job):
+    """
+    Process a single job and record the outcome. A failed job is
+    rescheduled until it runs out of attempts!
+    """
+    _WORKER.active = True
+    try:
+        if job.tenant and schema_context is not None:
+            with schema_context(job.tenant):
+                job.result_url = _execute(job)
+        else:
+            job.result_url = _execute(job)
+
+        job.status = TrackerJob.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ""
+    except Exception as err:  # pylint: disable=broad-except
+        job.last_error = f"{err.__class__.__name__}: {err}"
+
+        if job.attempts >= getattr(
+            settings, "TRACKERS_INTEGRATION_JOB_MAX_ATTEMPTS", 5
+        ):
+            job.status = TrackerJob.FAILED
+            job.finished_at = timezone.now()
+        else:
+            job.next_attempt_at = timezone.now() + _backoff(job.attempts)
+    finally:
+        _WORKER.active = False
+
+    job.save(
+        update_fields=[
+            "status",
+            "finished_at",
+            "next_attempt_at",
+            "result_url",
+            "last_error",
+        ]
+    )
+    return job
+
+
+def _backoff(attempts):
+    delay = getattr(settings, "TRACKERS_INTEGRATION_JOB_BACKOFF", 30)
+    return timedelta(seconds=delay * 2 ** max(attempts - 1, 0))
+
+
+def claim_jobs(limit=100):
+    """
+    Lock pending jobs which are due and push their next attempt into the
+    future so that other workers skip them. If this worker dies the jobs
+    are picked up again once the lease expires!
+    """
+    lease = timedelta(seconds=getattr(settings, "TRACKERS_INTEGRATION_JOB_LEASE", 900))
+    now = timezone.now()
+
+    with transaction.atomic():
+        jobs = list(
+            TrackerJob.objects.select_for_update(
+                skip_locked=connection.features.has_select_for_update_skip_locked
+            )
+            .filter(status=TrackerJob.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "pk")[:limit]
+        )
+
+        for job in jobs:
+            job.attempts += 1
+            job.next_attempt_at = now + lease
+            job.save(update_fields=["attempts", "next_attempt_at"])
+
+    return jobs
+
+
+def process_pending(limit=100):
+    """
+    :return: number of processed jobs
+    """
+    # one at a time so that the lease starts when the job does
+    processed = 0
+    while processed < limit:
+        jobs = claim_jobs(1)
+        if not jobs:
+            break
+
+        run_job(jobs[0])
+        processed += 1
+
+    return processed
+
+
+def queue_stats():
+    """
+    :return: dict with the number of pending & failed jobs, the age in seconds
+             of the oldest pending job and the average time in seconds between
+             creating and finishing a job
+    """
+    now = timezone.now()
+    oldest = TrackerJob.objects.filter(status=TrackerJob.PENDING).aggregate(
+        oldest=Min("created_at")
+    )["oldest"]
+    latency = TrackerJob.objects.filter(status=TrackerJob.DONE).aggregate(
+        latency=Avg(F("finished_at") - F("created_at"))
+    )["latency"]
+
+    return {
+        "pending": TrackerJob.objects.filter(status=TrackerJob.PENDING).count(),
+        "failed": TrackerJob.objects.filter(status=TrackerJob.FAILED).count(),
+        "oldest_pending_age": (now - oldest).total_seconds() if oldest else 0.0,
+        "average_latency": latency.total_seconds() if latency else 0.0,
+    }
+
+
+# metric names for the values returned by queue_stats()
+QUEUE_GAUGES = {
+    "pending": "trackers_integration_jobs_pending",
+    "failed": "trackers_integration_jobs_failed",
+    "oldest_pending_age": "trackers_integration_jobs_oldest_pending_age_seconds",
+    "average_latency": "trackers_integration_jobs_average_latency_seconds",
+}
+
+
+def record_queue_stats():
+    """
+    Export :func:`queue_stats` as gauges via :mod:`trackers_integration.metrics`
+
+    :return: the recorded stats
+    """
+    stats = queue_stats()
+    for name, value in stats.items():
+        metrics.gauge(QUEUE_GAUGES[name], value)
+    return stats
@@ -0,0 +1,18 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.core.management.base import BaseCommand
+
+from trackers_integration import url_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the index of Issue Tracker URLs used by the API token admin. "
+        "With django-tenants use `./manage.py all_tenants_command index_bug_systems`."
+    )
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(f"Indexed {url_index.rebuild()} Issue Tracker(s)")
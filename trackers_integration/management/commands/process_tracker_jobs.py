@@ -0,0 +1,53 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from trackers_integration import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Process deferred Issue Tracker jobs, see TRACKERS_INTEGRATION_DEFERRED. "
+        "Runs forever unless --once is specified."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process all jobs which are due and exit",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=5,
+            help="Seconds to wait when there are no jobs, default 5",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Print queue depth and latency and exit",
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs["stats"]:
+            for name, value in jobs.record_queue_stats().items():
+                self.stdout.write(f"{name}: {value}")
+            return
+
+        while True:
+            processed = jobs.process_pending()
+            jobs.record_queue_stats()
+            if processed:
+                self.stdout.write(f"Processed {processed} job(s)")
+                continue
+
+            if kwargs["once"]:
+                return
+
+            time.sleep(kwargs["sleep"])
@@ -0,0 +1,20 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.core.management.base import BaseCommand
+
+from trackers_integration import mirror
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch issues which are linked to TestExecutions and have changed "
+        "since the last sync from all Issue Trackers into the local mirror. "
+        "With django-tenants use `./manage.py all_tenants_command sync_issue_mirror`."
+    )
+
+    def handle(self, *args, **kwargs):
+        for name, saved in mirror.sync_all().items():
+            self.stdout.write(f"{name}: synced {saved} issue(s)")
@@ -0,0 +1,274 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Instrumentation of the calls made to Issue Trackers.
+
+Every HTTP request sent via :mod:`trackers_integration.sessions` is recorded
+with its method, endpoint template, e.g. ``/api/rest/issues/{id}``, status,
+latency and number of bytes transferred. Retries, throttling and hits of the
+details cache and of the personal API token cache are recorded as well.
+Metrics are passed to a sink object which implements
+``increment(name, value, **labels)`` and ``observe(name, value, **labels)``.
+Sinks which also implement ``gauge(name, value, **labels)`` receive the state
+of the deferred job queue, see :func:`trackers_integration.jobs.record_queue_stats`.
+The default :class:`InMemorySink` keeps them in the memory of the current
+process and renders them in the Prometheus text exposition format, see
+:class:`trackers_integration.views.MetricsView`.
+
+Calls which take longer than ``TRACKERS_INTEGRATION_SLOW_CALL_THRESHOLD``
+seconds are also logged via the ``trackers_integration.slow_calls`` logger,
+with all of the above passed as ``extra`` for structured logging.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_METRICS_SINK`` - dotted path to the sink class,
+  default ``trackers_integration.metrics.InMemorySink``. Set to ``None`` in
+  order to disable metrics
+- ``TRACKERS_INTEGRATION_SLOW_CALL_THRESHOLD`` - seconds, default ``None``
+  which disables the slow call log
+"""
+
+import logging
+import re
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+RE_NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_SINK = None
+_LOCK = threading.Lock()
+
+slow_calls_logger = logging.getLogger("trackers_integration.slow_calls")
+
+
+class InMemorySink:
+    """
+    Thread-safe counters & histograms which can be rendered in the
+    Prometheus text exposition format. Values are per process!
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = {
+                    "buckets": [0] * len(LATENCY_BUCKETS),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+
+            histogram = self._histograms[key]
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @staticmethod
+    def _labels(labels, **extra):
+        pairs = list(labels) + list(extra.items())
+        if not pairs:
+            return ""
+
+        def escape(value):
+            return (
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n")
+            )
+
+        return (
+            "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+        )
+
+    def render(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(self._histograms.items())
+
+        last_name = None
+        for metric_type, values in (("counter", counters), ("gauge", gauges)):
+            for (name, labels), value in values:
+                if name != last_name:
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    last_name = name
+                lines.append(f"{name}{self._labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            if name != last_name:
+                lines.append(f"# TYPE {name} histogram")
+                last_name = name
+            for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                lines.append(f"{name}_bucket{self._labels(labels, le=bound)} {count}")
+            lines.append(
+                f"{name}_bucket{self._labels(labels, le='+Inf')} {histogram['count']}"
+            )
+            lines.append(f"{name}_sum{self._labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def get_sink():
+    """
+    Return the configured metrics sink or ``None`` if metrics are disabled!
+    """
+    global _SINK  # pylint: disable=global-statement
+
+    with _LOCK:
+        if _SINK is None:
+            path = getattr(
+                settings,
+                "TRACKERS_INTEGRATION_METRICS_SINK",
+                "trackers_integration.metrics.InMemorySink",
+            )
+            _SINK = import_string(path)() if path else False
+        return _SINK or None
+
+
+def increment(name, value=1, **labels):
+    sink = get_sink()
+    if sink is not None:
+        sink.increment(name, value, **labels)
+
+
+def gauge(name, value, **labels):
+    sink = get_sink()
+    if sink is not None and hasattr(sink, "gauge"):
+        sink.gauge(name, value, **labels)
+
+
+def endpoint_template(base_url, url):
+    """
+    :return: path of ``url`` relative to ``base_url`` where numeric
+             segments, i.e. IDs, are replaced with ``{id}``
+    """
+    path = urlsplit(url).path
+    base_path = urlsplit(base_url).path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path.replace(base_path, "", 1)
+    return RE_NUMERIC_SEGMENT.sub("/{id}", path) or "/"
+
+
+def _transferred_bytes(response, request=None):
+    """
+    :return: ``(sent, received)`` number of bytes, works with both
+             ``requests`` and ``httpx`` objects
+    """
+    if request is None:
+        request = response.request
+    body = getattr(request, "body", None)
+    if body is None:
+        try:
+            body = request.content
+        except Exception:  # pylint: disable=broad-except
+            body = b""
+
+    received = response.headers.get("Content-Length")
+    if received is None:
+        # don't read streamed responses just to count them
+        content = getattr(response, "_content", None)
+        received = len(content) if isinstance(content, bytes) else 0
+
+    return len(body or b""), int(received)
+
+
+def record_request(  # pylint: disable=too-many-arguments
+    base_url, method, url, status, duration, response=None, request=None
+):
+    """
+    Record a single HTTP request. ``status`` is either the HTTP status code,
+    ``error`` for connection errors & timeouts or ``rejected`` when the circuit
+    breaker didn't allow the request! ``request`` is needed only if it isn't
+    available as ``response.request``.
+    """
+    labels = {
+        "tracker": base_url,
+        "method": method.upper(),
+        "endpoint": endpoint_template(base_url, url),
+    }
+
+    sink = get_sink()
+    if sink is not None:
+        sink.increment(
+            "trackers_integration_requests_total", status=str(status), **labels
+        )
+        sink.observe(
+            "trackers_integration_request_duration_seconds", duration, **labels
+        )
+
+    sent = received = 0
+    if response is not None:
+        sent, received = _transferred_bytes(response, request)
+        if sink is not None:
+            sink.increment(
+                "trackers_integration_sent_bytes_total", sent, tracker=base_url
+            )
+            sink.increment(
+                "trackers_integration_received_bytes_total", received, tracker=base_url
+            )
+
+    threshold = getattr(settings, "TRACKERS_INTEGRATION_SLOW_CALL_THRESHOLD", None)
+    if threshold is not None and duration >= threshold:
+        slow_calls_logger.warning(
+            "Slow call: %s %s took %.3f seconds, status %s",
+            labels["method"],
+            url,
+            duration,
+            status,
+            extra=dict(
+                labels,
+                status=status,
+                duration=duration,
+                sent_bytes=sent,
+                received_bytes=received,
+            ),
+        )
+
+
+def reset():
+    """
+    Discard the current sink and its metrics, e.g. during testing.
+    """
+    global _SINK  # pylint: disable=global-statement
+
+    with _LOCK:
+        _SINK = None
@@ -0,0 +1,61 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trackers_integration", "0002_trackerjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MirroredIssue",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.CharField(blank=True, default="", max_length=63),
+                ),
+                ("bug_system_id", models.IntegerField()),
+                ("url_hash", models.CharField(max_length=64)),
+                ("url", models.CharField(max_length=1024)),
+                ("issue_id", models.CharField(max_length=256)),
+                (
+                    "title",
+                    models.CharField(blank=True, default="", max_length=1024),
+                ),
+                (
+                    "status",
+                    models.CharField(blank=True, default="", max_length=256),
+                ),
+                ("updated_at", models.DateTimeField(blank=True, null=True)),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "bug_system_id", "updated_at"],
+                        name="mirrored_issue_watermark",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="mirroredissue",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "url_hash"), name="unique_mirrored_issue_url"
+            ),
+        ),
+    ]
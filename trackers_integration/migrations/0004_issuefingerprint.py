@@ -0,0 +1,48 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trackers_integration", "0003_mirroredissue"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IssueFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.CharField(blank=True, default="", max_length=63),
+                ),
+                ("bug_system_id", models.IntegerField()),
+                ("fingerprint", models.CharField(max_length=64)),
+                ("url", models.CharField(max_length=1024)),
+                (
+                    "reported_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="issuefingerprint",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "bug_system_id", "fingerprint"),
+                name="unique_issue_fingerprint",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trackers_integration", "0004_issuefingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BugSystemUrl",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.CharField(blank=True, default="", max_length=63),
+                ),
+                ("bug_system_id", models.IntegerField()),
+                ("base_url", models.CharField(max_length=1024)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="bugsystemurl",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "bug_system_id"),
+                name="unique_bug_system_url",
+            ),
+        ),
+    ]
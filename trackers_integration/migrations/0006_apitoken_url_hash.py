@@ -0,0 +1,77 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+import hashlib
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+from django.db import migrations, models
+
+
+# a frozen copy of trackers_integration.urls_util.url_hash() as of this migration
+def _base_url_hash(base_url):
+    parts = urlsplit((base_url or "").strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if parts.port and parts.port != {"http": 80, "https": 443}.get(scheme):
+        netloc += f":{parts.port}"
+    path = quote(unquote(parts.path.rstrip("/")))
+    query = urlencode(sorted(parse_qsl(parts.query)))
+
+    normalized = urlunsplit((scheme, netloc, path, query, ""))
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def forwards(apps, schema_editor):
+    """
+    Fill in url_hash. Only one token per owner & Issue Tracker is allowed
+    from now on. Tokens which collide after normalizing their base_url are
+    never deleted here, the migration fails and lists them instead so that
+    an administrator can decide which ones to keep!
+    """
+    api_token_model = apps.get_model("trackers_integration", "ApiToken")
+
+    tokens_per_key = {}
+    for token in api_token_model.objects.order_by("pk"):
+        token.url_hash = _base_url_hash(token.base_url)
+        tokens_per_key.setdefault((token.owner_id, token.url_hash), []).append(token)
+
+    collisions = [tokens for tokens in tokens_per_key.values() if len(tokens) > 1]
+    if collisions:
+        lines = [
+            f"  owner_id={tokens[0].owner_id}: "
+            + ", ".join(f"pk={token.pk} base_url={token.base_url}" for token in tokens)
+            for tokens in collisions
+        ]
+        raise RuntimeError(
+            "Personal API tokens below point to the same Issue Tracker. Delete "
+            "all but one of them for every owner from the "
+            "trackers_integration_apitoken table and run the migrations again:\n"
+            + "\n".join(lines)
+        )
+
+    for tokens in tokens_per_key.values():
+        tokens[0].save(update_fields=["url_hash"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trackers_integration", "0005_bugsystemurl"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apitoken",
+            name="url_hash",
+            field=models.CharField(default="", editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="apitoken",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "url_hash"), name="unique_api_token_url"
+            ),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+from django.db import migrations, models
+
+
+def forwards(apps, schema_editor):
+    """
+    Start from the watermark which used to be computed on the fly
+    so that changes made since the previous sync aren't missed!
+    """
+    mirrored_issue_model = apps.get_model("trackers_integration", "MirroredIssue")
+    mirror_watermark_model = apps.get_model("trackers_integration", "MirrorWatermark")
+
+    mirror_watermark_model.objects.bulk_create(
+        [
+            mirror_watermark_model(
+                tenant=row["tenant"],
+                bug_system_id=row["bug_system_id"],
+                synced_until=row["watermark"],
+            )
+            for row in mirrored_issue_model.objects.filter(updated_at__isnull=False)
+            .values("tenant", "bug_system_id")
+            .annotate(watermark=models.Max("updated_at"))
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("trackers_integration", "0006_apitoken_url_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MirrorWatermark",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.CharField(blank=True, default="", max_length=63),
+                ),
+                ("bug_system_id", models.IntegerField()),
+                ("synced_until", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="mirrorwatermark",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "bug_system_id"), name="unique_mirror_watermark"
+            ),
+        ),
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
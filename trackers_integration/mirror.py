@@ -0,0 +1,171 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Local mirror of the status of issues which are linked to TestExecutions
+via ``LinkReference(is_defect=True)``, see :class:`MirroredIssue`.
+
+The mirror is synchronized incrementally by the
+``./manage.py sync_issue_mirror`` command. For every Issue Tracker only the
+issues which have changed since the previous sync started, called
+a watermark and stored in :class:`MirrorWatermark`, are fetched again.
+Issues which have been linked since the previous sync are fetched
+individually.
+
+Trackers take part by implementing ``canonical_url(url)`` and
+``changed_since(since, urls)``, which returns an iterable of dicts with the
+keys ``url``, ``issue_id``, ``title``, ``status`` and ``updated_at``. When
+``since`` is ``None`` it must return the issues at ``urls`` instead!
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_MIRROR_OVERLAP`` - seconds subtracted from the
+  watermark in order not to miss changes made while syncing, default 60
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from trackers_integration.models import MirroredIssue, MirrorWatermark
+from trackers_integration.urls_util import url_hash
+
+
+def _tenant():
+    return getattr(connection, "schema_name", "")
+
+
+def _tracked_urls(tracker):
+    """
+    :return: dict of URL hash -> canonical URL for all issues from
+             this Issue Tracker which are linked to TestExecutions
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.core.contrib.linkreference.models import LinkReference
+
+    links = (
+        LinkReference.objects.filter(
+            is_defect=True, url__startswith=tracker.bug_system.base_url
+        )
+        .values_list("url", flat=True)
+        .distinct()
+    )
+
+    result = {}
+    for url in links.iterator():
+        try:
+            canonical = tracker.canonical_url(url)
+        except (AttributeError, RuntimeError, ValueError):
+            # not a link to an issue
+            continue
+        result[url_hash(canonical)] = canonical
+    return result
+
+
+def _save(tracker, records, tracked):
+    """
+    Create or update mirrored issues which are linked to TestExecutions,
+    other records are ignored!
+
+    :return: number of saved issues
+    """
+    issues = {}
+    for record in records:
+        key = url_hash(record["url"])
+        if key in tracked:
+            issues[key] = MirroredIssue(
+                tenant=_tenant(),
+                bug_system_id=tracker.bug_system.pk,
+                url_hash=key,
+                url=tracked[key],
+                issue_id=str(record["issue_id"]),
+                title=(record["title"] or "")[:1024],
+                status=record["status"] or "",
+                updated_at=record["updated_at"],
+            )
+
+    MirroredIssue.objects.bulk_create(
+        issues.values(),
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["tenant", "url_hash"],
+        update_fields=["issue_id", "title", "status", "updated_at", "synced_at"],
+    )
+    return len(issues)
+
+
+def sync(tracker):
+    """
+    Synchronize mirrored issues from a single Issue Tracker.
+
+    :return: number of created or updated issues
+    """
+    started_at = timezone.now()
+    tracked = _tracked_urls(tracker)
+    mirrored = MirroredIssue.objects.filter(
+        tenant=_tenant(), bug_system_id=tracker.bug_system.pk
+    )
+    watermark = MirrorWatermark.objects.filter(
+        tenant=_tenant(), bug_system_id=tracker.bug_system.pk
+    ).first()
+
+    saved = 0
+    if watermark is not None:
+        since = watermark.synced_until - timedelta(
+            seconds=getattr(settings, "TRACKERS_INTEGRATION_MIRROR_OVERLAP", 60)
+        )
+        saved += _save(tracker, tracker.changed_since(since, tracked.values()), tracked)
+
+    missing = set(tracked) - set(mirrored.values_list("url_hash", flat=True))
+    if missing:
+        urls = [tracked[key] for key in missing]
+        saved += _save(tracker, tracker.changed_since(None, urls), tracked)
+
+    MirrorWatermark.objects.update_or_create(
+        tenant=_tenant(),
+        bug_system_id=tracker.bug_system.pk,
+        defaults={"synced_until": started_at},
+    )
+    return saved
+
+
+def update_status(tracker, url, status):
+    """
+    Update the status of a mirrored issue, e.g. when notified via a webhook.
+    Issues which aren't mirrored yet are left to the next sync!
+
+    :return: number of updated issues
+    """
+    return MirroredIssue.objects.filter(
+        tenant=_tenant(),
+        bug_system_id=tracker.bug_system.pk,
+        url_hash=url_hash(url),
+    ).update(status=status, synced_at=timezone.now())
+
+
+def sync_all():
+    """
+    Synchronize mirrored issues from all Issue Trackers which support it,
+    in the current tenant.
+
+    :return: dict of BugSystem name -> number of created or updated issues
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.testcases.models import BugSystem
+
+    result = {}
+    for bug_system in BugSystem.objects.all():
+        try:
+            tracker = import_string(bug_system.tracker_type)(bug_system, None)
+        except ImportError:
+            continue
+
+        if hasattr(tracker, "changed_since"):
+            result[bug_system.name] = sync(tracker)
+
+    return result
@@ -1,10 +1,60 @@
-# Copyright (c) 2023 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2023-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+"""
+All models from this package live only on the main tenant. Models which
+describe data from individual tenants, e.g. :class:`TrackerJob`, reference
+the tenant by its schema name and the Issue Tracker & TestExecution by their
+primary keys instead of via foreign keys, b/c those tables are in the schema
+of the tenant!
+"""
+
 from django.conf import settings
 from django.db import models
+from django.db.models.expressions import Combinable
+from django.utils import timezone
+
+from trackers_integration.urls_util import url_hash
+
+
+def base_url_hash(base_url):
+    """
+    sha256 of the normalized ``base_url`` so that e.g. a trailing slash
+    or the default port still match the same Issue Tracker. The scheme is
+    kept b/c a token meant for https must not be sent over plain http!
+    """
+    return url_hash(base_url)
+
+
+class ApiTokenQuerySet(models.QuerySet):
+    """
+    Keeps ``url_hash`` in sync when tokens are written in bulk,
+    which bypasses :meth:`ApiToken.save` and the ``pre_save`` signal!
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for token in objs:
+            token.url_hash = base_url_hash(token.base_url)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if "base_url" in fields:
+            for token in objs:
+                token.url_hash = base_url_hash(token.base_url)
+            fields = set(fields) | {"url_hash"}
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def update(self, **kwargs):
+        # bulk_update() passes url_hash itself
+        if "base_url" in kwargs and "url_hash" not in kwargs:
+            if isinstance(kwargs["base_url"], Combinable):
+                raise ValueError("ApiToken.base_url can be updated only with a value")
+            kwargs["url_hash"] = base_url_hash(kwargs["base_url"])
+        return super().update(**kwargs)
 
 
 class ApiToken(models.Model):
@@ -23,6 +73,9 @@ class ApiToken(models.Model):
 
     #. **base_url:** base URL to match an Issue Tracker definition.
 
+    #. **url_hash:** :func:`base_url_hash` of ``base_url``, updated on every
+       write. Only one token per owner & Issue Tracker is allowed!
+
     #. **api_username, api_password:** configuration for an internal RPC object
        that communicate to the issue tracking system when necessary. Depending on the
        actual type of IT we're interfacing with some of these values may not be necessary.
@@ -52,5 +105,180 @@ class ApiToken(models.Model):
         max_length=256, null=True, blank=True, verbose_name="API password or token"
     )
 
+    url_hash = models.CharField(max_length=64, editable=False)
+
+    objects = ApiTokenQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "url_hash"], name="unique_api_token_url"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.api_username} @ {self.base_url}"
+
+    def save(self, *args, **kwargs):
+        # url_hash itself is computed by a pre_save signal handler
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"url_hash"}
+        super().save(*args, **kwargs)
+
+
+class TrackerJob(models.Model):
+    """
+    A call to ``_report_issue()`` or ``post_comment()`` which has been
+    deferred until the ``process_tracker_jobs`` management command
+    picks it up. See :mod:`trackers_integration.jobs` for more information!
+    """
+
+    REPORT = "report"
+    COMMENT = "comment"
+    ACTIONS = (
+        (REPORT, "Report issue"),
+        (COMMENT, "Post comment"),
+    )
+
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    action = models.CharField(max_length=16, choices=ACTIONS)
+    status = models.CharField(
+        max_length=16, choices=STATUSES, default=PENDING, db_index=True
+    )
+
+    tenant = models.CharField(max_length=63, blank=True, default="")
+    bug_system_id = models.IntegerField()
+    execution_id = models.IntegerField()
+    bug_id = models.CharField(max_length=256, blank=True, default="")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL
+    )
+
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    result_url = models.CharField(max_length=1024, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+
+    def __str__(self):
+        return f"{self.action} for TE-{self.execution_id} ({self.status})"
+
+
+class MirroredIssue(models.Model):
+    """
+    Local copy of the status of an issue which is linked to a TestExecution
+    so that reports don't need to ask the Issue Tracker about every one of them.
+    Kept up to date by the ``sync_issue_mirror`` management command, see
+    :mod:`trackers_integration.mirror` for more information!
+    """
+
+    tenant = models.CharField(max_length=63, blank=True, default="")
+    bug_system_id = models.IntegerField()
+
+    # see trackers_integration.urls_util.url_hash()
+    url_hash = models.CharField(max_length=64)
+    url = models.CharField(max_length=1024)
+
+    issue_id = models.CharField(max_length=256)
+    title = models.CharField(max_length=1024, blank=True, default="")
+    status = models.CharField(max_length=256, blank=True, default="")
+    updated_at = models.DateTimeField(null=True, blank=True)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "url_hash"], name="unique_mirrored_issue_url"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["tenant", "bug_system_id", "updated_at"],
+                name="mirrored_issue_watermark",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+
+class MirrorWatermark(models.Model):
+    """
+    When :class:`MirroredIssue` records from an Issue Tracker were last
+    synchronized, see :mod:`trackers_integration.mirror`!
+    """
+
+    tenant = models.CharField(max_length=63, blank=True, default="")
+    bug_system_id = models.IntegerField()
+    synced_until = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "bug_system_id"], name="unique_mirror_watermark"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant}: {self.bug_system_id} @ {self.synced_until}"
+
+
+class IssueFingerprint(models.Model):
+    """
+    Index of failure fingerprint -> URL of the issue which has been reported
+    for it so that identical failures are linked to the same issue instead
+    of reporting a new one every time. See :mod:`trackers_integration.dedup`
+    for more information!
+    """
+
+    tenant = models.CharField(max_length=63, blank=True, default="")
+    bug_system_id = models.IntegerField()
+
+    # sha256 of test case, product, version, normalized text & failure
+    fingerprint = models.CharField(max_length=64)
+    url = models.CharField(max_length=1024)
+    reported_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "bug_system_id", "fingerprint"],
+                name="unique_issue_fingerprint",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fingerprint} -> {self.url}"
+
+
+class BugSystemUrl(models.Model):
+    """
+    Index of the base URLs of Issue Trackers defined across all tenants so
+    that they can be listed with a single query instead of switching into
+    every tenant. Kept up to date by signal handlers for ``BugSystem``, see
+    :mod:`trackers_integration.url_index` for more information!
+    """
+
+    tenant = models.CharField(max_length=63, blank=True, default="")
+    bug_system_id = models.IntegerField()
+    base_url = models.CharField(max_length=1024)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "bug_system_id"], name="unique_bug_system_url"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant}: {self.base_url}"
@@ -0,0 +1,319 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Client side rate limiting for calls to Issue Trackers, per ``base_url``.
+
+Every HTTP request made via the pooled sessions, see
+:mod:`trackers_integration.sessions`, first takes a token from a token bucket
+which is refilled at a sustained rate and may hold up to a burst of tokens.
+When the Issue Tracker answers with "429 Too Many Requests", or with
+"503 Service Unavailable" and a ``Retry-After`` header, all requests to it
+are paused for the requested time and then retried.
+
+The number of simultaneous requests to the same Issue Tracker adapts
+AIMD-style: it grows by one after every window of successful requests, up to
+a maximum, and is halved every time the Issue Tracker throttles us. Waiting
+for a token or for ``Retry-After`` happens before taking one of these slots.
+Waiting for a slot counts towards the max wait below as well.
+
+Calls made while a user is waiting for Kiwi TCMS to respond, i.e. outside
+of background jobs, see :func:`trackers_integration.jobs.is_worker`, aren't
+retried by default and wait only briefly. If a call would have to wait for
+longer than allowed it fails with :class:`TrackerUnavailable` instead.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_RATE_LIMIT`` - sustained requests per second,
+  default 0 which means unlimited
+- ``TRACKERS_INTEGRATION_RATE_BURST`` - max number of requests sent at once
+  before the sustained rate kicks in, default 10
+- ``TRACKERS_INTEGRATION_RATE_LIMITS`` - dict of base_url -> dict with
+  ``rate`` and/or ``burst`` keys which override the values above for
+  individual Issue Trackers, default empty
+- ``TRACKERS_INTEGRATION_MAX_PER_HOST`` - max number of simultaneous requests
+  to the same Issue Tracker from a single process, default the value of
+  ``TRACKERS_INTEGRATION_POOL_SIZE``, i.e. 10
+- ``TRACKERS_INTEGRATION_RATE_RETRIES`` - how many times a throttled request
+  is retried in background jobs, default 3
+- ``TRACKERS_INTEGRATION_MAX_WAIT`` - max number of seconds a single call
+  waits in total in background jobs, default 300
+- ``TRACKERS_INTEGRATION_INTERACTIVE_RETRIES`` - how many times a throttled
+  request is retried while a user is waiting, default 0
+- ``TRACKERS_INTEGRATION_INTERACTIVE_MAX_WAIT`` - max number of seconds
+  a single call waits in total while a user is waiting, default 5
+- ``TRACKERS_INTEGRATION_MAX_RETRY_AFTER`` - max number of seconds to wait
+  for, regardless of ``Retry-After``, default 60
+"""
+
+import asyncio
+import contextlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+
+from django.conf import settings
+
+from trackers_integration import metrics
+from trackers_integration.breaker import TrackerUnavailable
+
+_LIMITERS = {}
+_LOCK = threading.Lock()
+
+
+def retry_after(response, default):
+    """
+    :return: number of seconds from the ``Retry-After`` header, which may be
+             either a number or an HTTP date, or ``default`` if missing
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        until = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max((until - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _policy():
+    """
+    :return: ``(retries, max_wait)`` for calls made from the current thread
+    """
+    # pylint: disable=import-outside-toplevel
+    from trackers_integration import jobs
+
+    if jobs.is_worker():
+        return (
+            getattr(settings, "TRACKERS_INTEGRATION_RATE_RETRIES", 3),
+            getattr(settings, "TRACKERS_INTEGRATION_MAX_WAIT", 300),
+        )
+
+    return (
+        getattr(settings, "TRACKERS_INTEGRATION_INTERACTIVE_RETRIES", 0),
+        getattr(settings, "TRACKERS_INTEGRATION_INTERACTIVE_MAX_WAIT", 5),
+    )
+
+
+class Limiter:
+    """
+    Token bucket and adaptive concurrency limit for a single Issue Tracker.
+    """
+
+    def __init__(self, rate=0, burst=10, max_concurrency=10, base_url=""):
+        self.base_url = base_url
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._active = 0
+        self._condition = threading.Condition()
+
+    def reserve(self):
+        """
+        Take a token from the bucket.
+
+        :return: number of seconds to wait before sending the request
+        """
+        with self._condition:
+            now = time.monotonic()
+            delay = max(self._blocked_until - now, 0.0)
+
+            if self.rate:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                # tokens may go negative, which schedules the following requests
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.rate)
+
+            return delay
+
+    def _wait(self, deadline):
+        """
+        Take a token from the bucket and return the number of seconds to wait
+        before sending the request.
+
+        :raises TrackerUnavailable: if that's after ``deadline``
+        """
+        delay = self.reserve()
+        if time.monotonic() + delay > deadline:
+            with self._condition:
+                # give the token back, the request isn't going to be sent
+                self._tokens = min(self.burst, self._tokens + 1)
+            raise TrackerUnavailable(f"{self.base_url} is rate limited")
+        return delay
+
+    @contextlib.contextmanager
+    def slot(self, deadline=None):
+        """
+        Wait until the number of requests in flight is below the current
+        concurrency limit!
+
+        :raises TrackerUnavailable: if that doesn't happen before ``deadline``
+        """
+        with self._condition:
+            while self._active >= int(self.concurrency):
+                if deadline is None:
+                    self._condition.wait()
+                    continue
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TrackerUnavailable(f"{self.base_url} is too busy")
+                self._condition.wait(timeout=remaining)
+            self._active += 1
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def succeeded(self):
+        """
+        Additive increase, by one after ``concurrency`` successful requests
+        """
+        with self._condition:
+            self.concurrency = min(
+                self.max_concurrency, self.concurrency + 1 / self.concurrency
+            )
+            self._condition.notify_all()
+
+    def throttled(self, delay):
+        """
+        Multiplicative decrease and pause all requests for ``delay`` seconds
+        """
+        metrics.increment("trackers_integration_throttled_total", tracker=self.base_url)
+        with self._condition:
+            self.concurrency = max(1.0, self.concurrency / 2)
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def _throttle_delay(self, response, attempt):
+        """
+        :return: seconds to wait before retrying or ``None`` if the response
+                 doesn't mean that we've been throttled
+        """
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            delay = retry_after(response, 2**attempt)
+        elif response.status_code == HTTPStatus.SERVICE_UNAVAILABLE:
+            delay = retry_after(response, None)
+            if delay is None:
+                return None
+        else:
+            return None
+
+        return min(delay, getattr(settings, "TRACKERS_INTEGRATION_MAX_RETRY_AFTER", 60))
+
+    def call(self, send):
+        """
+        Call ``send()``, which returns a response, honoring the limits and
+        retrying throttled requests. The last response is returned in case
+        the Issue Tracker keeps throttling us!
+        """
+        retries, max_wait = _policy()
+        deadline = time.monotonic() + max_wait
+
+        for attempt in range(retries + 1):
+            delay = self._wait(deadline)
+            if delay:
+                time.sleep(delay)
+            with self.slot(deadline):
+                response = send()
+
+            delay = self._throttle_delay(response, attempt)
+            if delay is None:
+                self.succeeded()
+                return response
+
+            self.throttled(delay)
+            if attempt == retries or time.monotonic() + delay > deadline:
+                break
+
+            metrics.increment(
+                "trackers_integration_retries_total", tracker=self.base_url
+            )
+            response.close()
+
+        return response
+
+    async def acall(self, send):
+        """
+        Asynchronous version of :meth:`call`. Requests made from the same event
+        loop are limited by the connection pool instead of :meth:`slot`!
+        """
+        retries, max_wait = _policy()
+        deadline = time.monotonic() + max_wait
+
+        for attempt in range(retries + 1):
+            delay = self._wait(deadline)
+            if delay:
+                await asyncio.sleep(delay)
+            response = await send()
+
+            delay = self._throttle_delay(response, attempt)
+            if delay is None:
+                self.succeeded()
+                return response
+
+            self.throttled(delay)
+            if attempt == retries or time.monotonic() + delay > deadline:
+                break
+
+            metrics.increment(
+                "trackers_integration_retries_total", tracker=self.base_url
+            )
+            await response.aclose()
+
+        return response
+
+
+def get_limiter(base_url):
+    """
+    Return the :class:`Limiter` for an Issue Tracker, creating it on first use!
+    """
+    with _LOCK:
+        if base_url not in _LIMITERS:
+            limits = getattr(settings, "TRACKERS_INTEGRATION_RATE_LIMITS", {}).get(
+                base_url, {}
+            )
+            _LIMITERS[base_url] = Limiter(
+                rate=limits.get(
+                    "rate", getattr(settings, "TRACKERS_INTEGRATION_RATE_LIMIT", 0)
+                ),
+                burst=limits.get(
+                    "burst", getattr(settings, "TRACKERS_INTEGRATION_RATE_BURST", 10)
+                ),
+                max_concurrency=getattr(
+                    settings,
+                    "TRACKERS_INTEGRATION_MAX_PER_HOST",
+                    getattr(settings, "TRACKERS_INTEGRATION_POOL_SIZE", 10),
+                ),
+                base_url=base_url,
+            )
+        return _LIMITERS[base_url]
+
+
+def reset():
+    """
+    Forget all limiters, e.g. after settings have been changed during testing.
+    """
+    with _LOCK:
+        _LIMITERS.clear()
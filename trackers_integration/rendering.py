@@ -0,0 +1,139 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Cached conversion of Markdown to HTML for texts posted to Issue Trackers,
+e.g. the bodies of reported issues and the comments in Mantis BT.
+
+Texts posted for executions from the same TestRun differ only in a few
+fields, called slots, e.g. IDs, summaries and URLs. The text is generated
+once with unique sentinel tokens in place of these slots, the resulting
+template is converted to HTML once and kept in an LRU cache, and the actual
+values are substituted for the sentinels in the HTML afterwards. Other
+parts of the text, e.g. numbered steps in the test case, are never touched.
+
+Values which may affect the Markdown markup, e.g. contain ``*``, ``_`` or
+``<``, are never substituted. If a slot holds any of them, or a sentinel
+ends up transformed in the HTML, e.g. inside a header ID, the text is
+converted as a whole, which is slower but gives the same result.
+"""
+
+import functools
+import re
+import uuid
+
+from tcms.core.templatetags.extra_filters import markdown2html
+
+CACHE_SIZE = 256
+
+# unique per process so that it can't appear in the texts themselves
+_SENTINEL = f"TRACKERSINTEGRATION{uuid.uuid4().hex.upper()}SLOT"
+
+# letters, digits, single spaces and punctuation without meaning in Markdown.
+# Spaces after a dot are not allowed, e.g. "1. " is the start of a list
+RE_INERT = re.compile(r"[^\W_](?:[^\W_]|[.,:/?=%+@()'-]|(?<!\.) (?! ))*")
+
+
+def _sentinel(index):
+    """
+    Only letters after the prefix so that sentinels remain whole words
+    """
+    suffix = ""
+    while True:
+        index, remainder = divmod(index, 26)
+        suffix += chr(ord("A") + remainder)
+        if not index:
+            return f"{_SENTINEL}{suffix}"
+
+
+def _nested(slots, name):
+    """
+    :return: slots of the attribute ``name``, relative to it
+    """
+    return {
+        path.partition(".")[2]: sentinel
+        for path, sentinel in slots.items()
+        if path.startswith(f"{name}.")
+    }
+
+
+class _Slots:
+    """
+    Stands in place of an object, returning sentinels for its slots and
+    the attributes of the object itself for everything else
+    """
+
+    def __init__(self, obj, slots):
+        self._obj = obj
+        self._slots = slots
+
+    def __getattr__(self, name):
+        if name in self._slots:
+            return self._slots[name]
+        if f"{name}()" in self._slots:
+            sentinel = self._slots[f"{name}()"]
+            return lambda *args, **kwargs: sentinel
+
+        value = getattr(self._obj, name)
+        nested = _nested(self._slots, name)
+        return _Slots(value, nested) if nested else value
+
+    def __str__(self):
+        return str(self._obj)
+
+
+def _resolve(objects, path):
+    name, _, path = path.partition(".")
+    obj = objects[name]
+    for attribute in path.split("."):
+        if attribute.endswith("()"):
+            obj = getattr(obj, attribute[:-2])()
+        else:
+            obj = getattr(obj, attribute)
+    return obj
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _render_template(template):
+    return str(markdown2html(template))
+
+
+def render(make_text, objects, slots):
+    """
+    Convert the Markdown text returned by ``make_text(**objects)`` to HTML.
+
+    :param make_text: callable which returns Markdown text
+    :param objects: keyword arguments for ``make_text``, e.g.
+                    ``{"execution": execution}``
+    :param slots: paths of values in the text which are specific to these
+                  objects, e.g. ``execution.pk`` or ``execution.run.summary``.
+                  Methods are called, e.g. ``execution.get_full_url()``
+    :return: HTML
+    """
+    values = {}
+    for path in slots:
+        if objects.get(path.partition(".")[0]) is not None:
+            value = _resolve(objects, path)
+            # empty values are left in the template as-is
+            if value not in (None, ""):
+                values[path] = str(value)
+
+    if not all(RE_INERT.fullmatch(value) for value in values.values()):
+        return _render_template(make_text(**objects))
+
+    sentinels = {path: _sentinel(index) for index, path in enumerate(values)}
+    proxies = {}
+    for name, obj in objects.items():
+        own = _nested(sentinels, name)
+        proxies[name] = _Slots(obj, own) if own else obj
+
+    html = _render_template(make_text(**proxies))
+    # in reverse order, e.g. ...SLOTAB before ...SLOTA
+    for path, sentinel in reversed(sentinels.items()):
+        html = html.replace(sentinel, values[path])
+
+    if _SENTINEL.lower() in html.lower():
+        return _render_template(make_text(**objects))
+    return html
@@ -0,0 +1,242 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Shared pool of HTTP sessions used by the internal RPC classes.
+
+Sessions are keyed by ``(base_url, credentials)`` and are reused across
+``IssueTrackerType`` instances, which are created for every request, so that
+TCP and TLS connections to the same Issue Tracker are kept alive between calls.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_POOL_SIZE`` - max connections kept per host, default 10
+- ``TRACKERS_INTEGRATION_KEEP_ALIVE`` - reuse connections, default True
+- ``TRACKERS_INTEGRATION_POOL_IDLE_TIMEOUT`` - seconds after which an unused
+  session is removed from the pool, default 300
+- ``TRACKERS_INTEGRATION_TIMEOUT`` - ``(connect, read)`` timeouts in seconds
+  for requests which don't specify one, default ``(5, 30)``
+- ``TRACKERS_INTEGRATION_TIMEOUTS`` - dict of base_url -> ``(connect, read)``
+  which overrides the value above for individual Issue Trackers, default empty
+
+The asynchronous API classes use ``httpx.AsyncClient`` objects instead, which
+are pooled in the same way for every running event loop and honor the same
+settings. They are available only if ``httpx`` is installed!
+
+All requests are subject to the rate limits of the Issue Tracker, see
+:mod:`trackers_integration.ratelimit`, and to its circuit breaker, see
+:mod:`trackers_integration.breaker`. Connection errors and timeouts are
+raised as :class:`TrackerUnavailable`! Any exception counts as a failure. Every request is recorded by
+:mod:`trackers_integration.metrics`.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+import weakref
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import Timeout
+
+from django.conf import settings
+
+from trackers_integration import breaker, metrics, ratelimit
+from trackers_integration.breaker import TrackerUnavailable
+
+try:
+    import httpx
+except ModuleNotFoundError:
+    httpx = None  # pylint: disable=invalid-name
+
+_POOL = {}
+_ASYNC_POOL = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def timeout(base_url):
+    """
+    :return: ``(connect, read)`` timeouts for an Issue Tracker
+    """
+    return tuple(
+        getattr(settings, "TRACKERS_INTEGRATION_TIMEOUTS", {}).get(
+            base_url, getattr(settings, "TRACKERS_INTEGRATION_TIMEOUT", (5, 30))
+        )
+    )
+
+
+class TrackerSession(Session):
+    """
+    A ``requests.Session`` which sends every request via the rate limiter
+    and the circuit breaker of its Issue Tracker!
+    """
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.limiter = ratelimit.get_limiter(base_url)
+        self.breaker = breaker.get_breaker(base_url)
+        self.timeout = timeout(base_url)
+
+    def request(self, method, url, *args, **kwargs):  # pylint: disable=arguments-differ
+        kwargs.setdefault("timeout", self.timeout)
+        started_at = time.monotonic()
+        status = "rejected"
+        response = None
+
+        try:
+            with self.breaker.guard():
+                status = "error"
+                response = self.limiter.call(
+                    functools.partial(super().request, method, url, *args, **kwargs)
+                )
+                status = response.status_code
+        except (RequestsConnectionError, Timeout) as err:
+            raise TrackerUnavailable(str(err)) from err
+        finally:
+            metrics.record_request(
+                self.base_url,
+                method,
+                url,
+                status,
+                time.monotonic() - started_at,
+                response,
+            )
+
+        self.breaker.record(response)
+        return response
+
+
+if httpx is not None:
+
+    class TrackerTransport(httpx.AsyncHTTPTransport):
+        """
+        Asynchronous counterpart of :class:`TrackerSession`
+        """
+
+        def __init__(self, base_url, **kwargs):
+            super().__init__(**kwargs)
+            self.base_url = base_url
+            self.limiter = ratelimit.get_limiter(base_url)
+            self.breaker = breaker.get_breaker(base_url)
+
+        async def handle_async_request(self, request):
+            started_at = time.monotonic()
+            status = "rejected"
+            response = None
+
+            try:
+                with self.breaker.guard():
+                    status = "error"
+                    response = await self.limiter.acall(
+                        functools.partial(super().handle_async_request, request)
+                    )
+                    status = response.status_code
+            except httpx.TransportError as err:
+                raise TrackerUnavailable(str(err)) from err
+            finally:
+                metrics.record_request(
+                    self.base_url,
+                    request.method,
+                    str(request.url),
+                    status,
+                    time.monotonic() - started_at,
+                    response,
+                    request,
+                )
+
+            self.breaker.record(response)
+            return response
+
+
+def _new_session(base_url):
+    pool_size = getattr(settings, "TRACKERS_INTEGRATION_POOL_SIZE", 10)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+
+    session = TrackerSession(base_url)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if not getattr(settings, "TRACKERS_INTEGRATION_KEEP_ALIVE", True):
+        session.headers["Connection"] = "close"
+
+    return session
+
+
+def _evict_idle(now):
+    """
+    Remove idle sessions from the pool. They aren't closed b/c they may still
+    be in use, e.g. by a slow call or while a streamed response is being read;
+    their connections are closed once they are garbage collected!
+    """
+    idle_timeout = getattr(settings, "TRACKERS_INTEGRATION_POOL_IDLE_TIMEOUT", 300)
+
+    for key, (_session, last_used) in list(_POOL.items()):
+        if now - last_used > idle_timeout:
+            del _POOL[key]
+
+
+def get_session(base_url, *credentials):
+    """
+    Return a pooled ``requests.Session`` for the given Issue Tracker
+    and credentials. A new session is created on first use!
+    """
+    key = (base_url, credentials)
+    now = time.monotonic()
+
+    with _LOCK:
+        _evict_idle(now)
+
+        if key in _POOL:
+            session, _ = _POOL[key]
+        else:
+            session = _new_session(base_url)
+
+        _POOL[key] = (session, now)
+        return session
+
+
+def get_async_client(base_url, *credentials, verify=True):
+    """
+    Return a pooled ``httpx.AsyncClient`` for the given Issue Tracker
+    and credentials, bound to the currently running event loop!
+    """
+    if httpx is None:
+        raise RuntimeError("Asynchronous API requires the httpx package")
+
+    loop = asyncio.get_running_loop()
+    key = (base_url, credentials, verify)
+
+    with _LOCK:
+        clients = _ASYNC_POOL.setdefault(loop, {})
+        if key not in clients:
+            pool_size = getattr(settings, "TRACKERS_INTEGRATION_POOL_SIZE", 10)
+            keep_alive = getattr(settings, "TRACKERS_INTEGRATION_KEEP_ALIVE", True)
+            limits = httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size if keep_alive else 0,
+                keepalive_expiry=getattr(
+                    settings, "TRACKERS_INTEGRATION_POOL_IDLE_TIMEOUT", 300
+                ),
+            )
+            connect, read = timeout(base_url)
+            transport = TrackerTransport(base_url, limits=limits, verify=verify)
+            clients[key] = httpx.AsyncClient(
+                transport=transport, timeout=httpx.Timeout(read, connect=connect)
+            )
+
+        return clients[key]
+
+
+def close_all():
+    """
+    Close all pooled sessions, e.g. when shutting down or during testing.
+    """
+    with _LOCK:
+        for session, _ in _POOL.values():
+            session.close()
+        _POOL.clear()
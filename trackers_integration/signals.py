@@ -0,0 +1,62 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+# pylint: disable=unused-argument, import-outside-toplevel
+
+"""
+Signal handlers which keep the various caches in sync with the database.
+They are connected inside ``AppConfig.ready()``!
+"""
+
+
+def handle_api_token_pre_save(sender, instance, raw=False, **kwargs):
+    """
+    Compute ``url_hash``, also for fixtures, and invalidate the cached value
+    for the previous owner & base_url in case they are being changed!
+    """
+    from trackers_integration.models import base_url_hash
+
+    instance.url_hash = base_url_hash(instance.base_url)
+    if raw or not instance.pk:
+        return
+
+    from trackers_integration.auth import invalidate_api_token
+
+    previous = sender.objects.filter(pk=instance.pk).values("owner_id", "base_url")
+    for values in previous:
+        invalidate_api_token(values["owner_id"], values["base_url"])
+
+
+def handle_api_token_post_save(sender, instance, raw=False, **kwargs):
+    from trackers_integration.auth import invalidate_api_token
+
+    invalidate_api_token(instance.owner_id, instance.base_url)
+
+
+def handle_api_token_post_delete(sender, instance, **kwargs):
+    from trackers_integration.auth import invalidate_api_token
+
+    invalidate_api_token(instance.owner_id, instance.base_url)
+
+
+def handle_bug_system_post_save(sender, instance, raw=False, **kwargs):
+    from trackers_integration import url_index
+
+    url_index.update(instance)
+
+
+def handle_bug_system_post_delete(sender, instance, **kwargs):
+    from trackers_integration import url_index
+
+    url_index.remove(instance)
+
+
+def handle_post_migrate(sender, **kwargs):
+    """
+    Index the Issue Trackers which existed before upgrading!
+    """
+    from trackers_integration import url_index
+
+    url_index.backfill()
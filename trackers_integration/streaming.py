@@ -0,0 +1,295 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Incremental decoding of large JSON responses, e.g. the list of projects in
+Mantis BT or the activities of a WorkPackage in OpenProject.
+
+Instead of loading the entire response body and calling ``.json()`` on it,
+the elements of a single array are decoded one by one while the body is
+being downloaded, via ``response.iter_content()``. Only the elements, or
+only some of their fields, are kept in memory. Requests must be sent with
+``stream=True`` for this to work!
+
+Smaller responses are decoded as a whole via :func:`read_json`, or read via
+:func:`read_body` if they aren't JSON. Both read the body in chunks so that
+the size limit applies even when the Issue Tracker doesn't send
+``Content-Length``.
+
+Incremental decoding requires ``ijson``. Without it the body is decoded
+as a whole, still subject to the size limit below.
+
+Can be controlled via the following configuration settings:
+
+- ``TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE`` - max number of bytes read from
+  a single response, default 32 MiB. Set to ``None`` for unlimited
+"""
+
+import json
+
+from django.conf import settings
+
+try:
+    import ijson
+except ModuleNotFoundError:
+    ijson = None  # pylint: disable=invalid-name
+
+CHUNK_SIZE = 64 * 1024
+
+_SCALAR_EVENTS = ("null", "boolean", "integer", "double", "number", "string")
+
+
+class ResponseTooLarge(RuntimeError):
+    """
+    Raised when a response is larger than ``TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE``!
+    """
+
+
+def max_size():
+    return getattr(settings, "TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE", 32 * 1024 * 1024)
+
+
+def _size_error(response):
+    limit = max_size()
+    length = response.headers.get("Content-Length")
+    if limit is not None and length is not None and int(length) > limit:
+        return ResponseTooLarge(
+            f"{response.url} returned {length} bytes, the limit is {limit}"
+        )
+    return None
+
+
+def check_size(response):
+    """
+    :raises ResponseTooLarge: if the ``Content-Length`` of ``response`` is
+                              above the limit, without reading the body
+    """
+    error = _size_error(response)
+    if error is not None:
+        response.close()
+        raise error
+
+
+async def acheck_size(response):
+    """
+    Asynchronous version of :func:`check_size` for ``httpx`` responses
+    """
+    error = _size_error(response)
+    if error is not None:
+        await response.aclose()
+        raise error
+
+
+class _LimitedReader:  # pylint: disable=too-few-public-methods
+    """
+    File-like object over ``response.iter_content()`` which raises
+    :class:`ResponseTooLarge` once more than the allowed bytes have been read
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.limit = max_size()
+        self.size = 0
+        self._chunks = response.iter_content(CHUNK_SIZE)
+
+    def read(self, size=-1):
+        # ijson calls read(0) in order to find out the type of the content
+        if size == 0:
+            return b""
+
+        chunk = next(self._chunks, b"")
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            raise ResponseTooLarge(
+                f"{self.response.url} returned more than {self.limit} bytes"
+            )
+        return chunk
+
+
+def _read(response):
+    reader = _LimitedReader(response)
+    return b"".join(iter(reader.read, b""))
+
+
+def read_body(response):
+    """
+    Read the entire body of ``response``, which must have been sent with
+    ``stream=True``, e.g. for responses which aren't JSON. The response is
+    closed afterwards!
+
+    :raises ResponseTooLarge: if the body is larger than the limit
+    """
+    check_size(response)
+    try:
+        return _read(response)
+    finally:
+        response.close()
+
+
+def read_json(response):
+    """
+    Decode the entire JSON body of ``response``, which must have been sent
+    with ``stream=True``. The response is closed afterwards!
+
+    :raises ResponseTooLarge: if the body is larger than the limit
+    """
+    return json.loads(read_body(response))
+
+
+async def aread_json(response):
+    """
+    Asynchronous version of :func:`read_json` for streamed ``httpx`` responses
+    """
+    await acheck_size(response)
+    reader = _AsyncLimitedReader(response)
+    chunks = []
+    try:
+        chunk = await reader.read()
+        while chunk:
+            chunks.append(chunk)
+            chunk = await reader.read()
+    finally:
+        await response.aclose()
+
+    return json.loads(b"".join(chunks))
+
+
+class _AsyncLimitedReader:  # pylint: disable=too-few-public-methods
+    """
+    Asynchronous version of :class:`_LimitedReader` for ``httpx`` responses
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.limit = max_size()
+        self.size = 0
+        self._chunks = response.aiter_bytes(CHUNK_SIZE)
+
+    async def read(self, size=-1):
+        if size == 0:
+            return b""
+
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            raise ResponseTooLarge(
+                f"{self.response.url} returned more than {self.limit} bytes"
+            )
+        return chunk
+
+
+def _select(value, fields):
+    if fields is None or not isinstance(value, dict):
+        return value
+    return {name: value[name] for name in fields if name in value}
+
+
+def _walk(document, path, fields):
+    """
+    Yield the values at ``path`` of an already decoded document, using the
+    same syntax as ``ijson``, e.g. ``projects.item``
+    """
+    if not path:
+        yield _select(document, fields)
+        return
+
+    name, _, rest = path.partition(".")
+    if name == "item":
+        for value in document if isinstance(document, list) else []:
+            yield from _walk(value, rest, fields)
+    elif isinstance(document, dict) and name in document:
+        yield from _walk(document[name], rest, fields)
+
+
+class _Selector:  # pylint: disable=too-few-public-methods
+    """
+    Builds the elements at ``path`` out of ``ijson`` parser events
+    """
+
+    def __init__(self, path, fields, found):
+        self.path = path
+        self.fields = fields
+        self.found = found
+        self._builder = None
+
+    def event(self, prefix, event, value):
+        """
+        :return: list of the elements completed by this event
+        """
+        if self._builder is not None:
+            self._builder.event(event, value)
+            if prefix == self.path and event in ("end_map", "end_array"):
+                value, self._builder = self._builder.value, None
+                return [_select(value, self.fields)]
+        elif prefix == self.path and event in ("start_map", "start_array"):
+            self._builder = ijson.ObjectBuilder()
+            self._builder.event(event, value)
+        elif prefix == self.path and event in _SCALAR_EVENTS:
+            return [value]
+        elif (
+            self.found is not None and prefix in self.found and event in _SCALAR_EVENTS
+        ):
+            self.found[prefix] = value
+        return []
+
+
+def _walk_document(document, path, fields, found):
+    yield from _walk(document, path, fields)
+    for key in found or {}:
+        found[key] = next(_walk(document, key, None), None)
+
+
+def iter_items(response, path, fields=None, found=None):
+    """
+    Yield the elements of the JSON array at ``path`` of the response body,
+    e.g. ``projects.item`` or ``_embedded.elements.item``, decoding them
+    one at a time. The response is closed afterwards!
+
+    :param fields: keep only these keys of every element, default all
+    :param found: optional dict of path -> value, e.g.
+                  ``{"_links.nextByOffset.href": None}``. Values of these
+                  scalars are filled in once the body has been decoded
+    :raises ResponseTooLarge: if the body is larger than the limit
+    """
+    check_size(response)
+    try:
+        if ijson is None:
+            yield from _walk_document(json.loads(_read(response)), path, fields, found)
+            return
+
+        selector = _Selector(path, fields, found)
+        for prefix, event, value in ijson.parse(
+            _LimitedReader(response), use_float=True
+        ):
+            yield from selector.event(prefix, event, value)
+    finally:
+        response.close()
+
+
+async def aiter_items(response, path, fields=None, found=None):
+    """
+    Asynchronous version of :func:`iter_items` for streamed ``httpx``
+    responses, use with ``async for``!
+    """
+    if ijson is None:
+        document = await aread_json(response)
+        for item in _walk_document(document, path, fields, found):
+            yield item
+        return
+
+    await acheck_size(response)
+    try:
+        selector = _Selector(path, fields, found)
+        async for prefix, event, value in ijson.parse(
+            _AsyncLimitedReader(response), use_float=True
+        ):
+            for item in selector.event(prefix, event, value):
+                yield item
+    finally:
+        await response.aclose()
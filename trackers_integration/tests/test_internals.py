@@ -3,10 +3,18 @@
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from http import HTTPStatus
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 
+from django.contrib import admin
 from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
+from requests.exceptions import ChunkedEncodingError
 
 from django_tenants.utils import (  # pylint: disable=import-error
     get_tenant_model,
@@ -15,13 +23,35 @@ from django_tenants.utils import (  # pylint: disable=import-error
     schema_context,
 )
 
+from tcms.core.contrib.linkreference.models import LinkReference
+from tcms.core.templatetags.extra_filters import markdown2html
 from tcms.kiwi_auth.tests import __FOR_TESTING__
-from tcms.tests.factories import UserFactory
+from tcms.tests.factories import TestExecutionFactory, UserFactory
 from tcms.testcases.models import BugSystem
 from tcms.utils.permissions import initiate_user_with_default_setups
 
 from tcms_tenants.tests import LoggedInTestCase  # pylint: disable=import-error
-from trackers_integration.models import ApiToken
+from trackers_integration import (
+    auth,
+    breaker,
+    executor,
+    jobs,
+    metrics,
+    ratelimit,
+    rendering,
+    sessions,
+    streaming,
+    url_index,
+)
+from trackers_integration.admin import ApiTokenAdmin
+from trackers_integration.breaker import CircuitBreaker, TrackerUnavailable
+from trackers_integration.models import (
+    ApiToken,
+    BugSystemUrl,
+    TrackerJob,
+    base_url_hash,
+)
+from trackers_integration.ratelimit import Limiter
 
 
 def initialize_permissions(user):
@@ -162,6 +192,61 @@ class TestApiTokenAdmin(LoggedInTestCase):
             "Select a valid choice. http://invalid.com is not one of the available choices.",
         )
 
+    def test_dropdown_select_is_updated_when_bug_trackers_change(self):
+        option = (
+            '<option value="https://temporary.example.com">'
+            "https://temporary.example.com</option>"
+        )
+        with tenant_context(self.tenant2):
+            bug_system = BugSystem.objects.create(
+                name="Temporary",
+                tracker_type="trackers_integration.issuetracker.Trac",
+                base_url="https://temporary.example.com",
+            )
+
+        response = self.client.get(reverse("admin:trackers_integration_apitoken_add"))
+        self.assertContains(response, option, html=True)
+
+        with tenant_context(self.tenant2):
+            bug_system.delete()
+
+        response = self.client.get(reverse("admin:trackers_integration_apitoken_add"))
+        self.assertNotContains(response, option, html=True)
+
+    def test_choices_are_built_with_a_single_query(self):
+        model_admin = ApiTokenAdmin(ApiToken, admin.site)
+        request = RequestFactory().get("/")
+        request.user = self.tester
+
+        with self.assertNumQueries(1):
+            choices = model_admin.get_issuetracker_urls(request)
+
+        self.assertIn(("https://bugzilla.org", "https://bugzilla.org"), choices)
+
+    def test_adding_a_second_token_for_the_same_bug_tracker_fails(self):
+        for _ in range(2):
+            response = self.client.post(
+                reverse("admin:trackers_integration_apitoken_add"),
+                {
+                    "base_url": "https://mantis.example.com:8443/mantisbt",
+                    "api_username": "kiwitcms-bot",
+                    "api_password": __FOR_TESTING__,
+                },
+                follow=True,
+            )
+
+        self.assertContains(response, "Please correct the error below")
+        self.assertContains(
+            response, "You already have an API token for this Issue Tracker!"
+        )
+        self.assertEqual(
+            1,
+            ApiToken.objects.filter(
+                owner=self.tester,
+                base_url="https://mantis.example.com:8443/mantisbt",
+            ).count(),
+        )
+
     def test_changelist_view_doesnt_show_records_from_other_users(self):
         response = self.client.get(
             reverse("admin:trackers_integration_apitoken_changelist")
@@ -275,3 +360,669 @@ class TestApiTokenAdmin(LoggedInTestCase):
             response, f"The api token “{self_token}” was deleted successfully."
         )
         self.assertContains(response, "Api tokens")
+
+
+class TestCircuitBreaker(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = patch("trackers_integration.breaker.time.monotonic")
+        patcher.start().side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+        self.breaker = CircuitBreaker(
+            "https://tracker.example.com",
+            threshold=2,
+            reset_timeout=30,
+            probe_timeout=60,
+        )
+
+    def _open(self):
+        for _ in range(self.breaker.threshold):
+            self.breaker.before_call()
+            self.breaker.failed()
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        self.breaker.failed()
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+
+        self.breaker.failed()
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+        with self.assertRaises(TrackerUnavailable):
+            self.breaker.before_call()
+
+    def test_successful_probe_closes_the_circuit(self):
+        self._open()
+
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, self.breaker.state)
+
+        # only a single probe is let through
+        with self.assertRaises(TrackerUnavailable):
+            self.breaker.before_call()
+
+        self.breaker.succeeded()
+        self.assertEqual(CircuitBreaker.CLOSED, self.breaker.state)
+        self.assertEqual(0, self.breaker.failures)
+        self.breaker.before_call()
+
+    def test_failed_probe_opens_the_circuit_again(self):
+        self._open()
+
+        self.now += 30
+        self.breaker.before_call()
+        self.breaker.failed()
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+
+        with self.assertRaises(TrackerUnavailable):
+            self.breaker.before_call()
+
+    def test_any_exception_during_the_probe_counts_as_failure(self):
+        self._open()
+
+        self.now += 30
+        with self.assertRaises(ValueError):
+            with self.breaker.guard():
+                raise ValueError("not a connection error")
+
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+
+    def test_probe_which_never_finishes_opens_the_circuit_again(self):
+        self._open()
+
+        self.now += 30
+        self.breaker.before_call()
+
+        self.now += 60
+        with self.assertRaises(TrackerUnavailable):
+            self.breaker.before_call()
+        self.assertEqual(CircuitBreaker.OPEN, self.breaker.state)
+
+        # another probe after the reset timeout
+        self.now += 30
+        self.breaker.before_call()
+        self.assertEqual(CircuitBreaker.HALF_OPEN, self.breaker.state)
+
+    def test_session_records_failure_for_any_exception(self):
+        breaker.reset()
+        session = sessions.TrackerSession("https://broken.example.com")
+        self.addCleanup(breaker.reset)
+        self.addCleanup(session.close)
+
+        with patch(
+            "requests.Session.request", side_effect=ChunkedEncodingError("broken")
+        ):
+            with self.assertRaises(ChunkedEncodingError):
+                session.get("https://broken.example.com/api")
+
+        self.assertEqual(1, session.breaker.failures)
+
+
+def _response(status_code, retry_after=None):
+    response = Mock(status_code=status_code, headers={})
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+class TestRateLimiter(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        patcher = patch("trackers_integration.ratelimit.time.monotonic")
+        patcher.start().side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+        patcher = patch("trackers_integration.ratelimit.time.sleep")
+        self.sleep = patcher.start()
+        self.sleep.side_effect = self._sleep
+        self.addCleanup(patcher.stop)
+
+        self.limiter = Limiter(rate=2, burst=2, max_concurrency=4)
+        self.addCleanup(jobs.set_worker, False)
+
+    def _sleep(self, delay):
+        # nothing is in flight while waiting
+        self.assertEqual(0, self.limiter._active)  # pylint: disable=protected-access
+        self.now += delay
+
+    def test_token_bucket_allows_bursts_then_schedules_requests(self):
+        self.assertEqual(0, self.limiter.reserve())
+        self.assertEqual(0, self.limiter.reserve())
+        self.assertEqual(0.5, self.limiter.reserve())
+        self.assertEqual(1.0, self.limiter.reserve())
+
+        self.now += 10
+        self.assertEqual(0, self.limiter.reserve())
+
+    def test_waiting_for_a_slot_is_bounded_by_the_deadline(self):
+        limiter = Limiter(max_concurrency=1)
+        waits = []
+
+        def wait(timeout=None):
+            waits.append(timeout)
+            # nobody releases the slot
+            self.now += timeout
+
+        condition = limiter._condition  # pylint: disable=protected-access
+        with limiter.slot(), patch.object(condition, "wait", side_effect=wait):
+            with self.assertRaises(TrackerUnavailable):
+                with limiter.slot(deadline=self.now + 5):
+                    pass
+
+        self.assertEqual([5], waits)
+        # the slot is free again
+        with limiter.slot(deadline=self.now):
+            pass
+
+    def test_interactive_calls_fail_fast_when_all_slots_are_taken(self):
+        limiter = Limiter(max_concurrency=1)
+
+        def wait(timeout=None):
+            self.now += timeout
+
+        condition = limiter._condition  # pylint: disable=protected-access
+        with limiter.slot(), patch.object(condition, "wait", side_effect=wait):
+            with self.assertRaises(TrackerUnavailable):
+                limiter.call(lambda: _response(200))
+
+    def test_retry_after_in_seconds(self):
+        self.assertEqual(7, ratelimit.retry_after(_response(429, "7"), 1))
+        self.assertEqual(0, ratelimit.retry_after(_response(429, "-3"), 1))
+
+    def test_retry_after_as_http_date(self):
+        until = datetime.now(timezone.utc) + timedelta(seconds=120)
+        delay = ratelimit.retry_after(
+            _response(429, format_datetime(until, usegmt=True)), 1
+        )
+        self.assertTrue(100 < delay <= 120)
+
+    def test_retry_after_missing_or_invalid(self):
+        self.assertEqual(1, ratelimit.retry_after(_response(429), 1))
+        self.assertEqual(1, ratelimit.retry_after(_response(429, "soon"), 1))
+
+    def test_concurrency_is_halved_when_throttled_and_grows_back_slowly(self):
+        self.limiter.throttled(1)
+        self.assertEqual(2, self.limiter.concurrency)
+        self.limiter.throttled(1)
+        self.assertEqual(1, self.limiter.concurrency)
+        self.limiter.throttled(1)
+        self.assertEqual(1, self.limiter.concurrency)
+
+        self.limiter.succeeded()
+        self.assertEqual(2, self.limiter.concurrency)
+        # by one after a window of 2 successful requests
+        self.limiter.succeeded()
+        self.limiter.succeeded()
+        self.assertEqual(2, int(self.limiter.concurrency))
+        self.limiter.succeeded()
+        self.assertEqual(3, int(self.limiter.concurrency))
+
+        for _ in range(10):
+            self.limiter.succeeded()
+        self.assertEqual(4, self.limiter.concurrency)
+
+    def test_throttled_requests_are_not_retried_while_a_user_is_waiting(self):
+        send = Mock(return_value=_response(429, "1"))
+
+        response = self.limiter.call(send)
+
+        self.assertEqual(429, response.status_code)
+        send.assert_called_once()
+        self.sleep.assert_not_called()
+
+    def test_throttled_requests_are_retried_in_background_jobs(self):
+        jobs.set_worker(True)
+        send = Mock(
+            side_effect=[_response(429, "3"), _response(503, "5"), _response(200)]
+        )
+
+        response = self.limiter.call(send)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(3, send.call_count)
+        self.assertEqual(1000 + 3 + 5, self.now)
+
+    def test_retries_stop_when_they_would_exceed_max_wait(self):
+        jobs.set_worker(True)
+        send = Mock(return_value=_response(429, "50"))
+
+        with self.settings(TRACKERS_INTEGRATION_MAX_WAIT=120):
+            response = self.limiter.call(send)
+
+        self.assertEqual(429, response.status_code)
+        self.assertEqual(3, send.call_count)
+
+    def test_fails_instead_of_waiting_longer_than_allowed(self):
+        self.limiter.throttled(30)
+        send = Mock(return_value=_response(200))
+
+        with self.assertRaises(TrackerUnavailable):
+            self.limiter.call(send)
+
+        send.assert_not_called()
+        self.sleep.assert_not_called()
+
+
+class TestApiTokenUrlHash(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = UserFactory()
+
+    def _hash(self, pk):
+        return ApiToken.objects.get(pk=pk).url_hash
+
+    def test_only_case_default_port_and_trailing_slash_are_normalized(self):
+        self.assertEqual(
+            base_url_hash("https://mantis.example.com/mantisbt"),
+            base_url_hash("HTTPS://Mantis.Example.com:443/mantisbt/"),
+        )
+        self.assertNotEqual(
+            base_url_hash("https://mantis.example.com/mantisbt"),
+            base_url_hash("http://mantis.example.com/mantisbt"),
+        )
+
+    def test_url_hash_is_updated_by_bulk_writes(self):
+        token = ApiToken.objects.bulk_create(
+            [ApiToken(owner=self.owner, base_url="https://a.example.com/")]
+        )[0]
+        self.assertEqual(base_url_hash("https://a.example.com"), self._hash(token.pk))
+
+        token.base_url = "https://b.example.com"
+        ApiToken.objects.bulk_update([token], ["base_url"])
+        self.assertEqual(base_url_hash("https://b.example.com"), self._hash(token.pk))
+
+        ApiToken.objects.filter(pk=token.pk).update(base_url="https://c.example.com")
+        self.assertEqual(base_url_hash("https://c.example.com"), self._hash(token.pk))
+
+    def test_url_hash_is_updated_with_update_fields(self):
+        token = ApiToken.objects.create(
+            owner=self.owner, base_url="https://a.example.com"
+        )
+
+        token.base_url = "https://b.example.com"
+        token.save(update_fields=["base_url"])
+        self.assertEqual(base_url_hash("https://b.example.com"), self._hash(token.pk))
+
+
+class TestReadJson(SimpleTestCase):
+    @staticmethod
+    def _response(chunks, headers=None):
+        response = Mock(url="https://tracker.example.com/api", headers=headers or {})
+        response.iter_content.return_value = iter(chunks)
+        return response
+
+    def test_body_is_decoded_and_the_response_closed(self):
+        response = self._response([b'{"issues": ', b"[1, 2]}"])
+
+        self.assertEqual({"issues": [1, 2]}, streaming.read_json(response))
+        response.close.assert_called_once()
+
+    @override_settings(TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE=10)
+    def test_size_is_limited_without_content_length(self):
+        response = self._response([b'{"issues": ', b"[1, 2]}"])
+
+        with self.assertRaises(streaming.ResponseTooLarge):
+            streaming.read_json(response)
+        response.close.assert_called_once()
+
+    @override_settings(TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE=10)
+    def test_body_isnt_read_when_content_length_is_too_large(self):
+        response = self._response([b"{}"], {"Content-Length": "11"})
+
+        with self.assertRaises(streaming.ResponseTooLarge):
+            streaming.read_json(response)
+        response.iter_content.assert_not_called()
+
+    @override_settings(TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE=10)
+    def test_size_of_other_bodies_is_limited(self):
+        response = self._response([b"id\r\n1\r\n", b"2\r\n3\r\n"])
+
+        with self.assertRaises(streaming.ResponseTooLarge):
+            streaming.read_body(response)
+        response.close.assert_called_once()
+
+        response = self._response([b"id\r\n", b"1\r\n"])
+        self.assertEqual(b"id\r\n1\r\n", streaming.read_body(response))
+
+
+class TestUrlIndex(TestCase):
+    tenant = getattr(connection, "schema_name", "")
+
+    def test_existing_bug_systems_are_indexed_after_migrations(self):
+        bug_system = BugSystem.objects.create(
+            name="Indexed after upgrade",
+            tracker_type="trackers_integration.issuetracker.Mantis",
+            base_url="https://backfill.example.com",
+        )
+        # as if it existed before upgrading
+        BugSystemUrl.objects.all().delete()
+
+        self.assertEqual(1, url_index.backfill())
+        self.assertEqual(
+            ["https://backfill.example.com"], url_index.base_urls([self.tenant])
+        )
+
+        # already indexed tenants are left as-is
+        BugSystem.objects.create(
+            name="Indexed via signals",
+            tracker_type="trackers_integration.issuetracker.Mantis",
+            base_url="https://signals.example.com",
+        )
+        bug_system.delete()
+        self.assertEqual(0, url_index.backfill())
+        self.assertEqual(
+            ["https://signals.example.com"], url_index.base_urls([self.tenant])
+        )
+
+
+class TestRendering(SimpleTestCase):
+    slots = ("execution.pk", "execution.run.pk", "execution.case.summary")
+
+    @staticmethod
+    def _text(execution):
+        return f"""TR-{execution.run.pk}, TE-{execution.pk}: {execution.case.summary}
+
+{execution.case.text}"""
+
+    @staticmethod
+    def _execution(pk, summary, text):
+        return SimpleNamespace(
+            pk=pk,
+            run=SimpleNamespace(pk=pk),
+            case=SimpleNamespace(summary=summary, text=text),
+        )
+
+    def test_only_slots_are_substituted(self):
+        text = "# Step 1\n\n1. Open page 1\n2. Click button 1\n\n## 1\n\n1"
+        for pk in (1, 2):
+            execution = self._execution(pk, f"Case {pk}", text)
+
+            self.assertEqual(
+                str(markdown2html(self._text(execution))),
+                rendering.render(self._text, {"execution": execution}, self.slots),
+            )
+
+    def test_values_with_markup_are_not_substituted(self):
+        execution = self._execution(3, "Case *3*", "1. step")
+
+        self.assertEqual(
+            str(markdown2html(self._text(execution))),
+            rendering.render(self._text, {"execution": execution}, self.slots),
+        )
+
+
+class TestRunConcurrently(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch("trackers_integration.executor.connection")
+        self.connection = patcher.start()
+        self.connection.tenant = "tenant-1"
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _tracker():
+        def double(value):
+            if value < 0:
+                raise ValueError(value)
+            return value * 2
+
+        return SimpleNamespace(double=double)
+
+    def test_results_are_in_order_with_exceptions_in_place(self):
+        results = executor.run_concurrently(
+            self._tracker(), "double", [(1,), (-1,), (3,)]
+        )
+
+        self.assertEqual(2, results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(6, results[2])
+
+    def test_no_arguments(self):
+        self.assertEqual([], executor.run_concurrently(self._tracker(), "double", []))
+        self.connection.set_tenant.assert_not_called()
+
+    def test_worker_threads_switch_to_the_callers_tenant(self):
+        executor.run_concurrently(self._tracker(), "double", [(1,), (2,)])
+
+        self.assertEqual(2, self.connection.set_tenant.call_count)
+        self.connection.set_tenant.assert_called_with("tenant-1")
+        self.assertEqual(2, self.connection.close.call_count)
+
+    def test_tenant_is_not_switched_without_tenants(self):
+        del self.connection.tenant
+
+        executor.run_concurrently(self._tracker(), "double", [(1,)])
+
+        self.connection.set_tenant.assert_not_called()
+
+    def test_worker_threads_inherit_the_job_worker_flag(self):
+        tracker = SimpleNamespace(is_worker=jobs.is_worker)
+
+        jobs.set_worker(True)
+        try:
+            results = executor.run_concurrently(tracker, "is_worker", [()])
+        finally:
+            jobs.set_worker(False)
+        self.assertEqual([True], results)
+
+        results = executor.run_concurrently(tracker, "is_worker", [()])
+        self.assertEqual([False], results)
+
+
+class TestLinkIssues(TestCase):
+    def test_existing_and_repeated_links_are_skipped(self):
+        execution = TestExecutionFactory()
+        LinkReference.objects.create(
+            execution=execution, url="https://tracker.example.com/1", is_defect=True
+        )
+
+        executor.link_issues(
+            [
+                (execution, "https://tracker.example.com/1"),
+                (execution, "https://tracker.example.com/2"),
+                (execution, "https://tracker.example.com/2"),
+            ]
+        )
+
+        self.assertEqual(
+            ["https://tracker.example.com/1", "https://tracker.example.com/2"],
+            sorted(
+                LinkReference.objects.filter(execution=execution).values_list(
+                    "url", flat=True
+                )
+            ),
+        )
+
+
+class TestSessionPool(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        sessions.close_all()
+        self.addCleanup(sessions.close_all)
+
+        self.now = 1000.0
+        patcher = patch("trackers_integration.sessions.time.monotonic")
+        patcher.start().side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+
+    def test_sessions_are_reused_per_base_url_and_credentials(self):
+        session = sessions.get_session("https://tracker.example.com", "alice", "secret")
+
+        self.assertIs(
+            session,
+            sessions.get_session("https://tracker.example.com", "alice", "secret"),
+        )
+        self.assertIsNot(
+            session,
+            sessions.get_session("https://tracker.example.com", "alice", "changed"),
+        )
+        self.assertIsNot(
+            session,
+            sessions.get_session("https://other.example.com", "alice", "secret"),
+        )
+
+    @override_settings(TRACKERS_INTEGRATION_POOL_IDLE_TIMEOUT=60)
+    def test_idle_sessions_are_evicted_without_closing_them(self):
+        idle = sessions.get_session("https://tracker.example.com", "alice")
+        self.now += 30
+        active = sessions.get_session("https://other.example.com", "bob")
+
+        self.now += 31
+        # may still be used by a slow call, left to the garbage collector
+        with patch.object(idle, "close") as idle_close:
+            self.assertIs(
+                active, sessions.get_session("https://other.example.com", "bob")
+            )
+            self.assertIsNot(
+                idle, sessions.get_session("https://tracker.example.com", "alice")
+            )
+
+        idle_close.assert_not_called()
+
+    @override_settings(TRACKERS_INTEGRATION_POOL_IDLE_TIMEOUT=60)
+    def test_using_a_session_keeps_it_in_the_pool(self):
+        session = sessions.get_session("https://tracker.example.com", "alice")
+
+        for _ in range(3):
+            self.now += 50
+            self.assertIs(
+                session, sessions.get_session("https://tracker.example.com", "alice")
+            )
+
+
+class TestTokenCacheMetrics(TestCase):
+    def test_hits_and_misses_are_recorded(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        user = UserFactory()
+        base_url = "https://tracker.example.com"
+        auth.invalidate_api_token(user.pk, base_url)
+
+        auth.get_api_token(user.pk, base_url)
+        auth.get_api_token(user.pk, base_url)
+        auth._LOCAL_CACHE.clear()  # pylint: disable=protected-access
+        auth.get_api_token(user.pk, base_url)
+
+        rendered = metrics.get_sink().render()
+        for result in ("miss", "local_hit", "shared_hit"):
+            self.assertIn(
+                f'trackers_integration_token_cache_total{{result="{result}"}} 1',
+                rendered,
+            )
+
+
+@override_settings(
+    TRACKERS_INTEGRATION_JOB_BACKOFF=10,
+    TRACKERS_INTEGRATION_JOB_LEASE=600,
+    TRACKERS_INTEGRATION_JOB_MAX_ATTEMPTS=2,
+)
+class TestJobQueue(TestCase):
+    @staticmethod
+    def _job(**kwargs):
+        return TrackerJob.objects.create(
+            action=TrackerJob.COMMENT, bug_system_id=1, execution_id=1, **kwargs
+        )
+
+    def test_backoff_doubles_after_every_attempt(self):
+        self.assertEqual(
+            [10, 10, 20, 40],
+            [
+                jobs._backoff(
+                    attempts
+                ).total_seconds()  # pylint: disable=protected-access
+                for attempts in range(4)
+            ],
+        )
+
+    def test_claim_jobs_takes_only_pending_jobs_which_are_due(self):
+        now = datetime.now(timezone.utc)
+        due = self._job()
+        self._job(next_attempt_at=now + timedelta(hours=1))
+        self._job(status=TrackerJob.FAILED)
+
+        claimed = jobs.claim_jobs()
+
+        self.assertEqual([due.pk], [job.pk for job in claimed])
+        due.refresh_from_db()
+        self.assertEqual(1, due.attempts)
+        # reserved for longer than the backoff, e.g. while waiting for rate limits
+        self.assertGreaterEqual(due.next_attempt_at, now + timedelta(seconds=600))
+
+        # already claimed, other workers skip it until the backoff expires
+        self.assertEqual([], jobs.claim_jobs())
+
+    def test_process_pending_claims_one_job_at_a_time(self):
+        first = self._job()
+        second = self._job()
+        leases = []
+
+        def run_job(job):
+            second.refresh_from_db()
+            leases.append(second.next_attempt_at)
+            job.status = TrackerJob.DONE
+            job.save()
+
+        with patch.object(jobs, "run_job", side_effect=run_job):
+            self.assertEqual(2, jobs.process_pending())
+
+        # the 2nd job wasn't reserved while the 1st one was running
+        self.assertLess(leases[0], datetime.now(timezone.utc))
+        first.refresh_from_db()
+        self.assertEqual(TrackerJob.DONE, first.status)
+
+    def test_failed_job_is_rescheduled(self):
+        self._job()
+        job = jobs.claim_jobs()[0]
+
+        with patch.object(jobs, "_execute", side_effect=RuntimeError("boom")):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(TrackerJob.PENDING, job.status)
+        self.assertEqual("RuntimeError: boom", job.last_error)
+        # retried after the backoff, not after the lease
+        self.assertLess(
+            job.next_attempt_at, datetime.now(timezone.utc) + timedelta(seconds=11)
+        )
+        self.assertIsNone(job.finished_at)
+        self.assertFalse(jobs.is_worker())
+
+    def test_job_fails_after_max_attempts(self):
+        job = self._job(attempts=2)
+
+        with patch.object(jobs, "_execute", side_effect=RuntimeError("boom")):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(TrackerJob.FAILED, job.status)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_successful_job_is_done(self):
+        job = self._job(attempts=1)
+
+        with patch.object(jobs, "_execute", return_value="https://example.com/1"):
+            jobs.run_job(job)
+
+        job.refresh_from_db()
+        self.assertEqual(TrackerJob.DONE, job.status)
+        self.assertEqual("https://example.com/1", job.result_url)
+        self.assertEqual("", job.last_error)
+
+    def test_queue_stats_are_recorded_as_gauges(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self._job()
+        self._job()
+        self._job(status=TrackerJob.FAILED)
+
+        stats = jobs.record_queue_stats()
+
+        self.assertEqual(2, stats["pending"])
+        self.assertEqual(1, stats["failed"])
+        rendered = metrics.get_sink().render()
+        self.assertIn("# TYPE trackers_integration_jobs_pending gauge", rendered)
+        self.assertIn("trackers_integration_jobs_pending 2", rendered)
+        self.assertIn("trackers_integration_jobs_failed 1", rendered)
@@ -6,16 +6,22 @@
 
 # pylint: disable=attribute-defined-outside-init, protected-access
 import os
+from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
+from django.test import override_settings
 from django.utils import timezone
 
 from tcms.core.contrib.linkreference.models import LinkReference
+from tcms.core.templatetags.extra_filters import markdown2html
 from tcms.rpc.tests.utils import APITestCase
 from tcms.testcases.models import BugSystem
 from tcms.tests.factories import ComponentFactory, TestExecutionFactory
 
+from trackers_integration import breaker, details_cache, jobs, streaming
 from trackers_integration.issuetracker import mantis
 from trackers_integration.issuetracker.mantis import Mantis
+from trackers_integration.models import TrackerJob
 
 
 class TestMantisIntegration(APITestCase):
@@ -89,6 +95,65 @@ class TestMantisIntegration(APITestCase):
         self.assertEqual("Hello World", result["title"])
         self.assertEqual(self.existing_bug_url, result["url"])
 
+    def test_details_are_cached(self):
+        details_cache.invalidate(self.existing_bug_url)
+        result = self.integration.details(self.existing_bug_url)
+
+        with patch.object(self.integration.rpc, "get_issue_if_modified") as fetch:
+            self.assertEqual(result, self.integration.details(self.existing_bug_url))
+            fetch.assert_not_called()
+
+    def test_only_selected_fields_are_fetched(self):
+        issue = self.integration.rpc.get_issue(
+            self.existing_bug_id, mantis.DETAILS_FIELDS
+        )
+
+        self.assertEqual(self.existing_bug_id, issue["id"])
+        self.assertNotIn("notes", issue)
+        self.assertNotIn("history", issue)
+
+    def test_projects_are_streamed(self):
+        projects = list(self.integration.rpc.iter_projects())
+
+        self.assertIn(
+            self.execution_1.run.plan.product.name,
+            [project["name"] for project in projects],
+        )
+        for project in projects:
+            self.assertLessEqual(set(project), set(mantis.PROJECT_FIELDS))
+
+    @override_settings(TRACKERS_INTEGRATION_MAX_RESPONSE_SIZE=10)
+    def test_too_large_responses_are_rejected(self):
+        with self.assertRaises(streaming.ResponseTooLarge):
+            list(self.integration.rpc.iter_projects())
+
+        with self.assertRaises(streaming.ResponseTooLarge):
+            self.integration.rpc.get_issue(self.existing_bug_id)
+
+    def test_cached_comments_are_the_same_as_rendered_ones(self):
+        for execution in (self.execution_1, TestExecutionFactory()):
+            self.assertEqual(
+                str(markdown2html(self.integration.text(execution))),
+                self.integration._comment_html(  # pylint: disable=protected-access
+                    execution
+                ),
+            )
+
+    def test_details_are_degraded_while_mantis_is_unavailable(self):
+        details_cache.invalidate(self.existing_bug_url)
+        circuit = breaker.get_breaker(self.integration.bug_system.base_url)
+        for _ in range(circuit.threshold):
+            circuit.failed()
+
+        try:
+            result = self.integration.details(self.existing_bug_url)
+        finally:
+            circuit.succeeded()
+
+        self.assertEqual(self.existing_bug_id, result["id"])
+        self.assertEqual("Issue Tracker is temporarily unavailable", result["title"])
+        self.assertEqual(self.existing_bug_url, result["url"])
+
     def test_details_for_issue_in_private_project(self):
         target_url = f"{self.integration.bug_system.base_url}/view.php?id={self.private_issue['id']}"
         result = self.integration.details(target_url)
@@ -99,6 +164,64 @@ class TestMantisIntegration(APITestCase):
         self.assertEqual("Hello Private", result["title"])
         self.assertEqual(target_url, result["url"])
 
+    def test_details_async(self):
+        result = async_to_sync(self.integration.adetails)(self.existing_bug_url)
+        self.assertEqual(self.integration.details(self.existing_bug_url), result)
+
+    def test_projects_are_streamed_async(self):
+        async def iter_projects():
+            rpc = self.integration._async_rpc_connection()
+            return [project async for project in rpc.iter_projects()]
+
+        self.assertEqual(
+            list(self.integration.rpc.iter_projects()),
+            async_to_sync(iter_projects)(),
+        )
+
+    def test_get_issue_if_modified_async(self):
+        rpc = self.integration._async_rpc_connection()
+        issue, _validator = async_to_sync(rpc.get_issue_if_modified)(
+            self.existing_bug_id, None, mantis.DETAILS_FIELDS
+        )
+
+        self.assertEqual(
+            self.integration.rpc.get_issue(self.existing_bug_id, mantis.DETAILS_FIELDS),
+            issue,
+        )
+
+    def test_get_issues_async(self):
+        rpc = self.integration._async_rpc_connection()
+        issues = async_to_sync(rpc.get_issues)(1, 10, mantis.MIRROR_FIELDS)
+
+        self.assertEqual(
+            self.integration.rpc.get_issues(1, 10, mantis.MIRROR_FIELDS), issues
+        )
+
+    def test_bulk_details(self):
+        private_url = f"{self.integration.bug_system.base_url}/view.php?id={self.private_issue['id']}"
+        missing_url = f"{self.integration.bug_system.base_url}/view.php?id=999999"
+
+        result = self.integration.bulk_details(
+            [self.existing_bug_url, private_url, missing_url]
+        )
+
+        self.assertEqual({self.existing_bug_url, private_url}, set(result))
+        self.assertEqual(
+            self.integration.details(self.existing_bug_url),
+            result[self.existing_bug_url],
+        )
+        self.assertEqual("Hello Private", result[private_url]["title"])
+
+    def test_get_project_from_mantis_refreshes_cached_list_of_projects(self):
+        # make sure the list of projects is cached
+        self.integration.get_project_from_mantis(self.execution_1.run.plan.product.name)
+
+        new_project = self.integration.rpc.create_project(
+            "Created after caching " + timezone.now().isoformat()
+        )
+        result = self.integration.get_project_from_mantis(new_project["name"])
+        self.assertEqual(new_project["id"], result["id"])
+
     def test_auto_update_bugtracker(self):
         initial_comments = self.integration.rpc.get_comments(self.existing_bug_id)
 
@@ -188,3 +311,32 @@ class TestMantisIntegration(APITestCase):
             self.execution_1.pk, integration.bug_system.pk
         )
         self.assertIn("bug_report_page.php", result["response"])
+
+    @override_settings(TRACKERS_INTEGRATION_DEFERRED=True)
+    def test_report_issue_from_test_execution_deferred(self):
+        result = self.rpc_client.Bug.report(
+            self.execution_1.pk, self.integration.bug_system.pk
+        )
+        self.assertEqual(result["rc"], 0)
+        self.assertEqual(self.execution_1.get_full_url(), result["response"])
+
+        job = TrackerJob.objects.get(execution_id=self.execution_1.pk)
+        self.assertEqual(TrackerJob.PENDING, job.status)
+
+        self.assertEqual(1, jobs.process_pending())
+        job.refresh_from_db()
+        self.assertEqual(TrackerJob.DONE, job.status)
+        self.assertIn("view.php?id=", job.result_url)
+
+        # verify that LR has been added to TE
+        self.assertTrue(
+            LinkReference.objects.filter(
+                execution=self.execution_1,
+                url=job.result_url,
+                is_defect=True,
+            ).exists()
+        )
+
+        self.integration.rpc.close_issue(
+            self.integration.bug_id_from_url(job.result_url)
+        )
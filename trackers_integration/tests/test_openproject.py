@@ -3,20 +3,38 @@
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
-# pylint: disable=attribute-defined-outside-init
+# pylint: disable=attribute-defined-outside-init, protected-access
 
+import hashlib
+import hmac
+import json
+from http import HTTPStatus
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.db import IntegrityError, transaction
 from django.test import override_settings, TestCase
+from django.urls import reverse
 from django.utils import timezone
 
 from parameterized import parameterized
 
 from tcms.core.contrib.linkreference.models import LinkReference
+from tcms.core.helpers.comments import add_comment
 from tcms.rpc.tests.utils import APITestCase
 from tcms.testcases.models import BugSystem
-from tcms.tests.factories import ComponentFactory, TestExecutionFactory
+from tcms.tests.factories import (
+    ComponentFactory,
+    TestExecutionFactory,
+    UserFactory,
+)
 
-from trackers_integration.models import ApiToken
-from trackers_integration.issuetracker import OpenProject
+from trackers_integration import jobs, metrics
+from trackers_integration.auth import personal_api_token
+from trackers_integration.breaker import TrackerUnavailable
+from trackers_integration.urls_util import url_hash
+from trackers_integration.models import ApiToken, MirroredIssue, TrackerJob
+from trackers_integration.issuetracker import OpenProject, openproject
 
 
 class TestOpenProjectIntegration(APITestCase):
@@ -65,6 +83,125 @@ class TestOpenProjectIntegration(APITestCase):
         self.assertEqual("TASK: Setup conference website", result["title"])
         self.assertEqual(self.existing_bug_url, result["url"])
 
+    def test_details_async(self):
+        result = async_to_sync(self.integration.adetails)(self.existing_bug_url)
+        self.assertEqual(self.integration.details(self.existing_bug_url), result)
+
+    def test_get_workpackage_if_modified_async(self):
+        rpc = self.integration._async_rpc_connection()
+        workpackage, _validator = async_to_sync(rpc.get_workpackage_if_modified)(
+            self.existing_bug_id
+        )
+
+        self.assertEqual(
+            self.integration.rpc.get_workpackage(self.existing_bug_id)["id"],
+            workpackage["id"],
+        )
+
+    @override_settings(TRACKERS_INTEGRATION_WEBHOOK_SECRET="webhook-secret")
+    def test_webhook_updates_cached_details(self):
+        self.integration.details(self.existing_bug_url)
+
+        workpackage = self.integration.rpc.get_workpackage(self.existing_bug_id)
+        workpackage["_links"]["status"]["title"] = "Rejected"
+        body = json.dumps(
+            {"action": "work_package:updated", "work_package": workpackage}
+        ).encode()
+        signature = hmac.new(b"webhook-secret", body, hashlib.sha1).hexdigest()
+        url = reverse(
+            "trackers_integration-webhook-openproject",
+            args=[self.integration.bug_system.pk],
+        )
+
+        response = self.client.post(
+            url, body, content_type="application/json", HTTP_X_OP_SIGNATURE="sha1=bad"
+        )
+        self.assertEqual(HTTPStatus.FORBIDDEN, response.status_code)
+
+        response = self.client.post(
+            url,
+            body,
+            content_type="application/json",
+            HTTP_X_OP_SIGNATURE=f"sha1={signature}",
+        )
+        self.assertEqual(HTTPStatus.NO_CONTENT, response.status_code)
+
+        result = self.integration.details(self.existing_bug_url)
+        self.assertEqual("REJECTED", result["status"])
+        self.assertEqual(self.existing_bug_url, result["url"])
+
+    @override_settings(TRACKERS_INTEGRATION_WEBHOOK_SECRET="webhook-secret")
+    def test_webhook_updates_mirrored_status(self):
+        canonical = self.integration.canonical_url(self.existing_bug_url)
+        MirroredIssue.objects.create(
+            bug_system_id=self.integration.bug_system.pk,
+            url_hash=url_hash(canonical),
+            url=canonical,
+            issue_id=str(self.existing_bug_id),
+            status="New",
+        )
+
+        workpackage = self.integration.rpc.get_workpackage(self.existing_bug_id)
+        workpackage["_links"]["status"]["title"] = "Rejected"
+        url = reverse(
+            "trackers_integration-webhook-openproject",
+            args=[self.integration.bug_system.pk],
+        )
+
+        for payload, expected in (
+            ([], HTTPStatus.BAD_REQUEST),
+            ({"action": "work_package:updated"}, HTTPStatus.BAD_REQUEST),
+            (
+                {"action": "work_package:updated", "work_package": workpackage},
+                HTTPStatus.NO_CONTENT,
+            ),
+        ):
+            body = json.dumps(payload).encode()
+            signature = hmac.new(b"webhook-secret", body, hashlib.sha1).hexdigest()
+            response = self.client.post(
+                url,
+                body,
+                content_type="application/json",
+                HTTP_X_OP_SIGNATURE=f"sha1={signature}",
+            )
+            self.assertEqual(expected, response.status_code)
+
+        self.assertEqual(
+            "Rejected", MirroredIssue.objects.get(url_hash=url_hash(canonical)).status
+        )
+
+    @override_settings(TRACKERS_INTEGRATION_METRICS_TOKEN="metrics-token")
+    def test_metrics_are_recorded(self):
+        metrics.reset()
+        self.integration.details(self.existing_bug_url)
+
+        url = reverse("trackers_integration-metrics")
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(HTTPStatus.FORBIDDEN, response.status_code)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION="Bearer metrics-token")
+        self.assertEqual(HTTPStatus.OK, response.status_code)
+        self.assertIn(
+            'endpoint="/api/v3/work_packages/{id}"', response.content.decode()
+        )
+        self.assertIn(
+            "trackers_integration_request_duration_seconds_count",
+            response.content.decode(),
+        )
+
+    def test_bulk_details(self):
+        other_url = "http://bugtracker.kiwitcms.org/work_packages/6"
+
+        result = self.integration.bulk_details([self.existing_bug_url, other_url])
+
+        self.assertEqual({self.existing_bug_url, other_url}, set(result))
+        self.assertEqual(
+            self.integration.details(self.existing_bug_url),
+            result[self.existing_bug_url],
+        )
+        self.assertEqual(6, result[other_url]["id"])
+        self.assertEqual(other_url, result[other_url]["url"])
+
     def test_auto_update_bugtracker(self):
         last_comment = None
         initial_comments = self.integration.rpc.get_comments(self.existing_bug_id)
@@ -105,6 +242,94 @@ class TestOpenProjectIntegration(APITestCase):
         ]:
             self.assertIn(expected_string, last_comment["comment"]["raw"])
 
+    def test_report_issues_for_many_executions(self):
+        execution_2 = TestExecutionFactory(
+            build=self.execution_1.build, run=self.execution_1.run
+        )
+
+        results = self.integration.report_issues(
+            [self.execution_1, execution_2], self.api_user
+        )
+
+        for execution in (self.execution_1, execution_2):
+            new_issue, url = results[execution.pk]
+            self.assertEqual(
+                f"Failed test: {execution.case.summary}", new_issue["subject"]
+            )
+            self.assertTrue(
+                LinkReference.objects.filter(
+                    execution=execution, url=url, is_defect=True
+                ).exists()
+            )
+
+    @override_settings(TRACKERS_INTEGRATION_DEDUPLICATE=True)
+    def test_repeated_failures_are_linked_to_the_same_issue(self):
+        new_issue, url = self.integration._report_issue(self.execution_1, self.api_user)
+        self.assertIsNotNone(new_issue)
+        initial_comments = self.integration.rpc.get_comments(new_issue["id"])
+
+        execution_2 = TestExecutionFactory(
+            case=self.execution_1.case, build=self.execution_1.build
+        )
+        self.assertEqual(
+            (None, url), self.integration._report_issue(execution_2, self.api_user)
+        )
+
+        self.assertTrue(
+            LinkReference.objects.filter(
+                execution=execution_2, url=url, is_defect=True
+            ).exists()
+        )
+        comments = self.integration.rpc.get_comments(new_issue["id"])
+        self.assertEqual(initial_comments["count"] + 1, comments["count"])
+
+    @override_settings(
+        TRACKERS_INTEGRATION_DEDUPLICATE=True, TRACKERS_INTEGRATION_DEFERRED=True
+    )
+    def test_repeated_failures_are_linked_when_deferred(self):
+        execution_2 = TestExecutionFactory(
+            case=self.execution_1.case, build=self.execution_1.build
+        )
+        for execution in (self.execution_1, execution_2):
+            self.integration._report_issue(execution, self.api_user)
+
+        with patch.object(
+            OpenProject,
+            "post_comment",
+            autospec=True,
+            side_effect=OpenProject.post_comment,
+        ) as post_comment:
+            self.assertEqual(2, jobs.process_pending())
+
+        results = list(
+            TrackerJob.objects.filter(
+                execution_id__in=[self.execution_1.pk, execution_2.pk]
+            ).order_by("pk")
+        )
+        self.assertEqual(
+            [TrackerJob.DONE, TrackerJob.DONE], [job.status for job in results]
+        )
+        self.assertEqual(1, len({job.result_url for job in results}))
+        post_comment.assert_called_once()
+        self.assertTrue(
+            LinkReference.objects.filter(
+                execution=execution_2, url=results[0].result_url, is_defect=True
+            ).exists()
+        )
+
+    @override_settings(TRACKERS_INTEGRATION_DEDUPLICATE=True)
+    def test_different_failures_of_the_same_case_are_not_merged(self):
+        _issue, url = self.integration._report_issue(self.execution_1, self.api_user)
+
+        execution_2 = TestExecutionFactory(
+            case=self.execution_1.case, build=self.execution_1.build
+        )
+        add_comment([execution_2], "TimeoutError: page did not load", self.api_user)
+
+        new_issue, new_url = self.integration._report_issue(execution_2, self.api_user)
+        self.assertIsNotNone(new_issue)
+        self.assertNotEqual(url, new_url)
+
     def test_report_issue_from_test_execution_1click_works(self):
         # simulate user clicking the 'Report bug' button in TE widget, TR page
         result = self.rpc_client.Bug.report(
@@ -288,6 +513,70 @@ class TestOpenProjectAndIndividualApiTokens(APITestCase):
         )
 
 
+class TestPersonalApiTokenCache(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        bug_system = BugSystem.objects.create(  # nosec:B106:hardcoded_password_funcarg
+            name="OpenProject for personal API token cache",
+            tracker_type="trackers_integration.issuetracker.OpenProject",
+            base_url="http://cache.bugtracker.kiwitcms.org",
+            api_password="bogus-will-use-individual-api-tokens",
+        )
+        cls.user = UserFactory()
+        fake_request = FakeRequest()
+        fake_request.user = cls.user
+        cls.integration = OpenProject(bug_system, fake_request)
+
+    def test_token_is_cached_and_invalidated_on_changes(self):
+        self.assertIsNone(personal_api_token(self.integration))
+
+        # missing tokens are cached too
+        with self.assertNumQueries(0):
+            self.assertIsNone(personal_api_token(self.integration))
+
+        token = ApiToken.objects.create(
+            owner=self.user,
+            base_url=self.integration.bug_system.base_url,
+            api_username="kiwitcms-bot",
+            api_password="first-token",
+        )
+        self.assertEqual(
+            ("kiwitcms-bot", "first-token"), personal_api_token(self.integration)
+        )
+        with self.assertNumQueries(0):
+            personal_api_token(self.integration)
+
+        token.api_password = "second-token"
+        token.save()
+        self.assertEqual(
+            ("kiwitcms-bot", "second-token"), personal_api_token(self.integration)
+        )
+
+        token.delete()
+        self.assertIsNone(personal_api_token(self.integration))
+
+    def test_token_matches_variations_of_base_url(self):
+        ApiToken.objects.create(
+            owner=self.user,
+            base_url="https://CACHE.bugtracker.kiwitcms.org/",
+            api_username="kiwitcms-bot",
+            api_password="the-token",
+        )
+
+        self.assertEqual(
+            ("kiwitcms-bot", "the-token"), personal_api_token(self.integration)
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ApiToken.objects.create(
+                owner=self.user,
+                base_url=self.integration.bug_system.base_url,
+                api_username="kiwitcms-bot",
+                api_password="duplicate-token",
+            )
+
+
 class TestOpenProjectInternalImplementation(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -341,6 +630,20 @@ class TestOpenProjectInternalImplementation(TestCase):
         with self.assertRaisesRegex(RuntimeError, "WorkPackage Type not found"):
             self.openproject.get_workpackage_type(-1, "Bug")
 
+    def test_resolved_project_is_cached_until_invalidated(self):
+        _, api_password = self.openproject.rpc_credentials
+        key = (self.openproject.bug_system.base_url, api_password, "Scrum project")
+
+        project = self.openproject._resolve_project("Scrum project")
+        self.assertEqual(
+            self.openproject.get_project_by_name("Scrum project")["identifier"],
+            project["identifier"],
+        )
+        self.assertEqual(project, openproject._PROJECTS.get(key))
+
+        self.openproject.invalidate_cache()
+        self.assertIsNone(openproject._PROJECTS.get(key))
+
     def test_get_project_by_name_match(self):
         result = self.openproject.get_project_by_name("Scrum project")
         self.assertEqual(result["name"], "Scrum project")
@@ -352,3 +655,35 @@ class TestOpenProjectInternalImplementation(TestCase):
     def test_get_project_by_name_fallback_to_first(self):
         result = self.openproject.get_project_by_name("Non Existent Project")
         self.assertEqual(result["name"], "Scrum project")
+
+    def test_get_project_by_name_closes_the_iterator(self):
+        closed = []
+
+        def iter_projects(_name=None):
+            try:
+                yield {"name": "Scrum project"}
+                yield {"name": "Demo project"}
+            finally:
+                closed.append(True)
+
+        with patch.object(
+            self.openproject.rpc, "iter_projects", side_effect=iter_projects
+        ):
+            result = self.openproject.get_project_by_name("Scrum project")
+
+        self.assertEqual("Scrum project", result["name"])
+        self.assertEqual([True], closed)
+
+    def test_workpackages_are_not_created_again_when_unavailable(self):
+        self.assertTrue(self.openproject._may_retry(RuntimeError("Type not found")))
+        self.assertFalse(self.openproject._may_retry(TrackerUnavailable("timeout")))
+        self.assertFalse(self.openproject._may_retry(ValueError("bad value")))
+
+    def test_iterate_follows_next_page_links(self):
+        rpc = self.openproject.rpc
+        projects = rpc.get_projects()
+        result = list(rpc.iterate(f"{rpc.base_url}/projects", page_size=1))
+        self.assertEqual(
+            [project["id"] for project in projects["_embedded"]["elements"]],
+            [project["id"] for project in result],
+        )
@@ -6,15 +6,25 @@
 
 # pylint: disable=attribute-defined-outside-init, protected-access
 
+from unittest.mock import patch
 from urllib.parse import quote
+
+from asgiref.sync import async_to_sync
+from django.test import override_settings
 from django.utils import timezone
 
+from parameterized import parameterized
+
 from tcms.core.contrib.linkreference.models import LinkReference
 from tcms.rpc.tests.utils import APITestCase
 from tcms.testcases.models import BugSystem
 from tcms.tests.factories import ComponentFactory, TestExecutionFactory
 
+from trackers_integration import details_cache, mirror
+from trackers_integration.issuetracker import trac
 from trackers_integration.issuetracker.trac import Trac
+from trackers_integration.models import MirroredIssue, MirrorWatermark
+from trackers_integration.urls_util import url_hash
 
 
 class TestTracIntegration(APITestCase):
@@ -82,6 +92,223 @@ class TestTracIntegration(APITestCase):
         self.assertEqual("Smoke test failed", result["title"])
         self.assertEqual(self.existing_bug_url, result["url"])
 
+    def test_details_async(self):
+        result = async_to_sync(self.integration.adetails)(self.existing_bug_url)
+        self.assertEqual(self.integration.details(self.existing_bug_url), result)
+
+    def test_bulk_details(self):
+        missing_url = (
+            f"{self.bug_system.base_url}/{quote(self.project_name)}/ticket/999999"
+        )
+
+        result = self.integration.bulk_details([self.existing_bug_url, missing_url])
+
+        self.assertEqual([self.existing_bug_url], list(result))
+        self.assertEqual(
+            self.integration.details(self.existing_bug_url),
+            result[self.existing_bug_url],
+        )
+
+    def test_details_reuses_cached_login_cookies(self):
+        key = self.integration.rpc._login_key(quote(self.project_name))
+        trac._LOGIN_COOKIES.delete(key)
+        details_cache.invalidate(self.existing_bug_url)
+
+        self.integration.details(self.existing_bug_url)
+        cookies = trac._LOGIN_COOKIES.get(key)
+        self.assertIsNotNone(cookies)
+
+        # 2nd call doesn't login again
+        details_cache.invalidate(self.existing_bug_url)
+        result = self.integration.details(self.existing_bug_url)
+        self.assertEqual(self.existing_bug_id, result["id"])
+        self.assertIs(cookies, trac._LOGIN_COOKIES.get(key))
+
+        # cookies obtained with another password are not used
+        rpc = trac.TracAPI(self.bug_system.base_url, "tester", "changed-password")
+        self.assertIsNone(
+            trac._LOGIN_COOKIES.get(rpc._login_key(quote(self.project_name)))
+        )
+
+    def test_details_are_fetched_again_only_when_stale(self):
+        details_cache.invalidate(self.existing_bug_url)
+        result = self.integration.details(self.existing_bug_url)
+
+        with patch.object(
+            self.integration.rpc,
+            "invoke_method",
+            wraps=self.integration.rpc.invoke_method,
+        ) as invoke_method:
+            # still fresh, Trac isn't asked at all
+            self.assertEqual(result, self.integration.details(self.existing_bug_url))
+            invoke_method.assert_not_called()
+
+            with override_settings(TRACKERS_INTEGRATION_DETAILS_CACHE_TTL=0):
+                # stale entries are replaced without asking Trac about changes
+                self.integration.details(self.existing_bug_url)
+                self.integration.details(self.existing_bug_url)
+            self.assertEqual(2, invoke_method.call_count)
+
+    def test_invoke_batch_reports_errors_per_call(self):
+        results = self.integration.rpc.invoke_batch(
+            self.project_name,
+            [
+                ("ticket.details", {"id": self.existing_bug_id}),
+                ("ticket.details", {"id": 999999}),
+            ],
+        )
+
+        self.assertEqual(self.existing_bug_id, results[0]["id"])
+        self.assertIsInstance(results[1], RuntimeError)
+
+    @staticmethod
+    def _send_batches(supported):
+        """
+        Stands in place of ``TracAPI._send`` so that batch requests are
+        either answered, by sending every call on its own, or treated as
+        notifications like trac-ticketrpc <= 0.9.3 does
+        """
+
+        def send(rpc, project, req):
+            if not isinstance(req, list):
+                return trac.TracAPI._send(rpc, project, req)
+            if not supported:
+                return None
+            return [
+                dict(trac.TracAPI._send(rpc, project, call), id=call["id"])
+                for call in req
+            ]
+
+        return send
+
+    @staticmethod
+    def _sent_batches(send):
+        return [
+            [c["method"] for c in call.args[2]]
+            for call in send.call_args_list
+            if isinstance(call.args[2], list)
+        ]
+
+    @parameterized.expand(
+        [
+            ("supported", True, [["system.getAPIVersion"], ["ticket.create"]]),
+            ("not_supported", False, [["system.getAPIVersion"]]),
+        ]
+    )
+    def test_batch_support_is_probed_with_a_read_only_call(
+        self, _name, supported, expected_batches
+    ):
+        trac._BATCH_SUPPORT.clear()
+
+        with patch.object(
+            trac.TracAPI,
+            "_send",
+            autospec=True,
+            side_effect=self._send_batches(supported),
+        ) as send:
+            results = self.integration.report_issues([self.execution_1], self.api_user)
+
+        self.assertIsNotNone(results[self.execution_1.pk][0])
+        self.assertEqual(
+            supported, self.integration.rpc.supports_batch(self.project_name)
+        )
+
+        self.assertEqual(expected_batches, self._sent_batches(send))
+
+    @parameterized.expand(
+        [
+            ("supported", True, [["system.getAPIVersion"], ["ticket.add_comment"]]),
+            ("not_supported", False, [["system.getAPIVersion"]]),
+        ]
+    )
+    def test_comments_are_batched_only_after_a_successful_probe(
+        self, _name, supported, expected_batches
+    ):
+        trac._BATCH_SUPPORT.clear()
+
+        with patch.object(
+            trac.TracAPI,
+            "_send",
+            autospec=True,
+            side_effect=self._send_batches(supported),
+        ) as send:
+            results = self.integration.post_comments(
+                [self.execution_1], self.existing_bug_id
+            )
+
+        self.assertNotIsInstance(results[self.execution_1.pk], Exception)
+        self.assertEqual(expected_batches, self._sent_batches(send))
+
+    def test_writes_are_not_sent_again_when_a_batch_isnt_answered(self):
+        rpc = self.integration.rpc
+        rpc._batch_supported(self.project_name, True)
+
+        def send(_project, req):
+            # like trac-ticketrpc which treats batches as notifications
+            if isinstance(req, list):
+                return None
+            return {"result": {"id": self.existing_bug_id}}
+
+        try:
+            with patch.object(rpc, "_send", side_effect=send), patch.object(
+                rpc, "invoke_method", wraps=rpc.invoke_method
+            ) as invoke_method:
+                results = rpc.invoke_batch(
+                    self.project_name,
+                    [
+                        ("ticket.create", {"summary": "Must not be duplicated"}),
+                        ("ticket.details", {"id": self.existing_bug_id}),
+                    ],
+                )
+
+            self.assertIsInstance(results[0], RuntimeError)
+            self.assertEqual(self.existing_bug_id, results[1]["id"])
+            invoke_method.assert_called_once()
+            self.assertEqual("ticket.details", invoke_method.call_args.args[0])
+            self.assertFalse(rpc.supports_batch(self.project_name))
+        finally:
+            trac._BATCH_SUPPORT.clear()
+
+    def test_mirror_is_updated_only_with_changed_tickets(self):
+        LinkReference.objects.create(
+            execution=self.execution_1, url=self.existing_bug_url, is_defect=True
+        )
+
+        # initial sync of newly linked tickets
+        self.assertEqual(1, mirror.sync(self.integration))
+        issue = MirroredIssue.objects.get(
+            url_hash=url_hash(self.integration.canonical_url(self.existing_bug_url))
+        )
+        self.assertEqual("new", issue.status)
+        self.assertEqual("Smoke test failed", issue.title)
+        # the next sync fetches changes made since this one started
+        self.assertTrue(
+            MirrorWatermark.objects.filter(
+                bug_system_id=self.integration.bug_system.pk
+            ).exists()
+        )
+
+        self.integration.rpc.invoke_method(
+            "ticket.close",
+            {
+                "id": self.existing_bug_id,
+                "project": self.project_name,
+                "resolution": "fixed",
+                "text": "Closed",
+            },
+        )
+
+        with patch.object(
+            self.integration.rpc,
+            "changed_ticket_ids",
+            wraps=self.integration.rpc.changed_ticket_ids,
+        ) as changed_ticket_ids:
+            self.assertEqual(1, mirror.sync(self.integration))
+            changed_ticket_ids.assert_called_once()
+
+        issue.refresh_from_db()
+        self.assertEqual("closed", issue.status)
+
     def test_auto_update_bugtracker(self):
         comments_params = {"id": self.existing_bug_id, "project": self.project_name}
         result = self.integration.rpc.invoke_method("ticket.comments", comments_params)
@@ -170,6 +397,28 @@ class TestTracIntegration(APITestCase):
         }
         self.integration.rpc.invoke_method("ticket.close", close_params)
 
+    def test_report_issues_for_many_executions(self):
+        execution_2 = TestExecutionFactory(
+            build=self.execution_1.build, run=self.execution_1.run
+        )
+
+        results = self.integration.report_issues(
+            [self.execution_1, execution_2], self.api_user
+        )
+
+        self.assertEqual({self.execution_1.pk, execution_2.pk}, set(results))
+        urls = [
+            results[execution.pk][1] for execution in (self.execution_1, execution_2)
+        ]
+        self.assertNotEqual(urls[0], urls[1])
+        for execution, url in zip((self.execution_1, execution_2), urls):
+            self.assertIn("/ticket/", url)
+            self.assertTrue(
+                LinkReference.objects.filter(
+                    execution=execution, url=url, is_defect=True
+                ).exists()
+            )
+
     def test_report_issue_from_test_execution_fallback_to_manual(self):
         # simulate user clicking the 'Report bug' button in TE widget, TR page
         result = self.rpc_client.Bug.report(
@@ -0,0 +1,114 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Cross-tenant index of the base URLs of Issue Trackers, see :class:`BugSystemUrl`.
+
+The index is updated by signal handlers whenever a ``BugSystem`` is saved or
+deleted. Existing records are indexed after migrations, for every tenant
+whose index is still empty. The ``./manage.py index_bug_systems`` command
+rebuilds the index from scratch, with django-tenants use
+``./manage.py all_tenants_command index_bug_systems``.
+
+The index itself is always read & written on the public schema!
+"""
+
+import contextlib
+
+from django.db import connection
+
+from trackers_integration.models import BugSystemUrl
+
+try:
+    from django_tenants.utils import get_public_schema_name, schema_context
+except ModuleNotFoundError:
+    get_public_schema_name = schema_context = None  # pylint: disable=invalid-name
+
+
+def _tenant():
+    return getattr(connection, "schema_name", "")
+
+
+def _public():
+    if schema_context is None:
+        return contextlib.nullcontext()
+    return schema_context(get_public_schema_name())
+
+
+def update(bug_system):
+    if not bug_system.base_url:
+        remove(bug_system)
+        return
+
+    tenant = _tenant()
+    with _public():
+        BugSystemUrl.objects.update_or_create(
+            tenant=tenant,
+            bug_system_id=bug_system.pk,
+            defaults={"base_url": bug_system.base_url},
+        )
+
+
+def remove(bug_system):
+    tenant = _tenant()
+    with _public():
+        BugSystemUrl.objects.filter(tenant=tenant, bug_system_id=bug_system.pk).delete()
+
+
+def rebuild():
+    """
+    Index all Issue Trackers from the current tenant, replacing previous entries!
+
+    :return: number of indexed Issue Trackers
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.testcases.models import BugSystem
+
+    tenant = _tenant()
+    entries = [
+        BugSystemUrl(tenant=tenant, bug_system_id=pk, base_url=base_url)
+        for pk, base_url in BugSystem.objects.exclude(base_url__isnull=True)
+        .exclude(base_url="")
+        .values_list("pk", "base_url")
+    ]
+
+    with _public():
+        BugSystemUrl.objects.filter(tenant=tenant).delete()
+        return len(BugSystemUrl.objects.bulk_create(entries))
+
+
+def backfill():
+    """
+    Index all Issue Trackers from the current tenant unless its index
+    already has entries, e.g. after upgrading!
+
+    :return: number of indexed Issue Trackers
+    """
+    # pylint: disable=import-outside-toplevel
+    from tcms.testcases.models import BugSystem
+
+    # e.g. the public schema with django-tenants
+    if BugSystem._meta.db_table not in connection.introspection.table_names():
+        return 0
+
+    tenant = _tenant()
+    with _public():
+        if BugSystemUrl.objects.filter(tenant=tenant).exists():
+            return 0
+
+    return rebuild()
+
+
+def base_urls(tenants):
+    """
+    :param tenants: schema names or a queryset of them
+    :return: distinct base URLs of all Issue Trackers from these tenants
+    """
+    with _public():
+        return list(
+            BugSystemUrl.objects.filter(tenant__in=tenants)
+            .values_list("base_url", flat=True)
+            .distinct()
+        )
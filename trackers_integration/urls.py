@@ -1,6 +1,31 @@
-# Copyright (c) 2022 Alexander Todorov <atodorov@otb.bg>
+# Copyright (c) 2022-2026 Alexander Todorov <atodorov@otb.bg>
 #
 # Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
 # https://www.gnu.org/licenses/agpl-3.0.html
 
-urlpatterns = []
+from django.urls import path
+
+from trackers_integration import views
+
+urlpatterns = [
+    path(
+        "webhooks/openproject/<int:pk>/",
+        views.OpenProjectWebhook.as_view(),
+        name="trackers_integration-webhook-openproject",
+    ),
+    path(
+        "webhooks/mantis/<int:pk>/",
+        views.MantisWebhook.as_view(),
+        name="trackers_integration-webhook-mantis",
+    ),
+    path(
+        "webhooks/trac/<int:pk>/",
+        views.TracWebhook.as_view(),
+        name="trackers_integration-webhook-trac",
+    ),
+    path(
+        "metrics/",
+        views.MetricsView.as_view(),
+        name="trackers_integration-metrics",
+    ),
+]
@@ -0,0 +1,39 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Helpers for comparing URLs of issues and Issue Trackers.
+"""
+
+import hashlib
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url):
+    """
+    Return a canonical form of ``url`` so that different spellings
+    of the same address compare equal, i.e. the case of the scheme & host,
+    default ports, trailing slashes, escaping & the order of query parameters
+    don't matter!
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc += f":{parts.port}"
+    path = quote(unquote(parts.path.rstrip("/")))
+    query = urlencode(sorted(parse_qsl(parts.query)))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def url_hash(url):
+    """
+    sha256 of the normalized ``url``, used instead of the URL itself
+    in database indexes & cache keys b/c URLs can be too long
+    """
+    return hashlib.sha256(normalize_url(url or "").encode()).hexdigest()
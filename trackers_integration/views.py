@@ -0,0 +1,217 @@
+# Copyright (c) 2026 Alexander Todorov <atodorov@otb.bg>
+#
+# Licensed under GNU Affero General Public License v3 or later (AGPLv3+)
+# https://www.gnu.org/licenses/agpl-3.0.html
+
+"""
+Webhook receivers which let Issue Trackers notify Kiwi TCMS about changes
+so that cached issue details are updated instead of being polled for, and
+an endpoint which exposes metrics about calls to Issue Trackers.
+
+Webhooks are enabled only when the ``TRACKERS_INTEGRATION_WEBHOOK_SECRET``
+configuration setting is defined and every request must be authenticated with
+this secret, see :meth:`WebhookView.is_authentic`. The Issue Tracker sending
+the notification is identified by the primary key of its ``BugSystem`` record
+in the URL, e.g. ``/kiwitcms_trackers_integration/webhooks/openproject/1/``.
+
+When the notification contains the status of the issue it is also written to
+the local issue mirror, see :mod:`trackers_integration.mirror`. Otherwise the
+mirror is left alone; the issue has been updated after the last watermark
+so the next ``sync_issue_mirror`` run fetches it anyway.
+"""
+
+# pylint: disable=protected-access
+
+import abc
+import hashlib
+import hmac
+import json
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
+from django.http import HttpResponseForbidden
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic.base import View
+
+from tcms.testcases.models import BugSystem
+
+from trackers_integration import details_cache, jobs, metrics, mirror
+from trackers_integration.issuetracker import Mantis, OpenProject, Trac
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class WebhookView(abc.ABC, View):  # pylint: disable=missing-permission-required
+    """
+    Base class for webhook receivers. Requests are authenticated with either
+    an ``X-Hub-Signature-256: sha256=<HMAC of the body>`` header or with an
+    ``X-Webhook-Secret: <secret>`` header!
+    """
+
+    http_method_names = ["post"]
+    tracker_class = None
+
+    @staticmethod
+    def _secret():
+        secret = getattr(settings, "TRACKERS_INTEGRATION_WEBHOOK_SECRET", None)
+        if not secret:
+            raise Http404("Webhooks are disabled")
+        return secret.encode()
+
+    @staticmethod
+    def _signature_matches(header, algorithm, secret, body):
+        if not header or not header.startswith(f"{algorithm}="):
+            return False
+
+        expected = hmac.new(secret, body, getattr(hashlib, algorithm)).hexdigest()
+        return hmac.compare_digest(header.split("=", 1)[1], expected)
+
+    def is_authentic(self, request, secret):
+        if self._signature_matches(
+            request.headers.get("X-Hub-Signature-256"), "sha256", secret, request.body
+        ):
+            return True
+
+        return hmac.compare_digest(
+            request.headers.get("X-Webhook-Secret", "").encode(), secret
+        )
+
+    def post(self, request, pk):
+        secret = self._secret()
+        if not self.is_authentic(request, secret):
+            return HttpResponseForbidden("Invalid signature")
+
+        bug_system = get_object_or_404(
+            BugSystem,
+            pk=pk,
+            tracker_type__endswith=f".{self.tracker_class.__name__}",
+        )
+        tracker = self.tracker_class(bug_system, None)
+
+        try:
+            payload = json.loads(request.body)
+            if not isinstance(payload, dict):
+                raise TypeError("expected a JSON object")
+
+            for url, details, status in self.changes(tracker, payload):
+                if details:
+                    details_cache.update(url, details)
+                else:
+                    details_cache.invalidate(url)
+
+                if status:
+                    mirror.update_status(tracker, url, status)
+        except (KeyError, TypeError, ValueError) as err:
+            return HttpResponseBadRequest(f"Invalid payload: {err}")
+
+        return HttpResponse(status=204)
+
+    @abc.abstractmethod
+    def changes(self, tracker, payload):
+        """
+        :param payload: the decoded JSON object
+        :return: iterable of ``(issue URL, details, status)`` for issues which
+                 have changed. ``details`` may be ``None`` if the payload doesn't
+                 contain them, in which case the cache entry is discarded!
+                 ``status`` is the status as stored in the issue mirror or
+                 ``None`` if it is unknown.
+        """
+
+
+class OpenProjectWebhook(WebhookView):
+    """
+    Receives *work_package:created* and *work_package:updated* events from
+    OpenProject. Configure the webhook with the same secret, requests are
+    authenticated with the ``X-OP-Signature`` header!
+    """
+
+    tracker_class = OpenProject
+
+    def is_authentic(self, request, secret):
+        return self._signature_matches(
+            request.headers.get("X-OP-Signature"), "sha1", secret, request.body
+        )
+
+    def changes(self, tracker, payload):
+        if not payload["action"].startswith("work_package:"):
+            return
+
+        workpackage = payload["work_package"]
+        url = tracker.issue_url(workpackage["id"])
+        yield (
+            url,
+            OpenProject._workpackage_details(workpackage, url),
+            workpackage["_links"]["status"]["title"],
+        )
+
+
+class MantisWebhook(WebhookView):
+    """
+    Receives issue notifications from a Mantis BT webhook plugin. The payload
+    must be a JSON object with either an ``issue`` key, containing the issue
+    as returned by the Mantis REST API, or an ``issue_id`` key!
+    """
+
+    tracker_class = Mantis
+
+    def changes(self, tracker, payload):
+        issue = payload.get("issue") or {"id": payload["issue_id"]}
+        url = tracker.issue_url(issue["id"])
+
+        details = None
+        if {"summary", "description", "status"}.issubset(issue):
+            details = Mantis._issue_details(issue, url)
+        yield url, details, details and details["status"]
+
+
+class TracWebhook(WebhookView):
+    """
+    Receives ticket change notifications from Trac. The payload must be a JSON
+    object with a ``project`` key and a ``ticket`` key, containing either the
+    ticket fields, including ``id``, or only the ticket ID!
+    """
+
+    tracker_class = Trac
+
+    def changes(self, tracker, payload):
+        ticket = payload["ticket"]
+        if not isinstance(ticket, dict):
+            ticket = {"id": ticket}
+        url = tracker.ticket_url(payload["project"], int(ticket["id"]))
+
+        details = None
+        if {"summary", "description", "status"}.issubset(ticket):
+            ticket["id"] = int(ticket["id"])
+            details = Trac._filtered_trac_ticket_data(ticket, url)
+        yield url, details, details and details["status"]
+
+
+class MetricsView(View):  # pylint: disable=missing-permission-required
+    """
+    Metrics about calls to Issue Trackers in the Prometheus text exposition
+    format, see :mod:`trackers_integration.metrics`. Enabled only when the
+    ``TRACKERS_INTEGRATION_METRICS_TOKEN`` configuration setting is defined
+    and requests must send an ``Authorization: Bearer <token>`` header!
+    """
+
+    http_method_names = ["get"]
+
+    def get(self, request):
+        token = getattr(settings, "TRACKERS_INTEGRATION_METRICS_TOKEN", None)
+        sink = metrics.get_sink()
+        if not token or not hasattr(sink, "render"):
+            raise Http404("Metrics are disabled")
+
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        ):
+            return HttpResponseForbidden("Invalid token")
+
+        # the queue is processed in another process, ask the database
+        if jobs.is_deferred():
+            jobs.record_queue_stats()
+        return HttpResponse(
+            sink.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )